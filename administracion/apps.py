@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AdministracionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'administracion'
+
+    def ready(self):
+        # Señales que mantienen el índice luxand_uuid -> identidad
+        from . import identidades
+        identidades.conectar()
@@ -0,0 +1,266 @@
+# administracion/identidades.py
+"""
+Resolución luxand_uuid -> identidad (persona o empleado) para el reconocimiento.
+
+La fuente es el registro IdentidadFacial (uuid como clave primaria, titular
+Persona o Empleado). Cada proceso mantiene un mapa en memoria uuid ->
+Identidad, cargado una vez (una consulta con los titulares) y mantenido por
+las señales post_save/post_delete de Persona (y sus subclases) y Empleado,
+conectadas sólo a esos modelos (conectar(), desde AppConfig.ready), que
+además escriben el registro cuando cambia luxand_uuid: el valor cargado se
+recuerda en post_init y un guardado sin cambio de uuid no consulta el
+registro. Un sello de
+versión en la caché avisa a los demás workers que recarguen. Si un uuid no
+está en el mapa se busca por clave primaria y el resultado se agrega.
+
+    from administracion import identidades
+    ident = identidades.resolver(uuid)   # Identidad(tipo, id, nombre, subtipo) o None
+    por_uuid = identidades.resolver_varios(uuids)   # varios rostros de un cuadro
+    identidades.registrar_varios("persona", personas)   # tras un bulk_update de luxand_uuid
+"""
+import threading
+import uuid as uuidlib
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .models import Empleado, IdentidadFacial, Persona
+
+# tipo: "persona" | "empleado"; subtipo: Persona.tipo (P/I/F/V) o None
+Identidad = namedtuple("Identidad", "tipo id nombre subtipo")
+
+_K_VERSION = "identidades:version"
+# luxand_uuid no cargado (only()/defer()): el guardado no pudo cambiarlo
+_SIN_CARGAR = object()
+
+
+def _de_persona(p) -> Identidad:
+    return Identidad("persona", p.id, f"{p.nombre} {p.apellido}".strip(), p.tipo)
+
+
+def _de_empleado(e) -> Identidad:
+    return Identidad("empleado", e.id, f"{e.nombre} {e.apellido}".strip(), None)
+
+
+def _de_registro(fila) -> Identidad:
+    return _de_persona(fila.persona) if fila.tipo == "persona" else _de_empleado(fila.empleado)
+
+
+def _registros():
+    return IdentidadFacial.objects.select_related("persona", "empleado").only(
+        "uuid", "tipo", "persona__id", "persona__nombre", "persona__apellido", "persona__tipo",
+        "empleado__id", "empleado__nombre", "empleado__apellido",
+    )
+
+
+def coleccion_de(tipo: str) -> str:
+    if tipo == "empleado":
+        return getattr(settings, "LUXAND_COLLECTION_EMPLEADOS", "") or getattr(settings, "LUXAND_COLLECTION", "")
+    return getattr(settings, "LUXAND_COLLECTION", "")
+
+
+class IndiceIdentidades:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mapa = {}
+        self._por_objeto = {}
+        self._version = None
+        self._cargado = False
+
+    def _cargar(self, version):
+        mapa = {fila.uuid: _de_registro(fila) for fila in _registros().iterator(chunk_size=2000)}
+        self._mapa = mapa
+        self._por_objeto = {(i.tipo, i.id): u for u, i in mapa.items()}
+        self._version = version
+        self._cargado = True
+
+    def _vigente(self):
+        version = cache.get(_K_VERSION)
+        if not self._cargado or version != self._version:
+            with self._lock:
+                if not self._cargado or version != self._version:
+                    self._cargar(version)
+
+    def _publicar(self):
+        # Los demás procesos recargan; éste ya está al día
+        self._version = uuidlib.uuid4().hex
+        cache.set(_K_VERSION, self._version, timeout=None)
+
+    def resolver(self, uuid: str):
+        if not uuid:
+            return None
+        self._vigente()
+        ident = self._mapa.get(uuid)
+        if ident is not None:
+            return ident
+        # Registrado en otro proceso o fuera de las señales: búsqueda por clave primaria
+        fila = _registros().filter(uuid=uuid).first()
+        ident = _de_registro(fila) if fila else None
+        if ident is not None:
+            with self._lock:
+                self._mapa[uuid] = ident
+                self._por_objeto[(ident.tipo, ident.id)] = uuid
+        return ident
+
+    def resolver_varios(self, uuids) -> dict:
+        """
+        uuid -> Identidad | None para varios rostros de un mismo cuadro: un solo
+        chequeo de versión y, para los que falten en el mapa, una consulta por clave primaria.
+        """
+        uuids = [u for u in dict.fromkeys(uuids) if u]
+        if not uuids:
+            return {}
+        self._vigente()
+        mapa = self._mapa
+        resultado = {u: mapa.get(u) for u in uuids}
+        faltan = [u for u, ident in resultado.items() if ident is None]
+        if faltan:
+            for fila in _registros().filter(uuid__in=faltan):
+                resultado[fila.uuid] = _de_registro(fila)
+        nuevos = {u: resultado[u] for u in faltan if resultado[u] is not None} if faltan else {}
+        if nuevos:
+            with self._lock:
+                for u, ident in nuevos.items():
+                    self._mapa[u] = ident
+                    self._por_objeto[(ident.tipo, ident.id)] = u
+        return resultado
+
+    def actualizar(self, ident: Identidad, uuid):
+        clave = (ident.tipo, ident.id)
+        with self._lock:
+            if uuid and self._mapa.get(uuid, ident)[:2] != clave:
+                uuid = None  # el registro asigna ese uuid a otro titular
+            anterior = self._por_objeto.get(clave)
+            if anterior == uuid and (not uuid or self._mapa.get(uuid) == ident):
+                return  # guardado sin cambios en uuid ni nombre
+            if anterior is not None and self._mapa.get(anterior, ident)[:2] == clave:
+                self._mapa.pop(anterior, None)
+            self._por_objeto.pop(clave, None)
+            if uuid:
+                self._mapa[uuid] = ident
+                self._por_objeto[clave] = uuid
+            self._publicar()
+
+    def quitar(self, tipo: str, id_):
+        with self._lock:
+            anterior = self._por_objeto.pop((tipo, id_), None)
+            if anterior is not None:
+                self._mapa.pop(anterior, None)
+                self._publicar()
+
+    def invalidar(self):
+        """
+        Para cambios hechos sin señales (update()/bulk_update de luxand_uuid).
+        """
+        with self._lock:
+            self._cargado = False
+            cache.set(_K_VERSION, uuidlib.uuid4().hex, timeout=None)
+
+
+indice = IndiceIdentidades()
+
+
+def resolver(uuid: str):
+    return indice.resolver(uuid)
+
+
+def resolver_varios(uuids) -> dict:
+    return indice.resolver_varios(uuids)
+
+
+def invalidar():
+    indice.invalidar()
+
+
+# ---------- registro IdentidadFacial ----------
+
+def registrar(tipo: str, obj, coleccion: str = None):
+    """
+    Deja el registro de `obj` (Persona o Empleado) igual a su luxand_uuid:
+    alta, cambio de uuid o baja. Un uuid que ya es de otro titular no se reasigna.
+    Devuelve el uuid registrado para `obj` (o None).
+    """
+    uuid = obj.luxand_uuid or None
+    actuales = list(IdentidadFacial.objects.filter(**{tipo: obj}).values_list("uuid", flat=True))
+    if actuales == ([uuid] if uuid else []):
+        return uuid
+    IdentidadFacial.objects.filter(**{tipo: obj}).exclude(uuid=uuid).delete()
+    if not uuid:
+        return None
+    fila, creada = IdentidadFacial.objects.get_or_create(
+        uuid=uuid, defaults={"tipo": tipo, tipo: obj, "coleccion": coleccion_de(tipo) if coleccion is None else coleccion},
+    )
+    if not creada and getattr(fila, f"{tipo}_id") != obj.pk:
+        print(f"[Identidades] El uuid {uuid} ya es de {fila.tipo} {fila.persona_id or fila.empleado_id}; "
+              f"no se asigna a {tipo} {obj.pk}")
+        return None
+    return uuid
+
+
+def registrar_varios(tipo: str, objs, coleccion: str = None):
+    """
+    registrar() para un lote guardado con bulk_update (que no dispara señales).
+    """
+    objs = [o for o in objs if o.luxand_uuid]
+    if not objs:
+        return
+    coleccion = coleccion_de(tipo) if coleccion is None else coleccion
+    (IdentidadFacial.objects.filter(**{f"{tipo}__in": [o.pk for o in objs]})
+     .exclude(uuid__in=[o.luxand_uuid for o in objs]).delete())
+    IdentidadFacial.objects.bulk_create(
+        [IdentidadFacial(uuid=o.luxand_uuid, tipo=tipo, coleccion=coleccion, **{f"{tipo}_id": o.pk}) for o in objs],
+        ignore_conflicts=True,
+    )
+
+
+def olvidar(uuids):
+    """
+    Baja del registro (p.ej. uuids que el proveedor ya no tiene).
+    """
+    IdentidadFacial.objects.filter(uuid__in=list(uuids)).delete()
+
+
+def _al_cargar(sender, instance, **kwargs):
+    # Sin tocar el atributo: con luxand_uuid diferido dispararía una consulta
+    valor = instance.__dict__.get("luxand_uuid", _SIN_CARGAR)
+    instance._uuid_cargado = valor if valor is _SIN_CARGAR else (valor or None)
+
+
+def _al_guardar(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    tipo = "persona" if isinstance(instance, Persona) else "empleado"
+    ident = _de_persona(instance) if tipo == "persona" else _de_empleado(instance)
+    uuid = instance.__dict__.get("luxand_uuid", _SIN_CARGAR)
+    if uuid is _SIN_CARGAR:
+        return
+    # El registro sólo se consulta si el guardado cambió luxand_uuid
+    previo = None if created else getattr(instance, "_uuid_cargado", _SIN_CARGAR)
+    toca_uuid = update_fields is None or "luxand_uuid" in update_fields
+    instance._uuid_cargado = uuid or None
+    if toca_uuid and (uuid or None) != previo:
+        uuid = registrar(tipo, instance)
+    indice.actualizar(ident, uuid or None)
+
+
+def _al_borrar(sender, instance, **kwargs):
+    tipo = "persona" if isinstance(instance, Persona) else "empleado"
+    indice.quitar(tipo, instance.id)
+
+
+def conectar():
+    """
+    Conecta las señales a Persona (y sus subclases multi-tabla, que envían
+    sus propias señales) y a Empleado. Se llama desde AppConfig.ready.
+    """
+    for modelo in apps.get_models():
+        if not issubclass(modelo, (Persona, Empleado)):
+            continue
+        etiqueta = modelo._meta.label_lower
+        post_init.connect(_al_cargar, sender=modelo, dispatch_uid=f"identidades_post_init_{etiqueta}")
+        post_save.connect(_al_guardar, sender=modelo, dispatch_uid=f"identidades_post_save_{etiqueta}")
+        post_delete.connect(_al_borrar, sender=modelo, dispatch_uid=f"identidades_post_delete_{etiqueta}")
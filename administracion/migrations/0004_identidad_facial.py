@@ -0,0 +1,65 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def rellenar_identidades(apps, schema_editor):
+    """
+    Registro inicial desde luxand_uuid. Un uuid repetido queda con el primer
+    titular (las personas antes que los empleados, igual que el resolver).
+    """
+    Persona = apps.get_model('administracion', 'Persona')
+    Empleado = apps.get_model('administracion', 'Empleado')
+    IdentidadFacial = apps.get_model('administracion', 'IdentidadFacial')
+    col_personas = getattr(settings, 'LUXAND_COLLECTION', '')
+    col_empleados = getattr(settings, 'LUXAND_COLLECTION_EMPLEADOS', '') or col_personas
+    vistos = set()
+    lote = []
+    fuentes = (
+        ('persona', Persona, col_personas),
+        ('empleado', Empleado, col_empleados),
+    )
+    for tipo, modelo, coleccion in fuentes:
+        filas = (modelo.objects.exclude(luxand_uuid__isnull=True).exclude(luxand_uuid='')
+                 .order_by('id').values_list('id', 'luxand_uuid').iterator(chunk_size=500))
+        for id_, uuid in filas:
+            if uuid in vistos:
+                continue
+            vistos.add(uuid)
+            lote.append(IdentidadFacial(uuid=uuid, tipo=tipo, coleccion=coleccion, **{f'{tipo}_id': id_}))
+            if len(lote) >= 500:
+                IdentidadFacial.objects.bulk_create(lote)
+                lote = []
+    if lote:
+        IdentidadFacial.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administracion', '0003_luxand_uuid_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentidadFacial',
+            fields=[
+                ('uuid', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='UUID')),
+                ('tipo', models.CharField(choices=[('persona', 'Persona'), ('empleado', 'Empleado')], max_length=10, verbose_name='Tipo')),
+                ('coleccion', models.CharField(blank=True, default='', max_length=100, verbose_name='Colección')),
+                ('fecha_enrolamiento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Enrolamiento')),
+                ('empleado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='identidades_faciales', to='administracion.empleado', verbose_name='Empleado')),
+                ('persona', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='identidades_faciales', to='administracion.persona', verbose_name='Persona')),
+            ],
+            options={
+                'verbose_name': 'Identidad Facial',
+                'verbose_name_plural': 'Identidades Faciales',
+                'db_table': 'identidad_facial',
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('empleado__isnull', True), ('persona__isnull', False), ('tipo', 'persona')), models.Q(('empleado__isnull', False), ('persona__isnull', True), ('tipo', 'empleado')), _connector='OR'), name='identidad_facial_un_titular'), models.UniqueConstraint(condition=models.Q(('persona__isnull', False)), fields=('persona',), name='identidad_facial_persona_unica'), models.UniqueConstraint(condition=models.Q(('empleado__isnull', False)), fields=('empleado',), name='identidad_facial_empleado_unico')],
+            },
+        ),
+        migrations.RunPython(rellenar_identidades, migrations.RunPython.noop),
+    ]
@@ -40,7 +40,7 @@ class Persona(models.Model):
     fecha_registro = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Registro")
     CI = models.CharField(max_length=20, unique=True, verbose_name="Cédula de Identidad")
     fecha_nacimiento = models.DateField(verbose_name="Fecha de Nacimiento")
-    luxand_uuid = models.CharField(max_length=64, blank=True, null=True)
+    luxand_uuid = models.CharField(max_length=64, blank=True, null=True, db_index=True)
     
     class Meta:
         db_table = 'persona'
@@ -102,7 +102,7 @@ class Empleado(models.Model):
     sueldo = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Sueldo")
     imagen = models.URLField(blank=True, null=True, verbose_name='Imagen')
     fecha_registro = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Registro")
-    luxand_uuid = models.CharField(max_length=64, blank=True, null=True)
+    luxand_uuid = models.CharField(max_length=64, blank=True, null=True, db_index=True)
     
     # Relación con Cargo
     cargo = models.ForeignKey(
@@ -124,3 +124,51 @@ class Empleado(models.Model):
     def nombre_completo(self):
         return f"{self.nombre} {self.apellido}"
 
+
+
+class IdentidadFacial(models.Model):
+    """
+    Registro único de identidades enroladas en el reconocedor facial.
+    Cada UUID del proveedor (Luxand o el backend local) apunta a una Persona o
+    a un Empleado; el enrolamiento lo escribe y el reconocimiento lo lee con
+    una consulta por clave primaria. luxand_uuid en Persona/Empleado queda
+    como copia para compatibilidad.
+    """
+    TIPO_CHOICES = [
+        ('persona', 'Persona'),
+        ('empleado', 'Empleado'),
+    ]
+
+    uuid = models.CharField(max_length=64, primary_key=True, verbose_name="UUID")
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES, verbose_name="Tipo")
+    persona = models.ForeignKey(
+        Persona, on_delete=models.CASCADE, null=True, blank=True,
+        related_name="identidades_faciales", verbose_name="Persona"
+    )
+    empleado = models.ForeignKey(
+        Empleado, on_delete=models.CASCADE, null=True, blank=True,
+        related_name="identidades_faciales", verbose_name="Empleado"
+    )
+    coleccion = models.CharField(max_length=100, blank=True, default='', verbose_name="Colección")
+    fecha_enrolamiento = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Enrolamiento")
+
+    class Meta:
+        db_table = 'identidad_facial'
+        verbose_name = "Identidad Facial"
+        verbose_name_plural = "Identidades Faciales"
+        constraints = [
+            # Exactamente uno de persona/empleado, coherente con `tipo`
+            models.CheckConstraint(
+                condition=(models.Q(tipo='persona', persona__isnull=False, empleado__isnull=True)
+                           | models.Q(tipo='empleado', persona__isnull=True, empleado__isnull=False)),
+                name='identidad_facial_un_titular',
+            ),
+            # Una identidad vigente por persona / empleado
+            models.UniqueConstraint(fields=['persona'], condition=models.Q(persona__isnull=False),
+                                    name='identidad_facial_persona_unica'),
+            models.UniqueConstraint(fields=['empleado'], condition=models.Q(empleado__isnull=False),
+                                    name='identidad_facial_empleado_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.uuid} ({self.tipo})"
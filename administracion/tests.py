@@ -1,3 +1,139 @@
+import importlib
+from datetime import date
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
-# Create your tests here.
+from residencial.models import Visitante
+
+from . import identidades
+from .models import Cargo, Empleado, IdentidadFacial, Persona
+
+migracion_identidades = importlib.import_module("administracion.migrations.0004_identidad_facial")
+
+
+class IdentidadesBase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cargo = Cargo.objects.create(nombre="Guardia")
+
+    def setUp(self):
+        cache.clear()
+        identidades.invalidar()
+
+    def _persona(self, ci, luxand_uuid=None):
+        return Persona.objects.create(
+            nombre="Ana", apellido="Pérez", sexo="F", tipo="P", CI=ci,
+            fecha_nacimiento=date(1990, 1, 1), luxand_uuid=luxand_uuid,
+        )
+
+    def _empleado(self, ci, luxand_uuid=None):
+        return Empleado.objects.create(
+            nombre="Beto", apellido="Rojas", sexo="M", CI=ci, direccion="Calle 1",
+            sueldo=3000, cargo=self.cargo, luxand_uuid=luxand_uuid,
+        )
+
+
+class IdentidadFacialConstraintsTests(IdentidadesBase):
+
+    def _falla(self, **campos):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            IdentidadFacial.objects.create(**campos)
+
+    def test_exactamente_un_titular_coherente_con_tipo(self):
+        persona, empleado = self._persona("1"), self._empleado("2")
+
+        self._falla(uuid="u1", tipo="persona", persona=persona, empleado=empleado)
+        self._falla(uuid="u2", tipo="persona")
+        self._falla(uuid="u3", tipo="empleado", persona=persona)
+        self._falla(uuid="u4", tipo="persona", empleado=empleado)
+
+    def test_una_identidad_por_titular(self):
+        persona, empleado = self._persona("1"), self._empleado("2")
+        IdentidadFacial.objects.create(uuid="u1", tipo="persona", persona=persona)
+        IdentidadFacial.objects.create(uuid="u2", tipo="empleado", empleado=empleado)
+
+        self._falla(uuid="u3", tipo="persona", persona=persona)
+        self._falla(uuid="u4", tipo="empleado", empleado=empleado)
+
+
+class RellenarIdentidadesTests(IdentidadesBase):
+
+    def test_rellena_desde_luxand_uuid(self):
+        ana, otra, sin_uuid = self._persona("1"), self._persona("2"), self._persona("3")
+        beto, repetido = self._empleado("4"), self._empleado("5")
+        # update() no dispara señales: el registro queda vacío como antes de la migración
+        Persona.objects.filter(pk=ana.pk).update(luxand_uuid="u-ana")
+        Persona.objects.filter(pk=otra.pk).update(luxand_uuid="u-repetido")
+        Persona.objects.filter(pk=sin_uuid.pk).update(luxand_uuid="")
+        Empleado.objects.filter(pk=beto.pk).update(luxand_uuid="u-beto")
+        Empleado.objects.filter(pk=repetido.pk).update(luxand_uuid="u-repetido")
+        IdentidadFacial.objects.all().delete()
+
+        migracion_identidades.rellenar_identidades(apps, None)
+
+        filas = {f.uuid: (f.tipo, f.persona_id or f.empleado_id) for f in IdentidadFacial.objects.all()}
+        self.assertEqual(filas, {
+            "u-ana": ("persona", ana.pk),
+            "u-repetido": ("persona", otra.pk),
+            "u-beto": ("empleado", beto.pk),
+        })
+
+
+class RegistroPorSenalesTests(IdentidadesBase):
+
+    def _registro(self, **filtro):
+        return list(IdentidadFacial.objects.filter(**filtro).values_list("uuid", flat=True))
+
+    def test_alta_cambio_y_baja_de_uuid(self):
+        ana = self._persona("1", luxand_uuid="u1")
+        self.assertEqual(self._registro(persona=ana), ["u1"])
+
+        ana.luxand_uuid = "u2"
+        ana.save()
+        self.assertEqual(self._registro(persona=ana), ["u2"])
+        self.assertEqual(identidades.resolver("u2"), ("persona", ana.pk, "Ana Pérez", "P"))
+        self.assertIsNone(identidades.resolver("u1"))
+
+        ana.luxand_uuid = None
+        ana.save()
+        self.assertEqual(self._registro(persona=ana), [])
+
+    def test_subclases_y_empleados(self):
+        visitante = Visitante.objects.create(
+            nombre="Vale", apellido="Soto", sexo="F", CI="1",
+            fecha_nacimiento=date(1990, 1, 1), luxand_uuid="u-vis",
+        )
+        beto = self._empleado("2", luxand_uuid="u-emp")
+
+        self.assertEqual(self._registro(persona=visitante.pk), ["u-vis"])
+        self.assertEqual(self._registro(empleado=beto), ["u-emp"])
+        self.assertEqual(identidades.resolver("u-emp").tipo, "empleado")
+
+    def test_guardar_sin_cambiar_uuid_no_consulta_el_registro(self):
+        ana = Persona.objects.get(pk=self._persona("1", luxand_uuid="u1").pk)
+        ana.telefono = "555"
+
+        with self.assertNumQueries(1):
+            ana.save()
+
+    def test_uuid_de_otro_titular_no_se_reasigna(self):
+        ana = self._persona("1", luxand_uuid="u1")
+        beto = self._empleado("2", luxand_uuid="u1")
+
+        self.assertEqual(self._registro(uuid="u1"), ["u1"])
+        self.assertEqual(IdentidadFacial.objects.get(uuid="u1").persona_id, ana.pk)
+        self.assertEqual(self._registro(empleado=beto), [])
+        self.assertEqual(identidades.resolver("u1").tipo, "persona")
+
+    def test_borrar_el_titular(self):
+        ana = self._persona("1", luxand_uuid="u1")
+        self.assertIsNotNone(identidades.resolver("u1"))
+
+        ana.delete()
+
+        self.assertFalse(IdentidadFacial.objects.filter(uuid="u1").exists())
+        self.assertIsNone(identidades.resolver("u1"))
@@ -17,9 +17,14 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
-import requests
 from django.conf import settings
-from core.luxand import add_person, add_face, recognize
+from core.reconocedores import get_reconocedor
+from . import identidades
+from core.mixins import ImagenIngestaMixin
+from core import almacen, cache_reconocimiento, calidad_rostro, tiempos
+from core.resiliencia import ProveedorNoDisponible
+from core.normalizacion import normalizar
+from core.tiempos import CronometroMixin, cronometrar
 
 
 # Create your views here.
@@ -69,10 +74,11 @@ class RolViewSet(viewsets.ModelViewSet):
 
 # ==================== VISTAS PARA GESTIONAR PERSONAS ====================
 
-class PersonaViewSet(viewsets.ModelViewSet):
+class PersonaViewSet(CronometroMixin, ImagenIngestaMixin, viewsets.ModelViewSet):
     """
-    ViewSet para gestionar personas con subida de imágenes a ImgBB
+    ViewSet para gestionar personas con subida de imágenes a ImgBB (en segundo plano)
     """
+    imagen_variantes = ("rostro", "miniatura")
     queryset = Persona.objects.all()
     serializer_class = PersonaSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -90,76 +96,22 @@ class PersonaViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(tipo=tipo)
         return queryset
     
-    def create(self, request, *args, **kwargs):
+    def imagen_subida(self, instance):
         """
-        Crear persona con subida de imagen a ImgBB
+        Enrolar en Luxand cuando el worker de ingesta completa la imagen
         """
-        return self.handle_image_upload(request, super().create, *args, **kwargs)
-    
-    def update(self, request, *args, **kwargs):
-        """
-        Actualizar persona con subida de imagen a ImgBB
-        """
-        return self.handle_image_upload(request, super().update, *args, **kwargs)
-    
-    def handle_image_upload(self, request, action, *args, **kwargs):
-        """
-        Maneja la subida de imágenes a ImgBB API
-        """
-        imagen_file = request.FILES.get('imagen')
-        
-        if imagen_file:
-            try:
-                # Leer el archivo una sola vez y resetear el puntero
-                imagen_file.seek(0)
-                file_content = imagen_file.read()
-                imagen_file.seek(0)  # Resetear para que el serializer pueda leerlo
-                
-                # Subir imagen a ImgBB
-                url = "https://api.imgbb.com/1/upload"
-                payload = {"key": settings.IMGBB_API_KEY}
-                files = {"image": file_content}
-                
-                response = requests.post(url, payload, files=files)
-                
-                if response.status_code == 200:
-                    # Extraer URL de la imagen subida
-                    image_url = response.json()["data"]["url"]
-                    
-                    # Actualizar los datos de la request con la URL de la imagen
-                    data = request.data.copy()
-                    data["imagen"] = image_url
-                    # Remover el archivo de FILES para evitar problemas de serialización
-                    request._files = {}
-                    request._full_data = data
-                else:
-                    return Response(
-                        {"error": "Error al subir imagen a ImgBB"}, 
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-            except Exception as e:
-                return Response(
-                    {"error": f"Error al procesar imagen: {str(e)}"}, 
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-        else:
-            # Si no se sube nueva imagen en PUT/PATCH, mantener la existente
-            if request.method in ["PUT", "PATCH"]:
-                instance = self.get_object()
-                data = request.data.copy()
-                if not data.get("imagen"):
-                    data["imagen"] = instance.imagen
-                request._full_data = data
-        
-        return action(request, *args, **kwargs)
-    
+        self._enroll_luxand(instance)
+
     def perform_create(self, serializer):
         instance = serializer.save()
-        self._enroll_luxand(instance)
+        # Con archivo nuevo se enrola en imagen_subida: aquí la URL aún es la anterior
+        if not self.imagen_pendiente:
+            self._enroll_luxand(instance)
 
     def perform_update(self, serializer):
         instance = serializer.save()
-        self._enroll_luxand(instance)
+        if not self.imagen_pendiente:
+            self._enroll_luxand(instance)
 
     def _enroll_luxand(self, persona: Persona):
         # Solo si hay imagen (URL ImgBB) y aún no fue enrolada
@@ -168,7 +120,10 @@ class PersonaViewSet(viewsets.ModelViewSet):
         try:
             full_name = f"{persona.nombre} {persona.apellido}".strip() or f"persona-{persona.pk}"
             col = getattr(settings, "LUXAND_COLLECTION", "")
-            res = add_person(full_name, persona.imagen, col)
+            # Variante "rostro" (640px) si existe: menos bytes hacia Luxand
+            foto = almacen.url_variante(persona.imagen, "rostro") or persona.imagen
+            # Sin pasar el control de calidad no se gasta la llamada (FotoNoApta)
+            res = get_reconocedor().enrolar(full_name, calidad_rostro.preparar(foto), col)
             uuid = res.get("uuid")
             if uuid:
                 persona.luxand_uuid = uuid
@@ -178,18 +133,15 @@ class PersonaViewSet(viewsets.ModelViewSet):
             print(f"[Luxand] No se pudo enrolar Persona {persona.pk}: {e}")
 
     @action(detail=False, methods=["post"])
+    @cronometrar("reconocimiento_facial")
     def reconocimiento_facial(self, request):
         """
         Reconocimiento facial que acepta tanto image_url como archivo de imagen.
         COMPATIBLE CON WEB Y MÓVIL.
         """
-        image_url = request.data.get("image_url")
-        image_file = request.FILES.get("image")
-        
-        # Debug logs
-        print(f"=== DEBUG RECONOCIMIENTO FACIAL ===")
-        print(f"image_url recibido: {image_url}")
-        print(f"image_file recibido: {image_file}")
+        with tiempos.etapa("lectura"):
+            image_url = request.data.get("image_url")
+            image_file = request.FILES.get("image")
         
         # Validar que se proporcione al menos una imagen
         if not image_url and not image_file:
@@ -199,78 +151,29 @@ class PersonaViewSet(viewsets.ModelViewSet):
         gallery = getattr(settings, "LUXAND_COLLECTION", "")
         
         try:
-            # CASO 1: Si viene image_url (WEB) - FUNCIONA EXACTAMENTE IGUAL QUE ANTES
-            if image_url and not image_file:
-                print("DEBUG - Modo WEB: Usando image_url directamente")
-                # Llamar a Luxand directamente con la URL
-                luxand_url = "https://api.luxand.cloud/photo/search/v2"
-                luxand_headers = {"token": settings.LUXAND_TOKEN}
-                luxand_data = {
-                    "photo": image_url,
-                    "gallery": gallery
-                }
-                
-                luxand_response = requests.post(luxand_url, headers=luxand_headers, data=luxand_data, timeout=30)
-                
-                if luxand_response.status_code != 200:
-                    return Response({"detail": f"Error en Luxand: {luxand_response.text}"}, status=500)
-                
-                res = luxand_response.json()
-            
-            # CASO 2: Si viene archivo (MÓVIL) - NUEVA FUNCIONALIDAD
-            elif image_file:
-                print("DEBUG - Modo MÓVIL: Subiendo archivo a ImgBB")
-                # Subir imagen a ImgBB
-                url = "https://api.imgbb.com/1/upload"
-                payload = {"key": settings.IMGBB_API_KEY}
-                files = {"image": image_file}
-                
-                response = requests.post(url, payload, files=files)
-                print(f"DEBUG - ImgBB response status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    image_url = response.json()["data"]["url"]
-                    print(f"DEBUG - ImgBB URL obtenida: {image_url}")
-                    
-                    # Llamar a Luxand directamente con la URL
-                    luxand_url = "https://api.luxand.cloud/photo/search/v2"
-                    luxand_headers = {"token": settings.LUXAND_TOKEN}
-                    luxand_data = {
-                        "photo": image_url,
-                        "gallery": gallery
-                    }
-                    
-                    luxand_response = requests.post(luxand_url, headers=luxand_headers, data=luxand_data, timeout=30)
-                    
-                    if luxand_response.status_code != 200:
-                        return Response({"detail": f"Error en Luxand: {luxand_response.text}"}, status=500)
-                    
-                    res = luxand_response.json()
-                else:
-                    print(f"DEBUG - Error ImgBB: {response.text}")
-                    return Response({"detail": "Error al subir imagen a ImgBB"}, status=500)
-            
-            # CASO 3: Si vienen ambos (no debería pasar, pero por seguridad)
+            if image_file:
+                # MÓVIL: archivo normalizado al perfil "rostro" (640px)
+                try:
+                    with tiempos.etapa("lectura"):
+                        fuente = normalizar(image_file, "rostro")
+                except ValueError as e:
+                    return Response({"detail": f"Imagen inválida: {e}"}, status=400)
             else:
-                print("DEBUG - Ambos parámetros presentes, usando image_url")
-                luxand_url = "https://api.luxand.cloud/photo/search/v2"
-                luxand_headers = {"token": settings.LUXAND_TOKEN}
-                luxand_data = {
-                    "photo": image_url,
-                    "gallery": gallery
-                }
-                
-                luxand_response = requests.post(luxand_url, headers=luxand_headers, data=luxand_data, timeout=30)
-                
-                if luxand_response.status_code != 200:
-                    return Response({"detail": f"Error en Luxand: {luxand_response.text}"}, status=500)
-                
-                res = luxand_response.json()
+                # WEB: se usa image_url directamente
+                fuente = image_url
+
+            # Backend configurado (Luxand o índice local); cuadros casi idénticos
+            # dentro del TTL reutilizan el resultado anterior
+            rec = get_reconocedor()
+            try:
+                with tiempos.etapa("reconocedor"):
+                    res = cache_reconocimiento.reconocer(
+                        fuente, f"{rec.nombre}:{gallery}", lambda: rec.reconocer(fuente, gallery)
+                    )
+            except ValueError as e:
+                return Response({"detail": f"Error en reconocimiento: {e}"}, status=500)
             
             # PROCESAR RESPUESTA - MANEJAR TANTO LISTA COMO DICCIONARIO
-            print(f"DEBUG - Tipo de respuesta: {type(res)}")
-            print(f"DEBUG - Contenido de respuesta: {res}")
-            
             # Si res es una lista, usar directamente
             if isinstance(res, list):
                 candidates = res
@@ -290,46 +193,37 @@ class PersonaViewSet(viewsets.ModelViewSet):
             uuid = best.get("uuid") or best.get("subject") or best.get("person_uuid")
             sim = best.get("similarity") or best.get("confidence") or best.get("probability") or 0.0
             
-            print(f"DEBUG - Best candidate: {best}")
-            print(f"DEBUG - UUID: {uuid}")
-            print(f"DEBUG - Similarity before normalization: {sim}")
-            
             # Normalizar similitud si viene 0..100
             if isinstance(sim, (int, float)) and sim > 1.0:
                 sim = sim / 100.0
             
-            print(f"DEBUG - Similarity after normalization: {sim}")
-            print(f"DEBUG - Threshold: {umbral}")
-            
-            persona = None
-            if uuid:
-                persona = Persona.objects.filter(luxand_uuid=uuid).first()
-                print(f"DEBUG - Persona found: {persona}")
+            # Sólo personas (no empleados), resueltas desde el índice en memoria
+            with tiempos.etapa("identidad"):
+                ident = identidades.resolver(uuid) if uuid else None
+            persona = ident if ident and ident.tipo == "persona" else None
             
             # Lógica más permisiva: si la confianza es muy alta (>= 0.9), ser más flexible
             if sim >= 0.9:
                 # Con muy alta confianza, aceptar incluso si no encuentra la persona exacta
                 ok = True
-                print(f"DEBUG - Alta confianza detectada ({sim:.3f} >= 0.9), aceptando reconocimiento")
             else:
                 # Lógica normal para confianza media/baja
                 ok = bool(persona) and sim >= umbral
-                print(f"DEBUG - Confianza normal ({sim:.3f} < 0.9), verificando persona y umbral")
-            
-            print(f"DEBUG - OK result: {ok} (persona: {bool(persona)}, sim >= umbral: {sim >= umbral})")
             
             return Response({
                 "ok": ok,
                 "persona_id": persona.id if persona else None,
                 "similaridad": round(float(sim), 4),
                 "uuid": uuid,
-                "nombre": persona.nombre_completo if persona else None,
-                "tipo": persona.tipo if persona else None,
+                "nombre": persona.nombre if persona else None,
+                "tipo": persona.subtipo if persona else None,
                 "raw": res
             })
             
+        except ProveedorNoDisponible as e:
+            return Response(e.como_respuesta(), status=503, headers={"Retry-After": str(e.reintentar_en)})
         except Exception as e:
-            print(f"DEBUG - Error general: {e}")
+            print(f"[Reconocimiento] Error en reconocimiento facial: {e}")
             return Response({"detail": f"Error en reconocimiento: {e}"}, status=500)
 
     @action(detail=True, methods=["post"])
@@ -345,8 +239,11 @@ class PersonaViewSet(viewsets.ModelViewSet):
         if not image_url:
             return Response({"detail": "image_url es requerido"}, status=400)
         try:
-            res = add_face(persona.luxand_uuid, image_url)
+            foto = calidad_rostro.preparar(image_url)
+            res = get_reconocedor().agregar_rostro(persona.luxand_uuid, foto)
             return Response({"ok": True, "raw": res})
+        except calidad_rostro.FotoNoApta as e:
+            return Response(e.como_respuesta(), status=400)
         except Exception as e:
             return Response({"detail": f"Error al agregar foto: {e}"}, status=500)
 
@@ -365,10 +262,11 @@ class CargoViewSet(viewsets.ModelViewSet):
     ordering = ['nombre']
 
 
-class EmpleadoViewSet(viewsets.ModelViewSet):
+class EmpleadoViewSet(ImagenIngestaMixin, viewsets.ModelViewSet):
     """
-    ViewSet para gestionar empleados con subida de imágenes a ImgBB
+    ViewSet para gestionar empleados con subida de imágenes a ImgBB (en segundo plano)
     """
+    imagen_variantes = ("rostro", "miniatura")
     queryset = Empleado.objects.select_related('cargo').all()
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = [
@@ -410,75 +308,22 @@ class EmpleadoViewSet(viewsets.ModelViewSet):
         
         return queryset
     
-    def create(self, request, *args, **kwargs):
+    def imagen_subida(self, instance):
         """
-        Crear empleado con subida de imagen a ImgBB
-        """
-        return self.handle_image_upload(request, super().create, *args, **kwargs)
-    
-    def update(self, request, *args, **kwargs):
-        """
-        Actualizar empleado con subida de imagen a ImgBB
-        """
-        return self.handle_image_upload(request, super().update, *args, **kwargs)
-    
-    def handle_image_upload(self, request, action, *args, **kwargs):
+        Enrolar en Luxand cuando el worker de ingesta completa la imagen
         """
-        Maneja la subida de imágenes a ImgBB API
-        """
-        imagen_file = request.FILES.get('imagen')
-        
-        if imagen_file:
-            try:
-                # Leer el archivo una sola vez y resetear el puntero
-                imagen_file.seek(0)
-                file_content = imagen_file.read()
-                imagen_file.seek(0)  # Resetear para que el serializer pueda leerlo
-                
-                # Subir imagen a ImgBB
-                url = "https://api.imgbb.com/1/upload"
-                payload = {"key": settings.IMGBB_API_KEY}
-                files = {"image": file_content}
-                
-                response = requests.post(url, payload, files=files)
-                
-                if response.status_code == 200:
-                    # Extraer URL de la imagen subida
-                    image_url = response.json()["data"]["url"]
-                    
-                    # Actualizar los datos de la request con la URL de la imagen
-                    data = request.data.copy()
-                    data["imagen"] = image_url
-                    # Remover el archivo de FILES para evitar problemas de serialización
-                    request._files = {}
-                    request._full_data = data
-                else:
-                    return Response(
-                        {"error": "Error al subir imagen a ImgBB"}, 
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-            except Exception as e:
-                return Response(
-                    {"error": f"Error al procesar imagen: {str(e)}"}, 
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-        else:
-            # Si no se sube nueva imagen en PUT/PATCH, mantener la existente
-            if request.method in ["PUT", "PATCH"]:
-                instance = self.get_object()
-                data = request.data.copy()
-                if not data.get("imagen"):
-                    data["imagen"] = instance.imagen
-                request._full_data = data
-        
-        return action(request, *args, **kwargs)
+        self._enroll_luxand_empleado(instance)
+
     def perform_create(self, serializer):
         instance = serializer.save()
-        self._enroll_luxand_empleado(instance)
+        # Con archivo nuevo se enrola en imagen_subida: aquí la URL aún es la anterior
+        if not self.imagen_pendiente:
+            self._enroll_luxand_empleado(instance)
 
     def perform_update(self, serializer):
         instance = serializer.save()
-        self._enroll_luxand_empleado(instance)
+        if not self.imagen_pendiente:
+            self._enroll_luxand_empleado(instance)
 
     def _enroll_luxand_empleado(self, empleado: Empleado):
         # Solo si hay imagen (URL ImgBB) y aún no fue enrolado
@@ -489,7 +334,9 @@ class EmpleadoViewSet(viewsets.ModelViewSet):
             # Puedes usar la MISMA colección que Persona (p.ej. settings.LUXAND_COLLECTION)
             # o una específica para empleados (p.ej. settings.LUXAND_COLLECTION_EMPLEADOS)
             col = getattr(settings, "LUXAND_COLLECTION_EMPLEADOS", getattr(settings, "LUXAND_COLLECTION", ""))
-            res = add_person(full_name, empleado.imagen, col)
+            foto = almacen.url_variante(empleado.imagen, "rostro") or empleado.imagen
+            # Sin pasar el control de calidad no se gasta la llamada (FotoNoApta)
+            res = get_reconocedor().enrolar(full_name, calidad_rostro.preparar(foto), col)
             uuid = res.get("uuid")
             if uuid:
                 empleado.luxand_uuid = uuid
@@ -508,8 +355,11 @@ class EmpleadoViewSet(viewsets.ModelViewSet):
         if not image_url:
             return Response({"detail": "image_url es requerido"}, status=400)
         try:
-            res = add_face(empleado.luxand_uuid, image_url)
+            foto = calidad_rostro.preparar(image_url)
+            res = get_reconocedor().agregar_rostro(empleado.luxand_uuid, foto)
             return Response({"ok": True, "raw": res})
+        except calidad_rostro.FotoNoApta as e:
+            return Response(e.como_respuesta(), status=400)
         except Exception as e:
             return Response({"detail": f"Error al agregar foto: {e}"}, status=500)
 
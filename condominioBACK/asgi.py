@@ -14,3 +14,16 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'condominioBACK.settings')
 
 application = get_asgi_application()
+
+# Padrón de placas en memoria listo antes de la primera lectura de la barrera
+try:
+    from residencial import indice_placas
+    indice_placas.calentar()
+except Exception as e:
+    print(f"[Placas] No se pudo precargar el padrón: {e}")
+
+try:
+    from core import ingesta
+    ingesta.arrancar_barrido()
+except Exception as e:
+    print(f"[Ingesta] No se pudo iniciar el barrido de trabajos pendientes: {e}")
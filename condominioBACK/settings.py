@@ -15,6 +15,7 @@ from decouple import config
 import dj_database_url
 from datetime import timedelta
 import os
+import tempfile
 import cloudinary
 
 
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'corsheaders',
     'rest_framework_simplejwt.token_blacklist',
+    'core',
     'administracion',
     'finanzas',
     'residencial',
@@ -98,6 +100,25 @@ DATABASES = {
 }
 
 
+# Caché compartida entre workers: además de cachés guarda estado de coordinación
+# (cortacircuitos, sellos de versión de los índices, tickets ALPR, decisiones del
+# debounce, trabajos en segundo plano, candados). Por defecto en disco local: la
+# comparten todos los workers del mismo contenedor. Los backends de disco, memoria
+# y BD purgan un tercio de las entradas al pasar de MAX_ENTRIES (300 si no se
+# indica), así que se fija un tope realista; con Redis
+# (django.core.cache.backends.redis.RedisCache) no hay purga.
+CACHE_BACKEND = config("CACHE_BACKEND", default='django.core.cache.backends.filebased.FileBasedCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config("CACHE_LOCATION", default=os.path.join(tempfile.gettempdir(), 'condominio_cache')),
+    }
+}
+if CACHE_BACKEND.rsplit('.', 1)[0] in ('django.core.cache.backends.filebased', 'django.core.cache.backends.locmem',
+                                       'django.core.cache.backends.db'):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config("CACHE_MAX_ENTRIES", default=20000, cast=int)}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -159,6 +180,18 @@ SIMPLE_JWT = {
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Subidas: por encima de este tamaño Django escribe el archivo en disco
+# (TemporaryFileUploadHandler) en lugar de mantenerlo en memoria.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = config("FILE_UPLOAD_MAX_MEMORY_SIZE", default=256 * 1024, cast=int)
+FILE_UPLOAD_TEMP_DIR = config("FILE_UPLOAD_TEMP_DIR", default=None)
+
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 CORS_ALLOWED_ORIGINS = [
@@ -177,10 +210,52 @@ CSRF_TRUSTED_ORIGINS = [
 # Permitir que el navegador envíe cookies en peticiones cross-origin
 CORS_ALLOW_CREDENTIALS = False
 
+# Cliente HTTP saliente compartido (core.http): timeouts en segundos
+HTTP_TIMEOUT_CONEXION = config("HTTP_TIMEOUT_CONEXION", default=3.05, cast=float)
+HTTP_TIMEOUT_LECTURA = config("HTTP_TIMEOUT_LECTURA", default=30, cast=float)
+HTTP_POOL_MAXSIZE = config("HTTP_POOL_MAXSIZE", default=10, cast=int)
+# Reintentos con backoff exponencial (y jitter) del cliente async ante 429/5xx
+HTTP_REINTENTOS = config("HTTP_REINTENTOS", default=2, cast=int)
+HTTP_BACKOFF = config("HTTP_BACKOFF", default=0.5, cast=float)
+
+# Cortacircuitos y bulkhead por proveedor (core.resiliencia)
+CB_UMBRAL_FALLOS = config("CB_UMBRAL_FALLOS", default=5, cast=int)
+CB_VENTANA = config("CB_VENTANA", default=30, cast=int)
+CB_ENFRIAMIENTO = config("CB_ENFRIAMIENTO", default=30, cast=int)
+PROVEEDOR_MAX_CONCURRENCIA = config("PROVEEDOR_MAX_CONCURRENCIA", default=8, cast=int)
+PROVEEDOR_ESPERA_CUPO = config("PROVEEDOR_ESPERA_CUPO", default=0.5, cast=float)
+
 # Configuración de ImgBB API
 IMGBB_API_KEY = config('IMGBB_API_KEY', default='')
+# Ingesta de imágenes en segundo plano (core.ingesta)
+IMAGEN_INGESTA_WORKERS = config("IMAGEN_INGESTA_WORKERS", default=4, cast=int)
+IMAGEN_INGESTA_COLA_MAX = config("IMAGEN_INGESTA_COLA_MAX", default=64, cast=int)
+# Carpeta de los archivos pendientes de subir (compartida por los workers) y
+# segundos entre barridos de trabajos sin dueño (0 = sólo `manage.py recuperar_imagenes`)
+IMAGEN_INGESTA_DIR = config("IMAGEN_INGESTA_DIR", default="")
+IMAGEN_INGESTA_BARRIDO = config("IMAGEN_INGESTA_BARRIDO", default=30, cast=int)
+# Almacén de imágenes (core.almacen): "imgbb", "cloudinary" o "local"
+IMAGEN_BACKEND = config("IMAGEN_BACKEND", default="imgbb")
+IMAGEN_LOCAL_BASE_URL = config("IMAGEN_LOCAL_BASE_URL", default="http://127.0.0.1:8000")
+# Hosts desde los que el servidor puede descargar fotos (ImgBB, Cloudinary; separados por comas)
+IMAGEN_HOSTS_PERMITIDOS = config("IMAGEN_HOSTS_PERMITIDOS", default="i.ibb.co,res.cloudinary.com")
 PLATE_TOKEN = config("PLATE_TOKEN")
 PLATE_REGIONS = config("PLATE_REGIONS", default="bo")
+# Recorte de la placa guardado en el almacén: "ninguno", "sin_coincidencia" o "todos"
+ALPR_RECORTES = config("ALPR_RECORTES", default="ninguno")
+# Debounce del ALPR: segundos por defecto y por cámara ("camara:segundos,..."; 0 desactiva)
+ALPR_DEBOUNCE_SEGUNDOS = config("ALPR_DEBOUNCE_SEGUNDOS", default=10, cast=int)
+ALPR_DEBOUNCE_CAMARAS = config("ALPR_DEBOUNCE_CAMARAS", default="")
+ALPR_DEBOUNCE_DISTANCIA = config("ALPR_DEBOUNCE_DISTANCIA", default=4, cast=int)
+# Días que se conservan las lecturas de placas crudas (manage.py podar_lecturas)
+LECTURAS_RETENCION_DIAS = config("LECTURAS_RETENCION_DIAS", default=90, cast=int)
+# Lotes ALPR: cuadros por petición y llamadas simultáneas al proveedor
+ALPR_LOTE_MAX = config("ALPR_LOTE_MAX", default=8, cast=int)
+ALPR_LOTE_WORKERS = config("ALPR_LOTE_WORKERS", default=5, cast=int)
+# Cola de ingesta ALPR (seguridad_IA.cola_alpr): política "ultimo_gana" o "descartar_antiguo"
+ALPR_COLA_WORKERS = config("ALPR_COLA_WORKERS", default=2, cast=int)
+ALPR_COLA_MAX = config("ALPR_COLA_MAX", default=32, cast=int)
+ALPR_COLA_POLITICA = config("ALPR_COLA_POLITICA", default="ultimo_gana")
 
 CLOUDINARY_CLOUD_NAME = config("CLOUDINARY_CLOUD_NAME", default="")
 CLOUDINARY_API_KEY = config("CLOUDINARY_API_KEY", default="")
@@ -198,4 +273,39 @@ FRONTEND_URL = config("FRONTEND_URL", default="http://127.0.0.1:5173")
 # Configuración de Luxand API
 LUXAND_TOKEN = config("LUXAND_TOKEN")
 LUXAND_COLLECTION = config("LUXAND_COLLECTION", "")
-LUXAND_COLLECTION_EMPLEADOS = config("LUXAND_COLLECTION_EMPLEADOS", "")
\ No newline at end of file
+LUXAND_COLLECTION_EMPLEADOS = config("LUXAND_COLLECTION_EMPLEADOS", "")
+# Backend de reconocimiento facial: "luxand" (nube) o "local" (índice NumPy)
+RECONOCEDOR_BACKEND = config("RECONOCEDOR_BACKEND", default="luxand")
+# Ruta a fn(imagen_pil) -> vector para el backend local (obligatoria si RECONOCEDOR_BACKEND = "local")
+RECONOCEDOR_LOCAL_EXTRACTOR = config("RECONOCEDOR_LOCAL_EXTRACTOR", default="")
+# Enrolamiento masivo (seguridad_IA.enrolamiento): hilos, llamadas/s al proveedor, UUIDs por bulk_update
+ENROLAMIENTO_WORKERS = config("ENROLAMIENTO_WORKERS", default=4, cast=int)
+ENROLAMIENTO_TASA = config("ENROLAMIENTO_TASA", default=5.0, cast=float)
+ENROLAMIENTO_LOTE = config("ENROLAMIENTO_LOTE", default=50, cast=int)
+# Reconciliación de la galería (manage.py reconciliar_galeria): páginas en vuelo y tamaño de página
+RECONCILIACION_WORKERS = config("RECONCILIACION_WORKERS", default=4, cast=int)
+RECONCILIACION_POR_PAGINA = config("RECONCILIACION_POR_PAGINA", default=500, cast=int)
+# Caché de reconocimiento por hash perceptual (core.cache_reconocimiento)
+RECONOCIMIENTO_CACHE_TTL = config("RECONOCIMIENTO_CACHE_TTL", default=10, cast=int)
+RECONOCIMIENTO_CACHE_DISTANCIA = config("RECONOCIMIENTO_CACHE_DISTANCIA", default=3, cast=int)
+# Tiempos por etapa de las vistas de la barrera (core.tiempos): muestras por etapa
+# en el histograma y umbral (ms) a partir del cual se registra la petición lenta
+TIEMPOS_MUESTRAS = config("TIEMPOS_MUESTRAS", default=2048, cast=int)
+TIEMPOS_LENTO_MS = config("TIEMPOS_LENTO_MS", default=2000, cast=int)
+# Escritura diferida de LecturaPlaca (seguridad_IA.buffer_lecturas): lote máximo
+# (0 = INSERT en la petición), segundos entre lotes y carpeta del spool durable
+LECTURAS_BUFFER_MAX = config("LECTURAS_BUFFER_MAX", default=200, cast=int)
+LECTURAS_BUFFER_SEGUNDOS = config("LECTURAS_BUFFER_SEGUNDOS", default=1.0, cast=float)
+LECTURAS_SPOOL_DIR = config("LECTURAS_SPOOL_DIR", default="")
+# Eventos de acceso para los guardias (seguridad_IA.eventos, GET /api/eventos/):
+# segundos entre consultas, latido SSE, eventos reenviados al reconectar y retención
+EVENTOS_INTERVALO = config("EVENTOS_INTERVALO", default=0.5, cast=float)
+EVENTOS_LATIDO = config("EVENTOS_LATIDO", default=15, cast=int)
+EVENTOS_REENVIO_MAX = config("EVENTOS_REENVIO_MAX", default=500, cast=int)
+EVENTOS_RETENCION_DIAS = config("EVENTOS_RETENCION_DIAS", default=7, cast=int)
+
+# Control de calidad local de fotos antes de enrolarlas (core.calidad_rostro)
+CALIDAD_ROSTRO_ACTIVO = config("CALIDAD_ROSTRO_ACTIVO", default=True, cast=bool)
+CALIDAD_MIN_LADO = config("CALIDAD_MIN_LADO", default=160, cast=int)
+CALIDAD_NITIDEZ_MIN = config("CALIDAD_NITIDEZ_MIN", default=40.0, cast=float)
+CALIDAD_ROSTRO_MIN = config("CALIDAD_ROSTRO_MIN", default=0.02, cast=float)
\ No newline at end of file
@@ -14,6 +14,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
@@ -22,5 +24,9 @@ urlpatterns = [
     path('api/', include('residencial.urls')),
     path('api/', include('seguridad_IA.urls')),
     path('api/', include('finanzas.urls')),
+    path('api/', include('core.urls')),
     path('', admin.site.urls),
 ]
+
+# Sirve las imágenes del backend "local" de core.almacen en desarrollo
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
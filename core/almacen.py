@@ -0,0 +1,198 @@
+# core/almacen.py
+"""
+Almacén de imágenes direccionado por contenido.
+
+Cada imagen se identifica por su SHA-256; si el backend activo ya tiene ese
+hash, se reutiliza la URL guardada en ImagenAlmacenada y no se vuelve a subir.
+Backends disponibles (settings.IMAGEN_BACKEND): "imgbb", "cloudinary", "local".
+
+El contenido se procesa siempre como archivo (hash y envío por bloques), de
+modo que la memoria usada no depende del tamaño de la imagen.
+
+Con `perfiles`, la imagen se normaliza (core.normalizacion) antes de subirla y
+se guardan además sus variantes (VarianteImagen), p.ej. "rostro" y "miniatura".
+"""
+import hashlib
+import os
+import shutil
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+
+import cloudinary.uploader
+from django.conf import settings
+from django.db import IntegrityError
+
+from .http import sesion
+from .models import ImagenAlmacenada, VarianteImagen
+from .multipart import MultipartStream, BLOQUE
+from .normalizacion import normalizar
+
+
+class BackendImagenes:
+    """
+    Interfaz de backend: recibe el archivo (posicionado al inicio) y su hash,
+    devuelve la URL pública.
+    """
+    nombre = ""
+
+    def subir(self, archivo, sha256: str) -> str:
+        raise NotImplementedError
+
+
+class ImgBBBackend(BackendImagenes):
+    nombre = "imgbb"
+    url = "https://api.imgbb.com/1/upload"
+
+    def subir(self, archivo, sha256):
+        stream = MultipartStream(
+            {"key": settings.IMGBB_API_KEY, "name": sha256}, "image", archivo, f"{sha256}.jpg"
+        )
+        r = sesion("imgbb").post(self.url, data=stream, headers={"Content-Type": stream.content_type}, timeout=30)
+        if r.status_code != 200:
+            raise ValueError(f"Error al subir imagen a ImgBB ({r.status_code}): {r.text[:200]}")
+        return r.json()["data"]["url"]
+
+
+class CloudinaryBackend(BackendImagenes):
+    nombre = "cloudinary"
+
+    def subir(self, archivo, sha256):
+        res = cloudinary.uploader.upload(
+            file=archivo,
+            resource_type="image",
+            public_id=f"imagenes/{sha256}",
+            overwrite=False,
+            unique_filename=False,
+        )
+        return res.get("secure_url")
+
+
+class LocalBackend(BackendImagenes):
+    """
+    Guarda en MEDIA_ROOT/imagenes/ (útil para pruebas sin red).
+    """
+    nombre = "local"
+
+    def subir(self, archivo, sha256):
+        relativo = Path("imagenes") / sha256[:2] / f"{sha256}.jpg"
+        destino = Path(settings.MEDIA_ROOT) / relativo
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        if not destino.exists():
+            with open(destino, "wb") as salida:
+                shutil.copyfileobj(archivo, salida, BLOQUE)
+        base = getattr(settings, "IMAGEN_LOCAL_BASE_URL", "").rstrip("/")
+        return f"{base}{settings.MEDIA_URL}{relativo.as_posix()}"
+
+
+BACKENDS = {b.nombre: b for b in (ImgBBBackend, CloudinaryBackend, LocalBackend)}
+
+
+def get_backend(nombre: str = "") -> BackendImagenes:
+    nombre = nombre or getattr(settings, "IMAGEN_BACKEND", "imgbb")
+    if nombre not in BACKENDS:
+        raise ValueError(f"Backend de imágenes desconocido: {nombre}")
+    return BACKENDS[nombre]()
+
+
+@contextmanager
+def _abrir(fuente):
+    """
+    Acepta bytes, una ruta local o un objeto archivo (UploadedFile, TemporaryFile...).
+    """
+    if isinstance(fuente, (bytes, bytearray)):
+        yield BytesIO(fuente)
+    elif isinstance(fuente, (str, Path)):
+        with open(fuente, "rb") as f:
+            yield f
+    else:
+        fuente.seek(0)
+        yield fuente
+
+
+def calcular_sha256(archivo) -> str:
+    """
+    Hash por bloques; deja el archivo posicionado al inicio.
+    """
+    h = hashlib.sha256()
+    archivo.seek(0)
+    for bloque in iter(lambda: archivo.read(BLOQUE), b""):
+        h.update(bloque)
+    archivo.seek(0)
+    return h.hexdigest()
+
+
+def _tamano(archivo) -> int:
+    tamano = archivo.seek(0, os.SEEK_END)
+    archivo.seek(0)
+    return tamano
+
+
+def _registrar(be, archivo, sha256) -> ImagenAlmacenada:
+    url = be.subir(archivo, sha256)
+    try:
+        return ImagenAlmacenada.objects.create(sha256=sha256, backend=be.nombre, url=url, tamano=_tamano(archivo))
+    except IntegrityError:
+        # Otro worker subió el mismo contenido en paralelo; se usa su registro
+        return ImagenAlmacenada.objects.get(sha256=sha256, backend=be.nombre)
+
+
+def guardar(fuente, backend: str = "", perfiles=()) -> str:
+    """
+    Devuelve la URL de la imagen, subiéndola sólo si el hash no está en el almacén.
+    `fuente` puede ser bytes, una ruta o un objeto archivo.
+    Con `perfiles` se sube la versión normalizada y las variantes que falten.
+    """
+    be = get_backend(backend)
+    with _abrir(fuente) as archivo:
+        sha256 = calcular_sha256(archivo)
+        imagen = ImagenAlmacenada.objects.filter(sha256=sha256, backend=be.nombre).first()
+
+        if imagen is None:
+            original = archivo
+            if perfiles:
+                try:
+                    original = normalizar(archivo, "original")
+                except ValueError as e:
+                    # No es una imagen que Pillow pueda leer: se sube tal cual, sin variantes
+                    print(f"[Almacén] Sin normalizar {sha256[:12]}: {e}")
+                    perfiles = ()
+            imagen = _registrar(be, original, sha256)
+
+        existentes = set(imagen.variantes.values_list("perfil", flat=True)) if perfiles else set()
+        for perfil in perfiles:
+            if perfil in existentes:
+                continue
+            variante = normalizar(archivo, perfil)
+            url = be.subir(variante, f"{sha256}-{perfil}")
+            VarianteImagen.objects.get_or_create(
+                original=imagen, perfil=perfil,
+                defaults={"url": url, "tamano": _tamano(variante)},
+            )
+    return imagen.url
+
+
+def url_variante(url: str, perfil: str):
+    """
+    URL de la variante `perfil` de una imagen del almacén (None si no existe).
+    """
+    if not url:
+        return None
+    return (VarianteImagen.objects
+            .filter(original__url=url, perfil=perfil)
+            .values_list("url", flat=True)
+            .first())
+
+
+def variantes_de(urls, perfil: str) -> dict:
+    """
+    {url original: url variante} para un conjunto de URLs, en una sola consulta.
+    """
+    urls = [u for u in set(urls) if u]
+    if not urls:
+        return {}
+    return dict(
+        VarianteImagen.objects
+        .filter(original__url__in=urls, perfil=perfil)
+        .values_list("original__url", "url")
+    )
@@ -0,0 +1,157 @@
+# core/cache_reconocimiento.py
+"""
+Caché de resultados de reconocimiento facial de vida corta.
+
+Las tablets de la portería suelen mandar el mismo cuadro (o uno casi igual)
+varias veces en pocos segundos. La clave es un hash perceptual (dHash de 64
+bits) de la imagen normalizada + la galería: si un cuadro reciente está a
+DISTANCIA_MAX bits o menos, se devuelve su resultado sin llamar a Luxand.
+Para image_url la clave es la URL exacta.
+
+Sólo se cachean los resultados sin coincidencias (o con error): el rostro
+es una parte pequeña del cuadro y el hash lo domina el fondo, así que otra
+persona frente a la misma cámara podría heredar un reconocimiento positivo.
+Repetir una negativa es seguro; un positivo siempre pasa por el proveedor.
+
+Los contadores de aciertos/fallos viven en la caché de Django (compartidos
+entre workers); ver estadisticas().
+"""
+import time
+from io import BytesIO
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image
+
+TTL = getattr(settings, "RECONOCIMIENTO_CACHE_TTL", 10)
+DISTANCIA_MAX = getattr(settings, "RECONOCIMIENTO_CACHE_DISTANCIA", 3)
+MAX_ENTRADAS = 32
+
+_K_HITS = "reconocimiento:cache:hits"
+_K_MISSES = "reconocimiento:cache:misses"
+
+
+def dhash(fuente) -> int:
+    """
+    Hash de diferencias de 64 bits (9x8 en escala de grises).
+    """
+    if isinstance(fuente, (bytes, bytearray)):
+        fuente = BytesIO(fuente)
+    fuente.seek(0)
+    img = Image.open(fuente)
+    img.draft("L", (64, 64))
+    pixeles = list(img.convert("L").resize((9, 8), Image.BILINEAR).getdata())
+    fuente.seek(0)
+    valor = 0
+    for fila in range(8):
+        for col in range(8):
+            izquierda = pixeles[fila * 9 + col]
+            derecha = pixeles[fila * 9 + col + 1]
+            valor = (valor << 1) | (1 if izquierda > derecha else 0)
+    return valor
+
+
+def _distancia(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def es_negativo(res) -> bool:
+    """
+    True si `res` (respuesta del reconocedor) no trae candidatos o es un error.
+    """
+    if isinstance(res, list):
+        return not res
+    if not isinstance(res, dict):
+        return False
+    if "error" in res:
+        return True
+    candidatos = res.get("candidates") or res.get("matches") or res.get("result") or []
+    if isinstance(candidatos, dict):
+        candidatos = candidatos.get("candidates") or []
+    return not candidatos
+
+
+def _contar(clave: str):
+    cache.add(clave, 0, timeout=None)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        pass
+
+
+def _consultar(fuente, gallery: str):
+    """
+    (resultado cacheado o None, guardar(res) o None si `fuente` no se puede cachear).
+    """
+    if isinstance(fuente, str):
+        clave = f"reconocimiento:url:{gallery}:{fuente}"
+        res = cache.get(clave)
+        if res is not None:
+            _contar(_K_HITS)
+            return res, None
+        _contar(_K_MISSES)
+        return None, lambda res: cache.set(clave, res, timeout=TTL)
+
+    try:
+        h = dhash(fuente)
+    except OSError:
+        # No se pudo leer como imagen: sin caché, que el proveedor decida
+        return None, None
+
+    clave = f"reconocimiento:phash:{gallery}"
+    ahora = time.time()
+    recientes = [e for e in (cache.get(clave) or []) if e[1] > ahora]
+    for valor, _expira, res in recientes:
+        if _distancia(valor, h) <= DISTANCIA_MAX:
+            _contar(_K_HITS)
+            return res, None
+
+    _contar(_K_MISSES)
+
+    def guardar(res):
+        recientes.append((h, ahora + TTL, res))
+        cache.set(clave, recientes[-MAX_ENTRADAS:], timeout=TTL)
+    return None, guardar
+
+
+def reconocer(fuente, gallery: str, llamada):
+    """
+    Devuelve el resultado cacheado para `fuente` (URL o archivo normalizado)
+    o ejecuta `llamada()` y, si es negativo, lo guarda. Las excepciones no
+    se cachean.
+    """
+    res, guardar = _consultar(fuente, gallery)
+    if res is not None:
+        return res
+    res = llamada()
+    if guardar and es_negativo(res):
+        guardar(res)
+    return res
+
+
+async def areconocer(fuente, gallery: str, llamada):
+    """
+    Igual que reconocer(), con `llamada` async (p.ej. Reconocedor.areconocer).
+    El hash (PIL) y la caché (disco) se usan desde un hilo, no en el event loop.
+    """
+    res, guardar = await sync_to_async(_consultar, thread_sensitive=False)(fuente, gallery)
+    if res is not None:
+        return res
+    res = await llamada()
+    if guardar and es_negativo(res):
+        await sync_to_async(guardar, thread_sensitive=False)(res)
+    return res
+
+
+def estadisticas() -> dict:
+    hits = cache.get(_K_HITS) or 0
+    misses = cache.get(_K_MISSES) or 0
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "ratio": round(hits / total, 4) if total else 0.0,
+        "ttl": TTL,
+        "distancia_max": DISTANCIA_MAX,
+    }
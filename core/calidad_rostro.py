@@ -0,0 +1,241 @@
+# core/calidad_rostro.py
+"""
+Control de calidad local de una foto antes de enrolarla en el reconocedor.
+
+Una foto borrosa, diminuta o sin rostro vuelve de Luxand como "Can't find
+faces" tras un viaje completo y una unidad de cuota gastada. Aquí se mide en
+unos milisegundos con Pillow/NumPy (sobre la imagen reducida a <= 512px):
+
+  - resolución: lado menor de la imagen original;
+  - nitidez: varianza del laplaciano (en la región del rostro si se detecta);
+  - exposición: brillo medio, contraste y fracción de píxeles quemados;
+  - región del rostro: píxeles de piel en YCbCr (heurística, sin detector).
+
+Lo corregible se corrige (autocontraste y gamma, recorte al rostro cuando
+ocupa poco del cuadro) y lo demás se rechaza con motivos accionables.
+
+    from core import calidad_rostro
+    foto = calidad_rostro.preparar(archivo_o_url)   # BytesIO JPEG "rostro"
+    # lanza FotoNoApta (ValueError) con .motivos y .metricas
+"""
+import numpy as np
+import requests
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .normalizacion import _a_jpeg, normalizar
+from .reconocedores import _abrir_imagen
+
+ACTIVO = getattr(settings, "CALIDAD_ROSTRO_ACTIVO", True)
+MIN_LADO = getattr(settings, "CALIDAD_MIN_LADO", 160)
+NITIDEZ_MIN = getattr(settings, "CALIDAD_NITIDEZ_MIN", 40.0)
+ROSTRO_MIN = getattr(settings, "CALIDAD_ROSTRO_MIN", 0.02)
+
+ANALISIS_LADO = 512
+DECODIFICAR_LADO = 1280
+# Rango de piel en YCbCr (Chai y Ngan)
+CB_PIEL = (77, 127)
+CR_PIEL = (133, 173)
+# Región del rostro menor a esta fracción del cuadro: se recorta
+ROSTRO_RECORTE = 0.12
+MARGEN_RECORTE = 0.4
+QUEMADOS_MAX = 0.4
+
+MOTIVOS = {
+    "imagen_invalida": "No se pudo leer la imagen. Suba un JPEG o PNG.",
+    "resolucion": "La foto es muy pequeña ({ancho}x{alto}px). Use una de al menos {minimo}px por lado.",
+    "borrosa": "La foto está borrosa (nitidez {nitidez}, mínimo {minimo}). Mantenga la cámara quieta y enfoque el rostro.",
+    "subexpuesta": "La foto está demasiado oscura. Tómela con más luz de frente.",
+    "sobreexpuesta": "La foto está sobreexpuesta. Evite el flash directo o la luz de fondo.",
+    "sin_rostro": "No se detecta un rostro. El rostro debe verse de frente y ocupar buena parte de la foto.",
+    "rostro_pequeno": "El rostro es muy pequeño en la foto. Acérquese a la cámara.",
+}
+
+
+class FotoNoApta(ValueError):
+    """
+    La foto no pasa el control; `motivos` = [{codigo, detalle}].
+    """
+
+    def __init__(self, motivos: list, metricas: dict):
+        self.motivos = motivos
+        self.metricas = metricas
+        super().__init__(" ".join(m["detalle"] for m in motivos))
+
+    def como_respuesta(self) -> dict:
+        return {
+            "ok": False,
+            "reason": "foto_no_apta",
+            "detail": str(self),
+            "motivos": self.motivos,
+            "metricas": self.metricas,
+        }
+
+
+def _motivo(codigo: str, **datos) -> dict:
+    return {"codigo": codigo, "detalle": MOTIVOS[codigo].format(**datos)}
+
+
+def _abrir(fuente):
+    """
+    (imagen RGB, factor a px originales). Los JPEG grandes se decodifican
+    directamente a escala reducida (draft): basta para analizar y recortar.
+    """
+    # URL (del almacén local o de IMAGEN_HOSTS_PERMITIDOS), ruta, bytes o archivo
+    img = _abrir_imagen(fuente)
+    original = img.size
+    img.draft("RGB", (DECODIFICAR_LADO, DECODIFICAR_LADO))
+    img = ImageOps.exif_transpose(img)
+    return (img.convert("RGB") if img.mode != "RGB" else img), max(original) / max(img.size)
+
+
+def nitidez(gris: np.ndarray) -> float:
+    """
+    Varianza del laplaciano (4 vecinos) de una imagen en escala de grises.
+    """
+    if gris.shape[0] < 3 or gris.shape[1] < 3:
+        return 0.0
+    lap = (gris[1:-1, :-2] + gris[1:-1, 2:] + gris[:-2, 1:-1] + gris[2:, 1:-1]
+           - 4.0 * gris[1:-1, 1:-1])
+    return float(lap.var())
+
+
+def region_piel(img: Image.Image):
+    """
+    (fracción de piel, caja (x0, y0, x1, y1) en px de `img`) o (None, None)
+    si la imagen no tiene color (escala de grises: no se puede estimar).
+    """
+    ycbcr = np.asarray(img.convert("YCbCr"), dtype=np.uint8)
+    cb, cr = ycbcr[..., 1], ycbcr[..., 2]
+    if float(cb.std()) < 2.0 and float(cr.std()) < 2.0:
+        return None, None
+    piel = (cb >= CB_PIEL[0]) & (cb <= CB_PIEL[1]) & (cr >= CR_PIEL[0]) & (cr <= CR_PIEL[1])
+    fraccion = float(piel.mean())
+    if not piel.any():
+        return fraccion, None
+    ys, xs = np.nonzero(piel)
+    # Percentiles en lugar de min/max: ignora píxeles de piel sueltos del fondo
+    x0, x1 = np.percentile(xs, (5, 95))
+    y0, y1 = np.percentile(ys, (5, 95))
+    return fraccion, (int(x0), int(y0), int(x1) + 1, int(y1) + 1)
+
+
+def tabla_exposicion(gris: np.ndarray):
+    """
+    LUT de 256 valores (estiramiento al rango p1-p99 y gamma hacia un brillo
+    medio de 128) o None si la exposición ya es aceptable.
+    """
+    media, contraste = float(gris.mean()), float(gris.std())
+    if 70 <= media <= 185 and contraste >= 35:
+        return None
+    bajo, alto = np.percentile(gris, (1, 99))
+    niveles = np.arange(256, dtype=np.float32)
+    if alto - bajo >= 8:
+        niveles = np.clip((niveles - bajo) * 255.0 / (alto - bajo), 0, 255)
+    media = float(niveles[gris.astype(np.uint8)].mean())
+    if 5 < media < 250 and not 70 <= media <= 185:
+        gamma = np.log(128 / 255) / np.log(media / 255)
+        niveles = 255.0 * (niveles / 255.0) ** gamma
+    return [int(v + 0.5) for v in np.clip(niveles, 0, 255)]
+
+
+def evaluar(fuente) -> dict:
+    """
+    Métricas, motivos de rechazo y correcciones aplicadas. `imagen` es la
+    foto corregida (PIL) lista para el perfil "rostro" si no hay motivos.
+    """
+    try:
+        img, factor = _abrir(fuente)
+    # Descarga fallida o no permitida (ValueError), red o proveedor caído
+    # (RequestException, ProveedorNoDisponible): la foto no se pudo leer
+    except (OSError, ValueError, requests.RequestException, Image.DecompressionBombError) as e:
+        return {"motivos": [_motivo("imagen_invalida")], "metricas": {"error": str(e)},
+                "correcciones": [], "imagen": None}
+    finally:
+        if hasattr(fuente, "seek"):
+            fuente.seek(0)
+
+    ancho, alto = round(img.width * factor), round(img.height * factor)
+    metricas = {"ancho": ancho, "alto": alto}
+    motivos, correcciones = [], []
+    if min(ancho, alto) < MIN_LADO:
+        motivos.append(_motivo("resolucion", ancho=ancho, alto=alto, minimo=MIN_LADO))
+        return {"motivos": motivos, "metricas": metricas, "correcciones": correcciones, "imagen": None}
+
+    # Reducción entera (reduce) para analizar: mucho más rápida que resize
+    paso = -(-max(img.size) // ANALISIS_LADO)
+    analisis = img.reduce(paso) if paso > 1 else img
+    escala = analisis.width / img.width
+
+    # Región del rostro: si ocupa poco del cuadro se recorta (con margen)
+    fraccion, caja = region_piel(analisis)
+    rostro = None
+    if fraccion is not None:
+        metricas["piel"] = round(fraccion, 3)
+        if fraccion < ROSTRO_MIN or caja is None:
+            motivos.append(_motivo("sin_rostro"))
+        else:
+            x0, y0, x1, y1 = caja
+            area = (x1 - x0) * (y1 - y0) / float(analisis.width * analisis.height)
+            metricas["rostro"] = round(area, 3)
+            if area < ROSTRO_RECORTE:
+                mx, my = (x1 - x0) * MARGEN_RECORTE, (y1 - y0) * MARGEN_RECORTE
+                recorte = tuple(int(v / escala) for v in (
+                    max(0, x0 - mx), max(0, y0 - my),
+                    min(analisis.width, x1 + mx), min(analisis.height, y1 + my),
+                ))
+                if min(recorte[2] - recorte[0], recorte[3] - recorte[1]) * factor < MIN_LADO:
+                    motivos.append(_motivo("rostro_pequeno"))
+                else:
+                    img = img.crop(recorte)
+                    analisis = analisis.crop(tuple(int(v * escala) for v in recorte))
+                    correcciones.append("recorte_rostro")
+                    rostro = analisis
+            else:
+                rostro = analisis.crop(caja)
+
+    gris = np.asarray(analisis.convert("L"), dtype=np.float32)
+    oscuros, claros = float((gris < 16).mean()), float((gris > 240).mean())
+    metricas.update({"brillo": round(float(gris.mean()), 1), "contraste": round(float(gris.std()), 1),
+                     "oscuros": round(oscuros, 3), "quemados": round(claros, 3)})
+    # Mucho negro o blanco puro: el detalle se perdió y no hay corrección posible
+    if oscuros > QUEMADOS_MAX:
+        motivos.append(_motivo("subexpuesta"))
+    elif claros > QUEMADOS_MAX:
+        motivos.append(_motivo("sobreexpuesta"))
+    if motivos:
+        return {"motivos": motivos, "metricas": metricas, "correcciones": correcciones, "imagen": None}
+
+    # Oscura o con poco contraste: se corrige antes de medir la nitidez (que depende del contraste)
+    tabla = tabla_exposicion(gris)
+    if tabla is not None:
+        img, rostro = img.point(tabla * 3), rostro.point(tabla * 3) if rostro is not None else None
+        gris = np.asarray(tabla, dtype=np.float32)[gris.astype(np.uint8)]
+        correcciones.append("exposicion")
+
+    # Nitidez del rostro: un fondo desenfocado no debe rechazar la foto
+    valor = nitidez(np.asarray(rostro.convert("L"), dtype=np.float32)) if rostro is not None else nitidez(gris)
+    metricas["nitidez"] = round(valor, 1)
+    if valor < NITIDEZ_MIN:
+        motivos.append(_motivo("borrosa", nitidez=round(valor, 1), minimo=NITIDEZ_MIN))
+    return {"motivos": motivos, "metricas": metricas, "correcciones": correcciones,
+            "imagen": None if motivos else img}
+
+
+def preparar(fuente):
+    """
+    Foto corregida en JPEG (perfil "rostro") o FotoNoApta con los motivos.
+    Con CALIDAD_ROSTRO_ACTIVO = False no se evalúa: las URL pasan tal cual
+    y los archivos sólo se normalizan.
+    """
+    if not ACTIVO:
+        if isinstance(fuente, str):
+            # Una cadena del cliente nunca se abre como ruta local
+            if not fuente.startswith(("http://", "https://")):
+                raise FotoNoApta([_motivo("imagen_invalida")], {"error": "La imagen debe ser una URL http(s)"})
+            return fuente
+        return normalizar(fuente, "rostro")
+    resultado = evaluar(fuente)
+    if resultado["motivos"]:
+        raise FotoNoApta(resultado["motivos"], {**resultado["metricas"], "correcciones": resultado["correcciones"]})
+    return _a_jpeg(resultado["imagen"], "rostro")
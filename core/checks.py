@@ -0,0 +1,43 @@
+# core/checks.py
+from django.conf import settings
+from django.core import checks
+
+
+@checks.register()
+def reconocedor_local(app_configs, **kwargs):
+    """
+    El backend local no arranca sin un extractor de rasgos configurado.
+    """
+    if getattr(settings, "RECONOCEDOR_BACKEND", "luxand") != "local":
+        return []
+    if getattr(settings, "RECONOCEDOR_LOCAL_EXTRACTOR", ""):
+        return []
+    return [checks.Error(
+        "RECONOCEDOR_BACKEND = 'local' requiere RECONOCEDOR_LOCAL_EXTRACTOR.",
+        hint="Ruta a una función fn(imagen_pil) -> vector de un modelo de embeddings faciales.",
+        id="core.E001",
+    )]
+
+
+# Backends que purgan entradas al azar al llenarse
+_CON_PURGA = ("FileBasedCache", "LocMemCache", "DatabaseCache")
+ENTRADAS_MINIMAS = 5000
+
+
+@checks.register(checks.Tags.caches)
+def cache_sin_purga_temprana(app_configs, **kwargs):
+    """
+    La caché guarda estado de coordinación (cortacircuitos, sellos de versión,
+    candados): con pocas entradas se purga sin aviso bajo carga.
+    """
+    config = settings.CACHES.get("default", {})
+    if not config.get("BACKEND", "").endswith(_CON_PURGA):
+        return []
+    maximo = config.get("OPTIONS", {}).get("MAX_ENTRIES", 300)
+    if maximo >= ENTRADAS_MINIMAS:
+        return []
+    return [checks.Warning(
+        f"La caché 'default' purga entradas al pasar de {maximo} (MAX_ENTRIES).",
+        hint=f"Subir CACHE_MAX_ENTRIES (al menos {ENTRADAS_MINIMAS}) o usar un backend sin purga como Redis.",
+        id="core.W001",
+    )]
@@ -0,0 +1,254 @@
+# core/http.py
+"""
+Cliente HTTP saliente compartido.
+
+Una requests.Session por proveedor (Luxand, PlateRecognizer, ImgBB, Stripe)
+con keep-alive, pool de conexiones dimensionado, timeouts por defecto
+(conexión, lectura) y hooks de tiempo por llamada. Reutilizar la sesión evita
+el handshake TCP/TLS en cada escaneo de la portería.
+
+Cada llamada pasa por el cortacircuitos y el bulkhead del proveedor
+(core.resiliencia); si el proveedor está caído se lanza ProveedorNoDisponible
+sin llegar a la red.
+
+    from core.http import sesion
+    r = sesion("luxand").post(url, headers=..., data=...)
+
+Para las vistas async hay un httpx.AsyncClient por proveedor (y event loop)
+con las mismas reglas. Ahí sí se reintenta un 429/5xx o un error de red,
+con backoff exponencial que se espera con asyncio.sleep: mientras tanto el
+worker sigue atendiendo otras peticiones. El cortacircuitos cuenta un solo
+resultado por llamada lógica (tras el último intento). El cliente se cierra
+con su loop: bajo WSGI cada vista async corre en un loop propio.
+
+    from core.http import cliente_async
+    r = await cliente_async("luxand").post(url, headers=..., files=...)
+"""
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .resiliencia import bulkhead, bulkhead_async, cortacircuitos, es_fallo
+
+TIMEOUT_CONEXION = getattr(settings, "HTTP_TIMEOUT_CONEXION", 3.05)
+TIMEOUT_LECTURA = getattr(settings, "HTTP_TIMEOUT_LECTURA", 30)
+POOL_MAXSIZE = getattr(settings, "HTTP_POOL_MAXSIZE", 10)
+REINTENTOS = getattr(settings, "HTTP_REINTENTOS", 2)
+BACKOFF = getattr(settings, "HTTP_BACKOFF", 0.5)
+BACKOFF_MAX = 5.0
+
+# Timeout de lectura por proveedor (segundos); el resto usa TIMEOUT_LECTURA
+PROVEEDORES = {
+    "luxand": 30,
+    "platerecognizer": 20,
+    "imgbb": 30,
+    "stripe": 30,
+}
+
+_sesiones = {}
+_clientes = {}
+_lock = threading.Lock()
+_hooks = []
+_estadisticas = {}
+
+
+class SesionProveedor(requests.Session):
+    """
+    Session con timeout por defecto y medición de tiempo por llamada.
+    """
+
+    def __init__(self, proveedor: str, timeout, pool_maxsize: int):
+        super().__init__()
+        self.proveedor = proveedor
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        cb = cortacircuitos(self.proveedor)
+        # Cupo antes que sonda: si el bulkhead rechaza, la sonda semiabierta no queda tomada
+        with bulkhead(self.proveedor):
+            sonda = cb.permitir()
+            inicio = time.perf_counter()
+            status_code = None
+            try:
+                response = super().request(method, url, *args, **kwargs)
+                status_code = response.status_code
+                return response
+            finally:
+                _registrar(self.proveedor, method, url, status_code, time.perf_counter() - inicio)
+                if es_fallo(status_code):
+                    cb.registrar_fallo(sonda)
+                else:
+                    cb.registrar_exito(sonda)
+
+
+def sesion(proveedor: str) -> SesionProveedor:
+    """
+    Sesión compartida (por proceso) para el proveedor indicado.
+    """
+    s = _sesiones.get(proveedor)
+    if s is None:
+        with _lock:
+            s = _sesiones.get(proveedor)
+            if s is None:
+                lectura = PROVEEDORES.get(proveedor, TIMEOUT_LECTURA)
+                s = SesionProveedor(proveedor, (TIMEOUT_CONEXION, lectura), POOL_MAXSIZE)
+                _sesiones[proveedor] = s
+    return s
+
+
+class ClienteProveedor:
+    """
+    httpx.AsyncClient con timeout por defecto, cortacircuitos, bulkhead async,
+    medición por llamada y reintentos con backoff esperado (no bloqueante).
+    """
+
+    def __init__(self, proveedor: str, timeout, pool_maxsize: int):
+        self.proveedor = proveedor
+        conexion, lectura = timeout
+        self.cliente = httpx.AsyncClient(
+            timeout=httpx.Timeout(lectura, connect=conexion),
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+        )
+
+    async def request(self, method, url, reintentos: int = REINTENTOS, **kwargs):
+        """
+        `reintentos` extra ante 429/5xx/red; 0 para llamadas no idempotentes.
+        Tras el último intento devuelve la respuesta o relanza el error de red.
+        Los reintentos no cuentan por separado para el cortacircuitos.
+        """
+        cb = cortacircuitos(self.proveedor)
+        sonda = None
+        status_code = None
+        try:
+            for intento in range(reintentos + 1):
+                # Cupo antes que sonda, como en SesionProveedor
+                async with bulkhead_async(self.proveedor):
+                    if sonda is None:
+                        sonda = cb.permitir()
+                    inicio = time.perf_counter()
+                    response, status_code = None, None
+                    try:
+                        response = await self.cliente.request(method, url, **kwargs)
+                        status_code = response.status_code
+                    except httpx.TransportError:
+                        if intento == reintentos:
+                            raise
+                    finally:
+                        _registrar(self.proveedor, method, url, status_code, time.perf_counter() - inicio)
+                if not es_fallo(status_code) or intento == reintentos:
+                    return response
+                await asyncio.sleep(_espera(intento, response))
+        finally:
+            # Un resultado por llamada lógica: el del último intento
+            if sonda is not None:
+                if es_fallo(status_code):
+                    cb.registrar_fallo(sonda)
+                else:
+                    cb.registrar_exito(sonda)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+
+def _espera(intento: int, response) -> float:
+    """
+    Backoff exponencial con jitter; respeta Retry-After (en segundos) si viene.
+    """
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    if retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+    return min(BACKOFF * (2 ** intento) + random.uniform(0, BACKOFF), BACKOFF_MAX)
+
+
+async def _cerrar_con_el_loop(cliente: httpx.AsyncClient):
+    """
+    Testigo del loop: asyncio.run() (y uvicorn al apagar) cierran los
+    generadores async vivos antes de cerrar el loop (shutdown_asyncgens) y
+    con ellos el cliente, en su propio loop, sin dejar sockets abiertos.
+    """
+    try:
+        yield
+    finally:
+        await cliente.aclose()
+
+
+async def _vigilar(testigo):
+    await testigo.__anext__()
+
+
+def cliente_async(proveedor: str) -> ClienteProveedor:
+    """
+    Cliente async compartido para el proveedor en el event loop actual.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        # Loops ya cerrados (p.ej. vistas async servidas por WSGI): su cliente
+        # ya se cerró con el testigo, sólo queda soltar la referencia
+        for clave in [c for c in _clientes if c[1].is_closed()]:
+            cliente, _ = _clientes.pop(clave)
+            if not cliente.cliente.is_closed:
+                print(f"[HTTP] Cliente async de '{clave[0]}' sin cerrar al terminar su loop")
+        clave = (proveedor, loop)
+        entrada = _clientes.get(clave)
+        if entrada is None:
+            lectura = PROVEEDORES.get(proveedor, TIMEOUT_LECTURA)
+            c = ClienteProveedor(proveedor, (TIMEOUT_CONEXION, lectura), POOL_MAXSIZE)
+            testigo = _cerrar_con_el_loop(c.cliente)
+            loop.create_task(_vigilar(testigo))
+            entrada = _clientes[clave] = (c, testigo)
+    return entrada[0]
+
+
+def agregar_hook(fn):
+    """
+    Registra fn(proveedor, metodo, url, status_code, segundos), llamado tras
+    cada petición (status_code es None si hubo excepción de red).
+    """
+    _hooks.append(fn)
+    return fn
+
+
+def _registrar(proveedor, metodo, url, status_code, segundos):
+    with _lock:
+        est = _estadisticas.setdefault(
+            proveedor, {"llamadas": 0, "errores": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+        est["llamadas"] += 1
+        if status_code is None or status_code >= 500:
+            est["errores"] += 1
+        ms = segundos * 1000.0
+        est["total_ms"] += ms
+        est["max_ms"] = max(est["max_ms"], ms)
+    for hook in list(_hooks):
+        try:
+            hook(proveedor, metodo, url, status_code, segundos)
+        except Exception as e:
+            print(f"[HTTP] Error en hook de tiempo: {e}")
+
+
+def estadisticas() -> dict:
+    """
+    Resumen por proveedor de las llamadas hechas en este proceso.
+    """
+    with _lock:
+        return {
+            proveedor: {
+                **est,
+                "promedio_ms": round(est["total_ms"] / est["llamadas"], 2) if est["llamadas"] else 0.0,
+            }
+            for proveedor, est in _estadisticas.items()
+        }
@@ -0,0 +1,256 @@
+# core/ingesta.py
+"""
+Ingesta de imágenes en segundo plano.
+
+Los ViewSets guardan el registro de inmediato y delegan la subida al almacén
+de imágenes (core.almacen) a un pool de hilos acotado.
+
+El archivo subido se copia por bloques a IMAGEN_INGESTA_DIR antes de
+responder (Django borra sus temporales al terminar la petición); el worker
+lo envía en streaming y lo elimina al terminar.
+
+La cola es la tabla: el TrabajoImagen guarda el archivo, los perfiles y el
+post-proceso ("modulo.Clase.metodo"), así cualquier proceso puede retomarlo,
+y lo ejecuta quien marca `reclamado` primero (UPDATE condicional). Si el
+pool está saturado el trabajo queda pendiente sin dueño y la petición no
+espera al host de imágenes; el barrido (barrer(), cada BARRIDO segundos en
+cada worker y en `manage.py recuperar_imagenes`) lo envía cuando hay cupo,
+y retoma los reclamados hace más de HUERFANO segundos por un proceso que
+murió. El directorio debe ser compartido por los workers que barren.
+"""
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import almacen
+from .models import TrabajoImagen
+
+WORKERS = getattr(settings, "IMAGEN_INGESTA_WORKERS", 4)
+COLA_MAX = getattr(settings, "IMAGEN_INGESTA_COLA_MAX", 64)
+DIRECTORIO = getattr(settings, "IMAGEN_INGESTA_DIR", "") or os.path.join(settings.BASE_DIR, "spool", "imagenes")
+BARRIDO = getattr(settings, "IMAGEN_INGESTA_BARRIDO", 30)
+HUERFANO = 600
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="ingesta-imagen")
+_cupos = threading.BoundedSemaphore(COLA_MAX)
+_barrido = None
+_barrido_lock = threading.Lock()
+
+
+def _copiar_a_temporal(archivo) -> str:
+    """
+    Copia un UploadedFile (o cualquier objeto archivo) a un temporal propio
+    leyendo por bloques.
+    """
+    os.makedirs(DIRECTORIO, exist_ok=True)
+    destino = tempfile.NamedTemporaryFile(delete=False, suffix=".img", dir=DIRECTORIO)
+    if hasattr(archivo, "chunks"):
+        bloques = archivo.chunks()
+    else:
+        archivo.seek(0)
+        bloques = iter(lambda: archivo.read(64 * 1024), b"")
+    with destino:
+        for bloque in bloques:
+            destino.write(bloque)
+    return destino.name
+
+
+def _ruta_post_proceso(despues) -> str:
+    """
+    "modulo.Clase.metodo" (método de un ViewSet) o "modulo.funcion" para
+    retomar `despues` en otro proceso; "" si no se puede (lambda, closure).
+    """
+    if despues is None:
+        return ""
+    dueno = getattr(despues, "__self__", None)
+    if dueno is not None:
+        clase = type(dueno)
+        return f"{clase.__module__}.{clase.__qualname__}.{despues.__name__}"
+    nombre = getattr(despues, "__qualname__", "<")
+    return "" if "<" in nombre else f"{despues.__module__}.{nombre}"
+
+
+def _post_proceso(ruta):
+    if not ruta:
+        return None
+    try:
+        return import_string(ruta)
+    except ImportError:
+        clase, metodo = ruta.rsplit(".", 1)
+        return getattr(import_string(clase)(), metodo)
+
+
+def _reclamar(trabajo_id, vencido=None) -> bool:
+    """
+    Marca el trabajo como tomado si sigue pendiente y sin dueño (o con el
+    reclamo anterior a `vencido`). Sólo un proceso lo consigue.
+    """
+    libre = Q(reclamado__isnull=True)
+    if vencido is not None:
+        libre |= Q(reclamado__lt=vencido)
+    return TrabajoImagen.objects.filter(libre, pk=trabajo_id, estado='P').update(reclamado=timezone.now()) == 1
+
+
+def encolar(modelo, objeto_id, campo: str, archivo, despues=None, perfiles=("miniatura",)) -> TrabajoImagen:
+    """
+    Registra un TrabajoImagen y lo envía al pool.
+    `despues(instancia)` se ejecuta en el worker cuando el campo ya tiene URL
+    (p.ej. enrolar en Luxand). `perfiles` son las variantes a generar
+    (ver core.normalizacion.PERFILES).
+    """
+    ruta = _copiar_a_temporal(archivo)
+    trabajo = TrabajoImagen.objects.create(
+        modelo=modelo._meta.label_lower,
+        objeto_id=str(objeto_id),
+        campo=campo,
+        archivo=ruta,
+        perfiles=",".join(perfiles),
+        post_proceso=_ruta_post_proceso(despues),
+    )
+
+    def _enviar():
+        if not _cupos.acquire(blocking=False):
+            # Pool saturado: la petición no espera al host de imágenes, lo envía el barrido
+            print(f"[Ingesta] Cola llena, el trabajo {trabajo.pk} queda pendiente para el barrido")
+            return
+        if not _reclamar(trabajo.pk):
+            _cupos.release()
+            return
+        _pool.submit(_ejecutar_en_pool, trabajo.pk, ruta, despues, perfiles)
+
+    transaction.on_commit(_enviar)
+    trabajo.refresh_from_db(fields=["estado", "url", "error"])
+    return trabajo
+
+
+def barrer(en_linea: bool = False) -> int:
+    """
+    Toma los trabajos pendientes sin dueño o abandonados y los envía al pool
+    mientras haya cupo (o los procesa en este hilo con `en_linea`).
+    Devuelve cuántos tomó.
+    """
+    vencido = timezone.now() - timedelta(seconds=HUERFANO)
+    candidatos = list(
+        TrabajoImagen.objects.filter(estado='P')
+        .filter(Q(reclamado__isnull=True) | Q(reclamado__lt=vencido))
+        .order_by('id')
+        .values_list('id', 'archivo', 'perfiles', 'post_proceso')[:None if en_linea else COLA_MAX]
+    )
+    tomados = 0
+    for trabajo_id, ruta, perfiles, post_proceso in candidatos:
+        if not en_linea and not _cupos.acquire(blocking=False):
+            break
+        if not _reclamar(trabajo_id, vencido):
+            if not en_linea:
+                _cupos.release()
+            continue
+        tomados += 1
+        if not ruta or not os.path.exists(ruta):
+            if not en_linea:
+                _cupos.release()
+            TrabajoImagen.objects.filter(pk=trabajo_id).update(
+                estado='E', error="El archivo temporal ya no existe", fecha_actualizacion=timezone.now())
+            print(f"[Ingesta] Trabajo {trabajo_id} sin archivo temporal ({ruta}), marcado con error")
+            continue
+        try:
+            despues = _post_proceso(post_proceso)
+        except Exception as e:
+            print(f"[Ingesta] No se pudo resolver el post-proceso {post_proceso} del trabajo {trabajo_id}: {e}")
+            despues = None
+        perfiles = tuple(p for p in perfiles.split(",") if p)
+        if en_linea:
+            _ejecutar(trabajo_id, ruta, despues, perfiles)
+        else:
+            _pool.submit(_ejecutar_en_pool, trabajo_id, ruta, despues, perfiles)
+    return tomados
+
+
+def arrancar_barrido():
+    """
+    Inicia (una vez por proceso) el hilo que barre cada BARRIDO segundos.
+    """
+    global _barrido
+    with _barrido_lock:
+        if _barrido is None and BARRIDO > 0:
+            _barrido = threading.Thread(target=_barrer_siempre, name="ingesta-barrido", daemon=True)
+            _barrido.start()
+
+
+def _barrer_siempre():
+    while True:
+        time.sleep(BARRIDO)
+        try:
+            barrer()
+        except Exception as e:
+            print(f"[Ingesta] Error en el barrido de trabajos pendientes: {e}")
+        finally:
+            close_old_connections()
+
+
+def _ejecutar_en_pool(trabajo_id, ruta, despues, perfiles):
+    try:
+        _ejecutar(trabajo_id, ruta, despues, perfiles)
+    except Exception as e:
+        print(f"[Ingesta] Trabajo {trabajo_id} interrumpido, se reintenta en el barrido: {e}")
+    finally:
+        _cupos.release()
+        close_old_connections()
+
+
+def _ejecutar(trabajo_id, ruta, despues, perfiles):
+    # Si procesar() falla antes de dejar el trabajo en C/E/D, el archivo queda
+    # para el barrido (el reclamo vence en HUERFANO segundos)
+    procesar(trabajo_id, ruta, despues, perfiles)
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+def procesar(trabajo_id, fuente, despues=None, perfiles=()):
+    """
+    Sube la imagen y completa el campo del registro. Si llegó un trabajo más
+    reciente para el mismo registro/campo, éste se descarta para no pisarlo.
+    """
+    trabajo = TrabajoImagen.objects.get(pk=trabajo_id)
+    try:
+        url = almacen.guardar(fuente, perfiles=perfiles)
+    except Exception as e:
+        trabajo.estado = 'E'
+        trabajo.error = str(e)
+        trabajo.save(update_fields=["estado", "error", "fecha_actualizacion"])
+        print(f"[Ingesta] Error en trabajo {trabajo.pk}: {e}")
+        return
+
+    trabajo.url = url
+    mas_reciente = TrabajoImagen.objects.filter(
+        modelo=trabajo.modelo, objeto_id=trabajo.objeto_id,
+        campo=trabajo.campo, id__gt=trabajo.id,
+    ).exists()
+    if mas_reciente:
+        trabajo.estado = 'D'
+        trabajo.save(update_fields=["estado", "url", "fecha_actualizacion"])
+        return
+
+    modelo = apps.get_model(trabajo.modelo)
+    modelo.objects.filter(pk=trabajo.objeto_id).update(**{trabajo.campo: url})
+    trabajo.estado = 'C'
+    trabajo.save(update_fields=["estado", "url", "fecha_actualizacion"])
+
+    if despues:
+        instancia = modelo.objects.filter(pk=trabajo.objeto_id).first()
+        if instancia is not None:
+            try:
+                despues(instancia)
+            except Exception as e:
+                print(f"[Ingesta] Error en post-proceso del trabajo {trabajo.pk}: {e}")
@@ -1,7 +1,13 @@
 # core/luxand.py
+import os
+
+import httpx
 import requests
 from django.conf import settings
 
+from .http import cliente_async, sesion
+from .resiliencia import ProveedorNoDisponible
+
 BASE = "https://api.luxand.cloud"
 TOKEN = settings.LUXAND_TOKEN
 COLLECTION = getattr(settings, "LUXAND_COLLECTION", "")  # opcional
@@ -22,7 +28,7 @@ def _filefield_for(path_or_url, field_name: str):
 def create_collection(name: str):
     # opcional: crear colección
     url = f"{BASE}/collection"
-    return requests.post(url, headers=HEADERS, files={"name": (None, name)}, timeout=20).json()
+    return sesion("luxand").post(url, headers=HEADERS, files={"name": (None, name)}, timeout=20).json()
 
 def add_person(name: str, image_path_or_url: str, collections: str = ""):
     """
@@ -33,7 +39,7 @@ def add_person(name: str, image_path_or_url: str, collections: str = ""):
     data = {"name": name, "store": "1"}
     if collections:
         data["collections"] = collections
-    r = requests.post(url, headers=HEADERS, files=files, data=data, timeout=30)
+    r = sesion("luxand").post(url, headers=HEADERS, files=files, data=data, timeout=30)
     if r.status_code != 200:
         raise ValueError(f"Luxand add_person error: {r.text}")
     return r.json()  # incluye 'uuid'
@@ -46,11 +52,46 @@ def add_face(person_uuid: str, image_path_or_url: str):
     url = f"{BASE}/v2/person/{person_uuid}"
     files = _filefield_for(image_path_or_url, "photo")  # 'photo' según documentación
     data = {"store": "1"}
-    r = requests.post(url, headers=HEADERS, files=files, data=data, timeout=30)
+    r = sesion("luxand").post(url, headers=HEADERS, files=files, data=data, timeout=30)
     if r.status_code != 200:
         raise ValueError(f"Luxand add_face error: {r.text}")
     return r.json()
 
+def list_persons(page: int = 1, per_page: int = 500):
+    """
+    Una página de personas de la galería: [{uuid, name, collections, ...}].
+    Si la API ignora la paginación devuelve la lista completa (más de `per_page`).
+    """
+    url = f"{BASE}/v2/person"
+    r = sesion("luxand").get(url, headers=HEADERS, params={"page": page, "per_page": per_page}, timeout=30)
+    if r.status_code != 200:
+        raise ValueError(f"Luxand list_persons error ({r.status_code}): {r.text}")
+    datos = r.json()
+    if isinstance(datos, dict):
+        datos = datos.get("persons") or datos.get("data") or []
+    return datos
+
+
+def get_person(person_uuid: str):
+    """
+    Datos de una persona o None si ya no existe en Luxand.
+    """
+    r = sesion("luxand").get(f"{BASE}/v2/person/{person_uuid}", headers=HEADERS, timeout=20)
+    if r.status_code == 404:
+        return None
+    if r.status_code != 200:
+        raise ValueError(f"Luxand get_person error ({r.status_code}): {r.text}")
+    return r.json()
+
+
+def delete_person(person_uuid: str):
+    r = sesion("luxand").delete(f"{BASE}/v2/person/{person_uuid}", headers=HEADERS, timeout=20)
+    # 404: ya no estaba; para la reconciliación es lo mismo
+    if r.status_code not in (200, 204, 404):
+        raise ValueError(f"Luxand delete_person error ({r.status_code}): {r.text}")
+    return r.status_code != 404
+
+
 def recognize(image_path_or_url: str, gallery: str = ""):
     """
     Reconoce personas en una imagen usando el endpoint correcto de Luxand.
@@ -61,18 +102,11 @@ def recognize(image_path_or_url: str, gallery: str = ""):
     data = {}
     if gallery:
         data["gallery"] = gallery
-    
-    print(f"🔍 LUXAND RECOGNIZE DEBUG:")
-    print(f"   URL: {url}")
-    print(f"   Gallery: {gallery}")
-    print(f"   Headers: {HEADERS}")
-    print(f"   Data: {data}")
-    
+
+    # Estado y duración de la llamada los registra core.http (estadisticas y hooks)
     try:
-        r = requests.post(url, headers=HEADERS, files=files, data=data, timeout=30)
-        print(f"   Status Code: {r.status_code}")
-        print(f"   Response: {r.text[:500]}...")
-        
+        r = sesion("luxand").post(url, headers=HEADERS, files=files, data=data, timeout=30)
+
         if r.status_code == 503:
             raise ValueError(f"Luxand service unavailable (503). This may be due to rate limiting or service issues. Response: {r.text}")
         elif r.status_code == 429:
@@ -81,9 +115,59 @@ def recognize(image_path_or_url: str, gallery: str = ""):
             raise ValueError(f"Luxand recognize error ({r.status_code}): {r.text}")
         
         return r.json()
+    except ProveedorNoDisponible:
+        raise
     except requests.exceptions.Timeout:
         raise ValueError("Luxand API timeout. The service may be slow or unavailable.")
     except requests.exceptions.ConnectionError:
         raise ValueError("Cannot connect to Luxand API. Check your internet connection.")
     except requests.exceptions.RequestException as e:
         raise ValueError(f"Network error connecting to Luxand: {e}")
+
+
+def _campo_async(path_or_url, field_name: str):
+    """
+    Igual que _filefield_for, para httpx: la URL va como campo del formulario
+    (multipart) y los archivos como bytes, que se pueden reenviar al reintentar.
+    """
+    if isinstance(path_or_url, str):
+        # Las cadenas vienen del cliente (image_url): nunca se leen como ruta local
+        if path_or_url.startswith("http://") or path_or_url.startswith("https://"):
+            return {field_name: (None, path_or_url)}
+        raise ValueError("La imagen debe ser una URL http(s)")
+    path_or_url.seek(0)
+    contenido = path_or_url.read()
+    path_or_url.seek(0)
+    nombre = os.path.basename(getattr(path_or_url, "name", "") or "") or "foto.jpg"
+    tipo = getattr(path_or_url, "content_type", None) or "image/jpeg"
+    return {field_name: (nombre, contenido, tipo)}
+
+
+async def recognize_async(image_path_or_url, gallery: str = ""):
+    """
+    recognize() para vistas async: la espera de Luxand (y el backoff entre
+    reintentos) no ocupa un hilo del worker.
+    """
+    url = f"{BASE}/photo/search/v2"
+    files = _campo_async(image_path_or_url, "photo")
+    if gallery:
+        files["gallery"] = (None, gallery)
+
+    try:
+        r = await cliente_async("luxand").post(url, headers=HEADERS, files=files)
+    except ProveedorNoDisponible:
+        raise
+    except httpx.TimeoutException:
+        raise ValueError("Luxand API timeout. The service may be slow or unavailable.")
+    except httpx.ConnectError:
+        raise ValueError("Cannot connect to Luxand API. Check your internet connection.")
+    except httpx.HTTPError as e:
+        raise ValueError(f"Network error connecting to Luxand: {e}")
+
+    if r.status_code == 503:
+        raise ValueError(f"Luxand service unavailable (503). This may be due to rate limiting or service issues. Response: {r.text}")
+    elif r.status_code == 429:
+        raise ValueError(f"Luxand rate limit exceeded (429). Please wait before trying again. Response: {r.text}")
+    elif r.status_code != 200:
+        raise ValueError(f"Luxand recognize error ({r.status_code}): {r.text}")
+    return r.json()
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core import ingesta
+from core.models import TrabajoImagen
+
+
+class Command(BaseCommand):
+    help = ("Procesa los trabajos de imagen pendientes que no tienen dueño (cola llena) "
+            "o que quedaron reclamados por un worker que se reinició.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Sólo contar pendientes")
+
+    def handle(self, *args, **opts):
+        pendientes = TrabajoImagen.objects.filter(estado='P').count()
+        self.stdout.write(f"{pendientes} trabajos pendientes")
+        if opts["dry_run"]:
+            return
+        tomados = ingesta.barrer(en_linea=True)
+        self.stdout.write(self.style.SUCCESS(f"{tomados} trabajos retomados"))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoImagen',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('modelo', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('objeto_id', models.CharField(max_length=64, verbose_name='ID del Objeto')),
+                ('campo', models.CharField(default='imagen', max_length=50, verbose_name='Campo')),
+                ('estado', models.CharField(choices=[('P', 'Pendiente'), ('C', 'Completado'), ('E', 'Error'), ('D', 'Descartado')], default='P', max_length=1, verbose_name='Estado')),
+                ('url', models.URLField(blank=True, null=True, verbose_name='URL')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Error')),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Imagen',
+                'verbose_name_plural': 'Trabajos de Imagen',
+                'db_table': 'trabajo_imagen',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['modelo', 'objeto_id', 'campo'], name='trabajo_imagen_objeto_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagenAlmacenada',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('backend', models.CharField(max_length=20, verbose_name='Backend')),
+                ('url', models.URLField(max_length=500, verbose_name='URL')),
+                ('tamano', models.PositiveIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Imagen Almacenada',
+                'verbose_name_plural': 'Imágenes Almacenadas',
+                'db_table': 'imagen_almacenada',
+                'unique_together': {('sha256', 'backend')},
+            },
+        ),
+    ]
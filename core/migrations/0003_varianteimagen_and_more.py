@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_imagenalmacenada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VarianteImagen',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('perfil', models.CharField(max_length=20, verbose_name='Perfil')),
+                ('url', models.URLField(max_length=500, verbose_name='URL')),
+                ('tamano', models.PositiveIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+            ],
+            options={
+                'verbose_name': 'Variante de Imagen',
+                'verbose_name_plural': 'Variantes de Imagen',
+                'db_table': 'variante_imagen',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='imagenalmacenada',
+            index=models.Index(fields=['url'], name='imagen_almacenada_url_idx'),
+        ),
+        migrations.AddField(
+            model_name='varianteimagen',
+            name='original',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variantes', to='core.imagenalmacenada', verbose_name='Imagen Original'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='varianteimagen',
+            unique_together={('original', 'perfil')},
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_varianteimagen_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingFacial',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('uuid', models.CharField(max_length=64, unique=True, verbose_name='UUID')),
+                ('nombre', models.CharField(blank=True, max_length=200, verbose_name='Nombre')),
+                ('coleccion', models.CharField(blank=True, default='', max_length=100, verbose_name='Colección')),
+                ('vector', models.BinaryField(verbose_name='Vector')),
+                ('dimension', models.PositiveIntegerField(verbose_name='Dimensión')),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Embedding Facial',
+                'verbose_name_plural': 'Embeddings Faciales',
+                'db_table': 'embedding_facial',
+            },
+        ),
+    ]
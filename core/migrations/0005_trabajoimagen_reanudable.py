@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_embeddingfacial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoimagen',
+            name='archivo',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Archivo Temporal'),
+        ),
+        migrations.AddField(
+            model_name='trabajoimagen',
+            name='perfiles',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Perfiles'),
+        ),
+        migrations.AddField(
+            model_name='trabajoimagen',
+            name='post_proceso',
+            field=models.CharField(blank=True, default='', max_length=200, verbose_name='Post-proceso'),
+        ),
+        migrations.AddField(
+            model_name='trabajoimagen',
+            name='reclamado',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Reclamado'),
+        ),
+        migrations.AddIndex(
+            model_name='trabajoimagen',
+            index=models.Index(fields=['estado', 'reclamado'], name='trabajo_imagen_estado_idx'),
+        ),
+    ]
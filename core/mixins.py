@@ -0,0 +1,79 @@
+# core/mixins.py
+from . import almacen, ingesta
+
+
+class ImagenIngestaMixin:
+    """
+    Mixin para ViewSets con un campo de imagen (URL).
+    El registro se guarda y se devuelve de inmediato con imagen_estado="pendiente";
+    la subida al host de imágenes la completa el pool de core.ingesta.
+    En los listados se agrega <campo>_miniatura con la variante reducida.
+    """
+    imagen_campo = "imagen"
+    imagen_variantes = ("miniatura",)
+    # True mientras la petición en curso trae un archivo que sube el worker
+    imagen_pendiente = False
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        filas = response.data.get("results", []) if isinstance(response.data, dict) else response.data
+        campo = self.imagen_campo
+        miniaturas = almacen.variantes_de((fila.get(campo) for fila in filas), "miniatura")
+        for fila in filas:
+            if campo in fila:
+                fila[f"{campo}_miniatura"] = miniaturas.get(fila[campo])
+        return response
+
+    def create(self, request, *args, **kwargs):
+        return self.handle_image_upload(request, super().create, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self.handle_image_upload(request, super().update, *args, **kwargs)
+
+    def imagen_subida(self, instance):
+        """
+        Hook ejecutado por el worker cuando el campo de imagen ya tiene URL.
+        """
+        pass
+
+    def handle_image_upload(self, request, action, *args, **kwargs):
+        """
+        Separa el archivo de imagen de la petición, guarda el registro y encola la subida.
+        """
+        campo = self.imagen_campo
+        imagen_file = request.FILES.get(campo)
+        self.imagen_pendiente = bool(imagen_file)
+
+        if imagen_file:
+            # Sólo los campos de texto: QueryDict.copy() haría deepcopy del archivo
+            data = request._data.copy()
+            data.pop(campo, None)
+            request._files = {}
+        else:
+            data = request.data.copy()
+
+        # Si no se sube nueva imagen (o está pendiente) en PUT/PATCH, mantener la existente
+        if request.method in ["PUT", "PATCH"] and not data.get(campo):
+            instance = self.get_object()
+            data[campo] = getattr(instance, campo)
+        request._full_data = data
+
+        response = action(request, *args, **kwargs)
+
+        if imagen_file and response.status_code in (200, 201):
+            objeto_id = response.data.get("id")
+            modelo = self.get_queryset().model
+            try:
+                trabajo = ingesta.encolar(
+                    modelo, objeto_id, campo, imagen_file,
+                    despues=self.imagen_subida, perfiles=self.imagen_variantes,
+                )
+            except Exception as e:
+                response.data[f"{campo}_estado"] = "error"
+                response.data[f"{campo}_error"] = f"Error al procesar imagen: {str(e)}"
+                return response
+            response.data[f"{campo}_estado"] = trabajo.get_estado_display().lower()
+            response.data[f"{campo}_trabajo"] = trabajo.id
+            if trabajo.url and trabajo.estado == 'C':
+                response.data[campo] = trabajo.url
+        return response
@@ -0,0 +1,118 @@
+from django.db import models
+from django.utils import timezone
+
+
+class TrabajoImagen(models.Model):
+    """
+    Trabajo de ingesta de imagen en segundo plano.
+    El registro (Persona, Vehiculo, Mascota, ...) se guarda de inmediato y el
+    worker completa el campo de imagen cuando el host de imágenes responde.
+    """
+    ESTADO_CHOICES = [
+        ('P', 'Pendiente'),
+        ('C', 'Completado'),
+        ('E', 'Error'),
+        ('D', 'Descartado'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    modelo = models.CharField(max_length=100, verbose_name="Modelo")  # p.ej. 'administracion.persona'
+    objeto_id = models.CharField(max_length=64, verbose_name="ID del Objeto")
+    campo = models.CharField(max_length=50, default='imagen', verbose_name="Campo")
+    estado = models.CharField(max_length=1, choices=ESTADO_CHOICES, default='P', verbose_name="Estado")
+    url = models.URLField(blank=True, null=True, verbose_name="URL")
+    error = models.TextField(blank=True, null=True, verbose_name="Error")
+    fecha_creacion = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Creación")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Fecha de Actualización")
+    # Lo necesario para retomar el trabajo desde otro proceso (core.ingesta.barrer)
+    archivo = models.CharField(max_length=255, blank=True, default='', verbose_name="Archivo Temporal")
+    perfiles = models.CharField(max_length=100, blank=True, default='', verbose_name="Perfiles")
+    post_proceso = models.CharField(max_length=200, blank=True, default='', verbose_name="Post-proceso")
+    # Cuándo lo tomó un worker; vacío = pendiente sin dueño
+    reclamado = models.DateTimeField(blank=True, null=True, verbose_name="Reclamado")
+
+    class Meta:
+        db_table = 'trabajo_imagen'
+        verbose_name = "Trabajo de Imagen"
+        verbose_name_plural = "Trabajos de Imagen"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['modelo', 'objeto_id', 'campo'], name='trabajo_imagen_objeto_idx'),
+            models.Index(fields=['estado', 'reclamado'], name='trabajo_imagen_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo}#{self.objeto_id}.{self.campo} ({self.get_estado_display()})"
+
+
+class ImagenAlmacenada(models.Model):
+    """
+    Mapeo hash SHA-256 del contenido -> URL en el backend de imágenes.
+    Evita volver a subir la misma foto en cada PUT o reconocimiento.
+    """
+    id = models.AutoField(primary_key=True)
+    sha256 = models.CharField(max_length=64, verbose_name="SHA-256")
+    backend = models.CharField(max_length=20, verbose_name="Backend")
+    url = models.URLField(max_length=500, verbose_name="URL")
+    tamano = models.PositiveIntegerField(default=0, verbose_name="Tamaño (bytes)")
+    fecha_creacion = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Creación")
+
+    class Meta:
+        db_table = 'imagen_almacenada'
+        verbose_name = "Imagen Almacenada"
+        verbose_name_plural = "Imágenes Almacenadas"
+        unique_together = ['sha256', 'backend']
+        indexes = [
+            models.Index(fields=['url'], name='imagen_almacenada_url_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.backend})"
+
+
+class VarianteImagen(models.Model):
+    """
+    Versión normalizada de una ImagenAlmacenada para un uso concreto
+    (rostro para reconocimiento, miniatura para listados, ...).
+    """
+    id = models.AutoField(primary_key=True)
+    original = models.ForeignKey(
+        ImagenAlmacenada,
+        on_delete=models.CASCADE,
+        related_name='variantes',
+        verbose_name="Imagen Original"
+    )
+    perfil = models.CharField(max_length=20, verbose_name="Perfil")
+    url = models.URLField(max_length=500, verbose_name="URL")
+    tamano = models.PositiveIntegerField(default=0, verbose_name="Tamaño (bytes)")
+
+    class Meta:
+        db_table = 'variante_imagen'
+        verbose_name = "Variante de Imagen"
+        verbose_name_plural = "Variantes de Imagen"
+        unique_together = ['original', 'perfil']
+
+    def __str__(self):
+        return f"{self.original} [{self.perfil}]"
+
+
+class EmbeddingFacial(models.Model):
+    """
+    Vector de rasgos (float32) de una persona enrolada en el reconocedor local.
+    `uuid` ocupa el mismo lugar que el UUID de Luxand en Persona/Empleado.
+    """
+    id = models.AutoField(primary_key=True)
+    uuid = models.CharField(max_length=64, unique=True, verbose_name="UUID")
+    nombre = models.CharField(max_length=200, blank=True, verbose_name="Nombre")
+    coleccion = models.CharField(max_length=100, blank=True, default='', verbose_name="Colección")
+    vector = models.BinaryField(verbose_name="Vector")
+    dimension = models.PositiveIntegerField(verbose_name="Dimensión")
+    fecha_creacion = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Creación")
+
+    class Meta:
+        db_table = 'embedding_facial'
+        verbose_name = "Embedding Facial"
+        verbose_name_plural = "Embeddings Faciales"
+
+    def __str__(self):
+        return f"{self.nombre or self.uuid} ({self.dimension}d)"
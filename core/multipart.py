@@ -0,0 +1,82 @@
+# core/multipart.py
+"""
+Cuerpo multipart/form-data en streaming.
+
+requests arma todo el cuerpo en memoria cuando se usa `files=`; MultipartStream
+en cambio lee el archivo por bloques mientras se envía, con Content-Length
+calculado de antemano (ImgBB no acepta Transfer-Encoding: chunked).
+"""
+import os
+import uuid
+
+BLOQUE = 64 * 1024
+
+
+class MultipartStream:
+    """
+    Objeto tipo archivo para usar como `data=` en requests:
+
+        stream = MultipartStream({"key": api_key}, "image", archivo, "foto.jpg")
+        requests.post(url, data=stream, headers={"Content-Type": stream.content_type})
+    """
+
+    def __init__(self, campos: dict, campo_archivo: str, archivo, nombre: str = "imagen.jpg",
+                 content_type: str = "application/octet-stream"):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._archivo = archivo
+
+        cabecera = b"".join(
+            self._parte(nombre_campo, None, None) + str(valor).encode() + b"\r\n"
+            for nombre_campo, valor in campos.items()
+        )
+        cabecera += self._parte(campo_archivo, nombre, content_type)
+        self._partes = [cabecera, None, f"\r\n--{self.boundary}--\r\n".encode()]
+
+        inicio = archivo.tell()
+        fin = archivo.seek(0, os.SEEK_END)
+        archivo.seek(inicio)
+        self._tamano_archivo = fin - inicio
+        self._len = len(self._partes[0]) + self._tamano_archivo + len(self._partes[2])
+        self._indice = 0
+        self._pendiente = b""
+
+    def _parte(self, campo, nombre, content_type):
+        disposicion = f'form-data; name="{campo}"'
+        if nombre is not None:
+            disposicion += f'; filename="{nombre}"'
+        texto = f"--{self.boundary}\r\nContent-Disposition: {disposicion}\r\n"
+        if content_type:
+            texto += f"Content-Type: {content_type}\r\n"
+        return (texto + "\r\n").encode()
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        while True:
+            bloque = self.read(BLOQUE)
+            if not bloque:
+                return
+            yield bloque
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._len
+        salida = bytearray()
+        while len(salida) < size and self._indice < len(self._partes):
+            if not self._pendiente:
+                parte = self._partes[self._indice]
+                if parte is None:
+                    # Parte del archivo: se lee por bloques hasta agotarlo
+                    self._pendiente = self._archivo.read(min(BLOQUE, size - len(salida)))
+                    if not self._pendiente:
+                        self._indice += 1
+                        continue
+                else:
+                    self._pendiente = parte
+                    self._indice += 1
+            falta = size - len(salida)
+            salida += self._pendiente[:falta]
+            self._pendiente = self._pendiente[falta:]
+        return bytes(salida)
@@ -0,0 +1,80 @@
+# core/normalizacion.py
+"""
+Normalización de imágenes con Pillow antes de enviarlas a proveedores o al
+almacén: corrige la orientación EXIF, reduce al tamaño del perfil y
+recomprime a JPEG.
+"""
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# max_lado: lado mayor en px; calidad: JPEG 1-95
+PERFILES = {
+    "original": {"max_lado": 2048, "calidad": 85},
+    "rostro": {"max_lado": 640, "calidad": 88},
+    "placa": {"max_lado": 1280, "calidad": 88},
+    "recorte_placa": {"max_lado": 400, "calidad": 85},
+    "miniatura": {"max_lado": 160, "calidad": 75},
+}
+
+
+def _abrir_imagen(fuente, max_lado: int) -> Image.Image:
+    if isinstance(fuente, (bytes, bytearray)):
+        fuente = BytesIO(fuente)
+    elif hasattr(fuente, "seek"):
+        fuente.seek(0)
+    img = Image.open(fuente)
+    # En JPEG, draft() decodifica directamente a escala reducida (1/2, 1/4, 1/8)
+    img.draft("RGB", (max_lado, max_lado))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def _a_jpeg(img: Image.Image, perfil: str) -> BytesIO:
+    conf = PERFILES[perfil]
+    img.thumbnail((conf["max_lado"], conf["max_lado"]), Image.LANCZOS)
+    salida = BytesIO()
+    img.save(salida, "JPEG", quality=conf["calidad"], optimize=True)
+    salida.seek(0)
+    salida.name = f"{perfil}.jpg"
+    return salida
+
+
+def normalizar(fuente, perfil: str = "original") -> BytesIO:
+    """
+    Devuelve un BytesIO JPEG normalizado según el perfil.
+    Lanza ValueError si el contenido no es una imagen válida.
+    """
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil de imagen desconocido: {perfil}")
+    try:
+        img = _abrir_imagen(fuente, PERFILES[perfil]["max_lado"])
+        return _a_jpeg(img, perfil)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Imagen inválida: {e}")
+    finally:
+        if hasattr(fuente, "seek"):
+            fuente.seek(0)
+
+
+def recortar(fuente, caja: dict, margen: float = 0.15, perfil: str = "recorte_placa") -> BytesIO:
+    """
+    Recorta la región `caja` ({xmin, ymin, xmax, ymax}, en px de `fuente`)
+    con un margen relativo y la normaliza al perfil indicado.
+    """
+    try:
+        img = Image.open(BytesIO(fuente) if isinstance(fuente, (bytes, bytearray)) else fuente)
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Imagen inválida: {e}")
+    ancho = caja["xmax"] - caja["xmin"]
+    alto = caja["ymax"] - caja["ymin"]
+    region = (
+        max(0, int(caja["xmin"] - ancho * margen)),
+        max(0, int(caja["ymin"] - alto * margen)),
+        min(img.width, int(caja["xmax"] + ancho * margen)),
+        min(img.height, int(caja["ymax"] + alto * margen)),
+    )
+    return _a_jpeg(img.crop(region), perfil)
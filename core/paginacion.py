@@ -0,0 +1,90 @@
+# core/paginacion.py
+"""
+Paginación por cursor (keyset) sobre (campo de fecha, id).
+
+En lugar de OFFSET, cada página filtra "(fecha, id) < último visto", así la
+página 1000 cuesta lo mismo que la primera si hay un índice que cubra el
+orden. El cursor es opaco (base64 de la fecha y el id de la última fila).
+
+    class MiVista(generics.ListAPIView):
+        pagination_class = KeysetPagination   # ordena por -created_at, -id
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    campo = "created_at"
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    page_size_query_param = "limite"
+
+    def _limite(self, request) -> int:
+        try:
+            limite = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(limite, self.max_page_size))
+
+    def _codificar(self, fila) -> str:
+        valor = getattr(fila, self.campo)
+        datos = json.dumps({"v": valor.isoformat(), "id": fila.pk}).encode()
+        return base64.urlsafe_b64encode(datos).decode().rstrip("=")
+
+    def _decodificar(self, cursor: str):
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            valor = parse_datetime(datos["v"])
+            pk = int(datos["id"])
+        except (ValueError, KeyError, TypeError):
+            raise ValidationError({self.cursor_query_param: "Cursor inválido"})
+        if valor is None:
+            raise ValidationError({self.cursor_query_param: "Cursor inválido"})
+        return valor, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        limite = self._limite(request)
+        queryset = queryset.order_by(f"-{self.campo}", "-pk")
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            valor, pk = self._decodificar(cursor)
+            # El "<=" redundante acota el rango del índice; el OR solo no puede hacerlo
+            queryset = queryset.filter(
+                Q(**{f"{self.campo}__lte": valor}),
+                Q(**{f"{self.campo}__lt": valor}) | Q(**{self.campo: valor, "pk__lt": pk}),
+            )
+        filas = list(queryset[:limite + 1])
+        self.siguiente = self._codificar(filas[limite - 1]) if len(filas) > limite else None
+        return filas[:limite]
+
+    def get_next_link(self):
+        if self.siguiente is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.siguiente)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "cursor": self.siguiente,
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "cursor": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
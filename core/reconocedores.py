@@ -0,0 +1,340 @@
+# core/reconocedores.py
+"""
+Backends de reconocimiento facial intercambiables.
+
+- "luxand": API en la nube (core.luxand), el comportamiento de siempre.
+- "local": índice en memoria con NumPy. Cada persona enrolada es una fila
+  float32 normalizada (EmbeddingFacial); la búsqueda es un producto matriz-
+  vector (similitud coseno) + argpartition para el top-k, sin red.
+
+Ambos devuelven candidatos con la forma de Luxand ({uuid, name, probability}),
+así las vistas aplican el mismo umbral sin importar el backend.
+
+    from core.reconocedores import get_reconocedor
+    rec = get_reconocedor()            # settings.RECONOCEDOR_BACKEND
+    uuid = rec.enrolar("Ana Pérez", foto, coleccion)["uuid"]
+    candidatos = rec.reconocer(foto, coleccion)
+    rostros = agrupar_rostros(candidatos)   # [(rectangulo, candidatos)] por rostro
+
+El backend local exige RECONOCEDOR_LOCAL_EXTRACTOR: la ruta de una función
+fn(imagen_pil) -> vector (p.ej. un modelo de embeddings faciales). Sin ella
+no arranca (check core.E001). rasgos_basicos (píxeles ecualizados, no un
+embedding) sólo sirve para pruebas y hay que elegirlo explícitamente.
+"""
+import threading
+import uuid as uuidlib
+from collections import Counter
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from . import luxand
+from .http import sesion
+from .models import EmbeddingFacial
+
+TOP_K = getattr(settings, "RECONOCEDOR_TOP_K", 5)
+# Hosts desde los que el servidor descarga imágenes (los del almacén); el resto se rechaza
+HOSTS_PERMITIDOS = {
+    h.strip().lower() for h in getattr(settings, "IMAGEN_HOSTS_PERMITIDOS", "i.ibb.co,res.cloudinary.com").split(",") if h.strip()
+}
+
+_K_VERSION = "reconocedor:local:version"
+
+
+class Reconocedor:
+    """
+    Interfaz: enrolar / agregar_rostro / reconocer, y para la reconciliación
+    de la galería listar / existe / borrar.
+    `fuente` puede ser una URL, una ruta (Path), bytes o un objeto archivo.
+    """
+    nombre = ""
+
+    def enrolar(self, nombre: str, fuente, coleccion: str = "") -> dict:
+        raise NotImplementedError
+
+    def agregar_rostro(self, uuid: str, fuente) -> dict:
+        raise NotImplementedError
+
+    def reconocer(self, fuente, coleccion: str = "", k: int = TOP_K):
+        raise NotImplementedError
+
+    async def areconocer(self, fuente, coleccion: str = "", k: int = TOP_K):
+        """
+        Versión para vistas async; por defecto, reconocer() en un hilo.
+        """
+        return await sync_to_async(self.reconocer)(fuente, coleccion, k)
+
+    def listar(self, pagina: int, por_pagina: int) -> list:
+        """
+        Página `pagina` (desde 1) de la galería: [{uuid, name, collections}].
+        """
+        raise NotImplementedError
+
+    def existe(self, uuid: str) -> bool:
+        raise NotImplementedError
+
+    def borrar(self, uuid: str) -> bool:
+        raise NotImplementedError
+
+
+class LuxandReconocedor(Reconocedor):
+    nombre = "luxand"
+
+    def enrolar(self, nombre, fuente, coleccion=""):
+        return luxand.add_person(nombre, fuente, coleccion)
+
+    def agregar_rostro(self, uuid, fuente):
+        return luxand.add_face(uuid, fuente)
+
+    def reconocer(self, fuente, coleccion="", k=TOP_K):
+        return luxand.recognize(fuente, gallery=coleccion)
+
+    async def areconocer(self, fuente, coleccion="", k=TOP_K):
+        return await luxand.recognize_async(fuente, gallery=coleccion)
+
+    def listar(self, pagina, por_pagina):
+        return luxand.list_persons(pagina, por_pagina)
+
+    def existe(self, uuid):
+        return luxand.get_person(uuid) is not None
+
+    def borrar(self, uuid):
+        return luxand.delete_person(uuid)
+
+
+def rasgos_basicos(imagen: Image.Image) -> np.ndarray:
+    """
+    Extractor de prueba: recorte central, escala de grises ecualizada a
+    32x32, sin media. No es un embedding facial: con el umbral de la portería
+    acepta parecidos de luz y pose. Sólo para pruebas sin red.
+    """
+    gris = ImageOps.equalize(ImageOps.fit(imagen.convert("L"), (64, 64), Image.BILINEAR))
+    vector = np.asarray(gris.resize((32, 32), Image.BILINEAR), dtype=np.float32).ravel()
+    return vector - vector.mean()
+
+
+def _extractor():
+    ruta = getattr(settings, "RECONOCEDOR_LOCAL_EXTRACTOR", "")
+    if not ruta:
+        raise ImproperlyConfigured(
+            "El backend de reconocimiento local requiere RECONOCEDOR_LOCAL_EXTRACTOR "
+            "(ruta a fn(imagen_pil) -> vector de un modelo de embeddings faciales)"
+        )
+    return import_string(ruta)
+
+
+def _ruta_media(relativa: str) -> Path:
+    """
+    Ruta dentro de MEDIA_ROOT; ValueError si `relativa` sale de ella (../).
+    """
+    raiz = Path(settings.MEDIA_ROOT).resolve()
+    ruta = (raiz / relativa).resolve()
+    if not ruta.is_relative_to(raiz):
+        raise ValueError("Ruta de imagen fuera de MEDIA_ROOT")
+    return ruta
+
+
+def _abrir_imagen(fuente) -> Image.Image:
+    """
+    Las URL vienen del cliente: sólo se leen del disco las del backend "local"
+    (dentro de MEDIA_ROOT) y sólo se descargan las de HOSTS_PERMITIDOS.
+    """
+    if isinstance(fuente, (bytes, bytearray)):
+        return Image.open(BytesIO(fuente))
+    if isinstance(fuente, str):
+        if not fuente.startswith(("http://", "https://")):
+            raise ValueError("La imagen debe ser una URL http(s)")
+        base = getattr(settings, "IMAGEN_LOCAL_BASE_URL", "").rstrip("/") + settings.MEDIA_URL
+        if fuente.startswith(base):
+            return Image.open(_ruta_media(fuente[len(base):]))
+        host = (urlparse(fuente).hostname or "").lower()
+        if host not in HOSTS_PERMITIDOS:
+            raise ValueError(f"Host de imagen no permitido: {host or fuente}")
+        # Sin redirecciones: un host permitido no puede desviar la descarga a la red interna
+        r = sesion("descargas").get(fuente, allow_redirects=False)
+        if r.status_code != 200:
+            raise ValueError(f"No se pudo descargar la imagen ({r.status_code})")
+        return Image.open(BytesIO(r.content))
+    if isinstance(fuente, Path):
+        return Image.open(fuente)
+    fuente.seek(0)
+    return Image.open(fuente)
+
+
+def vectorizar(fuente) -> np.ndarray:
+    """
+    Vector float32 de norma 1 para la imagen. Lanza ValueError si no se puede leer.
+    """
+    try:
+        imagen = ImageOps.exif_transpose(_abrir_imagen(fuente))
+        vector = np.asarray(_extractor()(imagen), dtype=np.float32).ravel()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Imagen inválida: {e}")
+    finally:
+        if hasattr(fuente, "seek"):
+            fuente.seek(0)
+    norma = float(np.linalg.norm(vector))
+    if norma == 0.0:
+        raise ValueError("Imagen sin rasgos (uniforme)")
+    return vector / norma
+
+
+class IndiceLocal:
+    """
+    Matriz (n, d) float32 con los embeddings, cargada una vez por proceso.
+    Un sello de versión en la caché avisa a los demás workers que recarguen
+    cuando alguien enrola o actualiza una persona.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._cargado = False
+        self._matriz = np.zeros((0, 0), dtype=np.float32)
+        self._uuids = []
+        self._nombres = []
+        self._colecciones = np.array([], dtype=object)
+
+    def _cargar(self, version):
+        filas = list(EmbeddingFacial.objects.values_list("uuid", "nombre", "coleccion", "vector", "dimension"))
+        if filas:
+            # Si se cambió de extractor conviven dimensiones: se usa la más frecuente
+            dimension = Counter(f[4] for f in filas).most_common(1)[0][0]
+            descartadas = [f for f in filas if f[4] != dimension]
+            if descartadas:
+                print(f"[Reconocedor] {len(descartadas)} embeddings con otra dimensión ignorados")
+            filas = [f for f in filas if f[4] == dimension]
+            self._matriz = np.frombuffer(b"".join(bytes(f[3]) for f in filas), dtype=np.float32).reshape(len(filas), dimension)
+        else:
+            self._matriz = np.zeros((0, 0), dtype=np.float32)
+        self._uuids = [f[0] for f in filas]
+        self._nombres = [f[1] for f in filas]
+        self._colecciones = np.array([f[2] for f in filas], dtype=object)
+        self._version = version
+        self._cargado = True
+
+    def _vigente(self):
+        version = cache.get(_K_VERSION)
+        # Sin sello en la caché (recién creada o purgada) vale la matriz ya cargada
+        if not self._cargado or version != self._version:
+            with self._lock:
+                if not self._cargado or version != self._version:
+                    self._cargar(version)
+
+    def invalidar(self):
+        """
+        Publica una nueva versión: todos los procesos recargan en la próxima consulta.
+        """
+        cache.set(_K_VERSION, uuidlib.uuid4().hex, timeout=None)
+
+    def buscar(self, vector: np.ndarray, coleccion: str = "", k: int = TOP_K) -> list:
+        self._vigente()
+        matriz, uuids, nombres, colecciones = self._matriz, self._uuids, self._nombres, self._colecciones
+        if not uuids or matriz.shape[1] != vector.size:
+            return []
+        similitudes = matriz @ vector
+        if coleccion:
+            similitudes = np.where(colecciones == coleccion, similitudes, -np.inf)
+        k = min(k, similitudes.size)
+        indices = np.argpartition(-similitudes, k - 1)[:k]
+        indices = indices[np.argsort(-similitudes[indices])]
+        return [
+            {"uuid": uuids[i], "name": nombres[i], "probability": round(max(float(similitudes[i]), 0.0), 4)}
+            for i in indices
+            if np.isfinite(similitudes[i])
+        ]
+
+
+class LocalReconocedor(Reconocedor):
+    nombre = "local"
+
+    def __init__(self):
+        # Falla al crear el backend, no en la primera foto de la portería
+        _extractor()
+        self.indice = IndiceLocal()
+
+    def enrolar(self, nombre, fuente, coleccion=""):
+        vector = vectorizar(fuente)
+        emb = EmbeddingFacial.objects.create(
+            uuid=uuidlib.uuid4().hex, nombre=nombre, coleccion=coleccion or "",
+            vector=vector.tobytes(), dimension=vector.size,
+        )
+        self.indice.invalidar()
+        return {"status": "success", "uuid": emb.uuid, "name": nombre}
+
+    def agregar_rostro(self, uuid, fuente):
+        emb = EmbeddingFacial.objects.filter(uuid=uuid).first()
+        if emb is None:
+            raise ValueError(f"Persona {uuid} no enrolada en el reconocedor local")
+        nuevo = vectorizar(fuente)
+        if nuevo.size != emb.dimension:
+            raise ValueError("Dimensión de embedding distinta a la enrolada")
+        # Promedio de los rostros de la persona, re-normalizado
+        suma = np.frombuffer(bytes(emb.vector), dtype=np.float32) + nuevo
+        emb.vector = (suma / np.linalg.norm(suma)).astype(np.float32).tobytes()
+        emb.save(update_fields=["vector"])
+        self.indice.invalidar()
+        return {"status": "success", "uuid": uuid}
+
+    def reconocer(self, fuente, coleccion="", k=TOP_K):
+        return self.indice.buscar(vectorizar(fuente), coleccion, k)
+
+    def listar(self, pagina, por_pagina):
+        inicio = (max(1, pagina) - 1) * por_pagina
+        filas = EmbeddingFacial.objects.order_by("id").values_list("uuid", "nombre", "coleccion")[inicio:inicio + por_pagina]
+        return [{"uuid": u, "name": n, "collections": [{"name": c}] if c else []} for u, n, c in filas]
+
+    def existe(self, uuid):
+        return EmbeddingFacial.objects.filter(uuid=uuid).exists()
+
+    def borrar(self, uuid):
+        borrados, _ = EmbeddingFacial.objects.filter(uuid=uuid).delete()
+        if borrados:
+            self.indice.invalidar()
+        return bool(borrados)
+
+
+def agrupar_rostros(candidatos) -> list:
+    """
+    Candidatos con la forma de Luxand agrupados por rostro (su "rectangle"),
+    cada grupo ordenado de mayor a menor probabilidad. Sin rectángulo (backend
+    local: el cuadro entero es un rostro) todo queda en un solo grupo.
+    Devuelve [(rectangulo | None, [candidatos])] de izquierda a derecha.
+    """
+    grupos = {}
+    for c in candidatos:
+        if not isinstance(c, dict):
+            continue
+        rect = c.get("rectangle") if isinstance(c.get("rectangle"), dict) else None
+        clave = tuple(sorted(rect.items())) if rect else None
+        grupos.setdefault(clave, (rect, []))[1].append(c)
+    for _, grupo in grupos.values():
+        grupo.sort(key=lambda c: float(c.get("probability") or 0.0), reverse=True)
+    return sorted(grupos.values(), key=lambda g: (g[0] or {}).get("left", 0))
+
+
+RECONOCEDORES = {r.nombre: r for r in (LuxandReconocedor, LocalReconocedor)}
+
+_instancias = {}
+_lock = threading.Lock()
+
+
+def get_reconocedor(nombre: str = "") -> Reconocedor:
+    """
+    Instancia (por proceso) del backend indicado o de settings.RECONOCEDOR_BACKEND.
+    """
+    nombre = nombre or getattr(settings, "RECONOCEDOR_BACKEND", "luxand")
+    if nombre not in RECONOCEDORES:
+        raise ValueError(f"Backend de reconocimiento desconocido: {nombre}")
+    with _lock:
+        if nombre not in _instancias:
+            _instancias[nombre] = RECONOCEDORES[nombre]()
+        return _instancias[nombre]
@@ -0,0 +1,189 @@
+# core/resiliencia.py
+"""
+Cortacircuitos (circuit breaker) y bulkhead por proveedor externo.
+
+- El estado del cortacircuitos vive en la caché de Django, así que lo
+  comparten todos los workers que usan la misma caché.
+- El bulkhead limita las llamadas simultáneas a un proveedor dentro de cada
+  proceso; si no hay cupo en poco tiempo, se falla rápido en vez de
+  bloquear el worker. Las vistas async usan BulkheadAsync (asyncio.Semaphore
+  por event loop) con el mismo límite.
+
+Cuando un proveedor está caído, las llamadas lanzan ProveedorNoDisponible
+y las vistas responden 503 con Retry-After sin esperar al timeout.
+"""
+import asyncio
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+UMBRAL_FALLOS = getattr(settings, "CB_UMBRAL_FALLOS", 5)
+VENTANA = getattr(settings, "CB_VENTANA", 30)
+ENFRIAMIENTO = getattr(settings, "CB_ENFRIAMIENTO", 30)
+MAX_CONCURRENCIA = getattr(settings, "PROVEEDOR_MAX_CONCURRENCIA", 8)
+ESPERA_CUPO = getattr(settings, "PROVEEDOR_ESPERA_CUPO", 0.5)
+
+
+class ProveedorNoDisponible(requests.RequestException):
+    """
+    El cortacircuitos está abierto o el bulkhead no tiene cupo.
+    """
+
+    def __init__(self, proveedor: str, motivo: str, reintentar_en: int = 0):
+        self.proveedor = proveedor
+        self.motivo = motivo
+        self.reintentar_en = reintentar_en
+        super().__init__(f"Proveedor '{proveedor}' no disponible ({motivo})")
+
+    def como_respuesta(self) -> dict:
+        return {
+            "detail": str(self),
+            "proveedor": self.proveedor,
+            "motivo": self.motivo,
+            "reintentar_en": self.reintentar_en,
+        }
+
+
+class Cortacircuitos:
+    """
+    cerrado -> (UMBRAL_FALLOS fallos en VENTANA s) -> abierto
+    abierto -> (tras ENFRIAMIENTO s) -> semiabierto: pasa una sola sonda
+    sonda OK -> cerrado; sonda con fallo -> abierto otra vez
+    """
+
+    def __init__(self, nombre: str, umbral: int = UMBRAL_FALLOS, ventana: int = VENTANA,
+                 enfriamiento: int = ENFRIAMIENTO):
+        self.nombre = nombre
+        self.umbral = umbral
+        self.ventana = ventana
+        self.enfriamiento = enfriamiento
+        self._k_fallos = f"cb:{nombre}:fallos"
+        self._k_abierto = f"cb:{nombre}:abierto_hasta"
+        self._k_sonda = f"cb:{nombre}:sonda"
+
+    def estado(self) -> str:
+        hasta = cache.get(self._k_abierto)
+        if hasta is None:
+            return "cerrado"
+        return "abierto" if time.time() < hasta else "semiabierto"
+
+    def permitir(self) -> bool:
+        """
+        Lanza ProveedorNoDisponible si no se puede llamar. Devuelve True si
+        la llamada es la sonda del estado semiabierto.
+        """
+        hasta = cache.get(self._k_abierto)
+        if hasta is None:
+            return False
+        restante = hasta - time.time()
+        if restante > 0:
+            raise ProveedorNoDisponible(self.nombre, "circuito abierto", int(restante) + 1)
+        # Semiabierto: sólo un worker obtiene la sonda
+        if cache.add(self._k_sonda, 1, timeout=self.enfriamiento):
+            return True
+        raise ProveedorNoDisponible(self.nombre, "circuito semiabierto", self.enfriamiento)
+
+    def registrar_exito(self, sonda: bool = False):
+        if sonda or cache.get(self._k_fallos):
+            cache.delete_many([self._k_abierto, self._k_fallos, self._k_sonda])
+
+    def registrar_fallo(self, sonda: bool = False):
+        cache.add(self._k_fallos, 0, timeout=self.ventana)
+        try:
+            fallos = cache.incr(self._k_fallos)
+        except ValueError:
+            fallos = 1
+        if sonda or fallos >= self.umbral:
+            cache.set(self._k_abierto, time.time() + self.enfriamiento, timeout=self.enfriamiento * 10)
+            cache.delete_many([self._k_fallos, self._k_sonda])
+            print(f"[Resiliencia] Circuito '{self.nombre}' abierto por {self.enfriamiento}s")
+
+
+class Bulkhead:
+    """
+    Semáforo por proveedor: máximo de llamadas simultáneas en este proceso.
+    """
+
+    def __init__(self, nombre: str, maximo: int = MAX_CONCURRENCIA, espera: float = ESPERA_CUPO):
+        self.nombre = nombre
+        self.espera = espera
+        self._semaforo = threading.BoundedSemaphore(maximo)
+
+    def __enter__(self):
+        if not self._semaforo.acquire(timeout=self.espera):
+            raise ProveedorNoDisponible(self.nombre, "sin cupo de concurrencia", 1)
+        return self
+
+    def __exit__(self, *exc):
+        self._semaforo.release()
+        return False
+
+
+class BulkheadAsync:
+    """
+    Igual que Bulkhead para corrutinas: esperar cupo no ocupa un hilo.
+    """
+
+    def __init__(self, nombre: str, maximo: int = MAX_CONCURRENCIA, espera: float = ESPERA_CUPO):
+        self.nombre = nombre
+        self.espera = espera
+        self._semaforo = asyncio.Semaphore(maximo)
+
+    async def __aenter__(self):
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), self.espera)
+        except asyncio.TimeoutError:
+            raise ProveedorNoDisponible(self.nombre, "sin cupo de concurrencia", 1)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._semaforo.release()
+        return False
+
+
+_cortacircuitos = {}
+_bulkheads = {}
+_bulkheads_async = {}
+_lock = threading.Lock()
+
+
+def cortacircuitos(proveedor: str) -> Cortacircuitos:
+    with _lock:
+        if proveedor not in _cortacircuitos:
+            _cortacircuitos[proveedor] = Cortacircuitos(proveedor)
+        return _cortacircuitos[proveedor]
+
+
+def bulkhead(proveedor: str) -> Bulkhead:
+    with _lock:
+        if proveedor not in _bulkheads:
+            _bulkheads[proveedor] = Bulkhead(proveedor)
+        return _bulkheads[proveedor]
+
+
+def bulkhead_async(proveedor: str) -> BulkheadAsync:
+    """
+    Un semáforo por proveedor y event loop (uno por worker bajo uvicorn).
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        for clave in [c for c in _bulkheads_async if c[1].is_closed()]:
+            del _bulkheads_async[clave]
+        clave = (proveedor, loop)
+        if clave not in _bulkheads_async:
+            _bulkheads_async[clave] = BulkheadAsync(proveedor)
+        return _bulkheads_async[clave]
+
+
+def es_fallo(status_code) -> bool:
+    """
+    Errores de red (None), 5xx y 429 cuentan como fallo del proveedor.
+    """
+    return status_code is None or status_code >= 500 or status_code == 429
+
+
+def estado_proveedores() -> dict:
+    return {nombre: cb.estado() for nombre, cb in list(_cortacircuitos.items())}
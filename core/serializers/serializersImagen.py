@@ -0,0 +1,17 @@
+from rest_framework import serializers
+from ..models import TrabajoImagen
+
+
+class TrabajoImagenSerializer(serializers.ModelSerializer):
+    """
+    Serializer de solo lectura para consultar el estado de un trabajo de imagen
+    """
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+
+    class Meta:
+        model = TrabajoImagen
+        fields = [
+            'id', 'modelo', 'objeto_id', 'campo', 'estado', 'estado_display',
+            'url', 'error', 'fecha_creacion', 'fecha_actualizacion'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,234 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+import numpy as np
+from django.core import checks
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from administracion.models import Persona
+from administracion.views import PersonaViewSet
+from core import ingesta, reconocedores
+from core.models import EmbeddingFacial, TrabajoImagen
+from core.reconocedores import LocalReconocedor
+
+UMBRAL_PORTERIA = 0.80
+
+
+def _foto(semilla: int) -> BytesIO:
+    """
+    JPEG de ruido determinista: fotos distintas no se parecen entre sí.
+    """
+    rng = np.random.default_rng(semilla)
+    pixeles = rng.integers(0, 256, size=(96, 96, 3), dtype=np.uint8)
+    salida = BytesIO()
+    Image.fromarray(pixeles).save(salida, "JPEG", quality=95)
+    salida.seek(0)
+    return salida
+
+
+@override_settings(RECONOCEDOR_LOCAL_EXTRACTOR="core.reconocedores.rasgos_basicos")
+class LocalReconocedorTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rec = LocalReconocedor()
+
+    def test_la_misma_foto_es_el_primer_candidato(self):
+        ana = self.rec.enrolar("Ana", _foto(1), "porteria")["uuid"]
+        self.rec.enrolar("Beto", _foto(2), "porteria")
+
+        candidatos = self.rec.reconocer(_foto(1), "porteria")
+
+        self.assertEqual(candidatos[0]["uuid"], ana)
+        self.assertGreaterEqual(candidatos[0]["probability"], 0.99)
+        self.assertEqual([c["probability"] for c in candidatos],
+                         sorted((c["probability"] for c in candidatos), reverse=True))
+
+    def test_un_desconocido_queda_bajo_el_umbral(self):
+        self.rec.enrolar("Ana", _foto(1), "porteria")
+        self.rec.enrolar("Beto", _foto(2), "porteria")
+
+        candidatos = self.rec.reconocer(_foto(3), "porteria")
+
+        self.assertTrue(all(c["probability"] < UMBRAL_PORTERIA for c in candidatos))
+
+    def test_filtra_por_coleccion(self):
+        self.rec.enrolar("Ana", _foto(1), "porteria")
+        empleado = self.rec.enrolar("Carla", _foto(1), "empleados")["uuid"]
+
+        candidatos = self.rec.reconocer(_foto(1), "empleados")
+
+        self.assertEqual([c["uuid"] for c in candidatos], [empleado])
+
+    def test_top_k(self):
+        for i in range(6):
+            self.rec.enrolar(f"Persona {i}", _foto(10 + i), "porteria")
+
+        self.assertEqual(len(self.rec.reconocer(_foto(10), "porteria", k=3)), 3)
+
+    def test_otros_procesos_recargan_al_enrolar(self):
+        otro = LocalReconocedor()
+        self.assertEqual(otro.reconocer(_foto(1), "porteria"), [])
+
+        ana = self.rec.enrolar("Ana", _foto(1), "porteria")["uuid"]
+
+        self.assertEqual(otro.reconocer(_foto(1), "porteria")[0]["uuid"], ana)
+
+    def test_sin_sello_en_la_cache_no_recarga(self):
+        self.rec.enrolar("Ana", _foto(1), "porteria")
+        cache.clear()
+        self.rec.reconocer(_foto(1), "porteria")
+
+        with self.assertNumQueries(0):
+            self.rec.reconocer(_foto(1), "porteria")
+
+    def test_borrar_quita_del_indice(self):
+        ana = self.rec.enrolar("Ana", _foto(1), "porteria")["uuid"]
+
+        self.assertTrue(self.rec.borrar(ana))
+
+        self.assertFalse(EmbeddingFacial.objects.filter(uuid=ana).exists())
+        self.assertEqual(self.rec.reconocer(_foto(1), "porteria"), [])
+
+
+class ExtractorLocalTests(TestCase):
+
+    @override_settings(RECONOCEDOR_LOCAL_EXTRACTOR="")
+    def test_sin_extractor_no_arranca(self):
+        with self.assertRaises(ImproperlyConfigured):
+            LocalReconocedor()
+
+    @override_settings(RECONOCEDOR_BACKEND="local", RECONOCEDOR_LOCAL_EXTRACTOR="")
+    def test_check_sin_extractor(self):
+        ids = [e.id for e in checks.run_checks()]
+        self.assertIn("core.E001", ids)
+
+    @override_settings(RECONOCEDOR_BACKEND="luxand", RECONOCEDOR_LOCAL_EXTRACTOR="")
+    def test_check_con_luxand(self):
+        ids = [e.id for e in checks.run_checks()]
+        self.assertNotIn("core.E001", ids)
+
+
+class CacheCheckTests(TestCase):
+
+    def _ids(self):
+        return [e.id for e in checks.run_checks(tags=[checks.Tags.caches])]
+
+    def test_por_defecto_no_avisa(self):
+        self.assertNotIn("core.W001", self._ids())
+
+    def test_avisa_con_el_tope_por_defecto(self):
+        caches = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp/x"}}
+        with override_settings(CACHES=caches):
+            self.assertIn("core.W001", self._ids())
+
+
+@override_settings(IMAGEN_LOCAL_BASE_URL="http://testserver", MEDIA_URL="/media/")
+class AbrirImagenTests(TestCase):
+
+    def test_rechaza_hosts_no_permitidos(self):
+        with self.assertRaisesMessage(ValueError, "no permitido"):
+            reconocedores._abrir_imagen("http://169.254.169.254/latest/meta-data/")
+
+    def test_rechaza_salir_de_media_root(self):
+        with self.assertRaisesMessage(ValueError, "fuera de MEDIA_ROOT"):
+            reconocedores._abrir_imagen("http://testserver/media/../../etc/passwd")
+
+    def test_rechaza_rutas_locales_como_texto(self):
+        with self.assertRaisesMessage(ValueError, "URL http(s)"):
+            reconocedores._abrir_imagen("/etc/passwd")
+
+
+@mock.patch("core.ingesta.almacen.guardar", return_value="https://i.ibb.co/nueva.jpg")
+class IngestaTests(TestCase):
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        patcher = mock.patch.object(ingesta, "DIRECTORIO", temporal.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.persona = Persona.objects.create(
+            nombre="Ana", apellido="Pérez", sexo="F", tipo="P", CI="1",
+            fecha_nacimiento=date(1990, 1, 1),
+        )
+
+    def _encolar(self, cupo=False):
+        cupos = mock.Mock(acquire=mock.Mock(return_value=cupo))
+        with mock.patch.object(ingesta, "_cupos", cupos), mock.patch.object(ingesta, "_pool") as pool:
+            with self.captureOnCommitCallbacks(execute=True):
+                trabajo = ingesta.encolar(
+                    Persona, self.persona.pk, "imagen", _foto(1),
+                    despues=PersonaViewSet().imagen_subida, perfiles=("rostro", "miniatura"),
+                )
+        trabajo.refresh_from_db()
+        return trabajo, pool
+
+    def test_cola_llena_no_procesa_en_la_peticion(self, guardar):
+        trabajo, pool = self._encolar(cupo=False)
+
+        guardar.assert_not_called()
+        pool.submit.assert_not_called()
+        self.assertEqual(trabajo.estado, "P")
+        self.assertIsNone(trabajo.reclamado)
+        self.assertTrue(os.path.exists(trabajo.archivo))
+        self.assertEqual(trabajo.perfiles, "rostro,miniatura")
+        self.assertEqual(trabajo.post_proceso, "administracion.views.PersonaViewSet.imagen_subida")
+
+    def test_con_cupo_se_reclama_y_va_al_pool(self, guardar):
+        trabajo, pool = self._encolar(cupo=True)
+
+        self.assertIsNotNone(trabajo.reclamado)
+        pool.submit.assert_called_once()
+
+    @mock.patch.object(PersonaViewSet, "_enroll_luxand")
+    def test_el_barrido_retoma_los_pendientes(self, enrolar, guardar):
+        trabajo, _ = self._encolar(cupo=False)
+
+        self.assertEqual(ingesta.barrer(en_linea=True), 1)
+
+        trabajo.refresh_from_db()
+        self.persona.refresh_from_db()
+        self.assertEqual(trabajo.estado, "C")
+        self.assertEqual(self.persona.imagen, "https://i.ibb.co/nueva.jpg")
+        self.assertEqual(guardar.call_args.kwargs["perfiles"], ("rostro", "miniatura"))
+        enrolar.assert_called_once()
+        self.assertFalse(os.path.exists(trabajo.archivo))
+
+    def test_reclamo_vencido_se_retoma_y_vigente_no(self, guardar):
+        trabajo, _ = self._encolar(cupo=True)
+
+        self.assertEqual(ingesta.barrer(en_linea=True), 0)
+
+        TrabajoImagen.objects.filter(pk=trabajo.pk).update(
+            reclamado=timezone.now() - timedelta(seconds=ingesta.HUERFANO + 60))
+        with mock.patch.object(PersonaViewSet, "_enroll_luxand"):
+            self.assertEqual(ingesta.barrer(en_linea=True), 1)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, "C")
+
+    def test_sin_archivo_queda_con_error(self, guardar):
+        trabajo, _ = self._encolar(cupo=False)
+        os.remove(trabajo.archivo)
+
+        ingesta.barrer(en_linea=True)
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, "E")
+        guardar.assert_not_called()
+
+    def test_comando(self, guardar):
+        self._encolar(cupo=False)
+
+        with mock.patch.object(PersonaViewSet, "_enroll_luxand"):
+            call_command("recuperar_imagenes", stdout=StringIO())
+
+        self.assertFalse(TrabajoImagen.objects.filter(estado="P").exists())
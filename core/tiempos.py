@@ -0,0 +1,177 @@
+# core/tiempos.py
+"""
+Tiempos por etapa de las vistas de la barrera (ALPR y reconocimiento facial).
+
+Cada petición cronometrada mide sus etapas (lectura del archivo, proveedor,
+coincidencia en BD, serialización...) y:
+  - las devuelve en la cabecera Server-Timing (visible en las DevTools);
+  - las acumula en un histograma en memoria del proceso con p50/p95/p99 por
+    vista y etapa (GET /api/tiempos/).
+
+    class PersonaViewSet(CronometroMixin, viewsets.ModelViewSet):
+        @cronometrar("reconocimiento_facial")
+        def reconocimiento_facial(self, request):
+            with tiempos.etapa("lectura"):
+                ...
+
+`etapa()` se puede usar en cualquier función llamada desde la vista (p.ej.
+seguridad_IA.alpr); fuera de una petición cronometrada no hace nada. Las
+vistas async de Django (sin DRF) usan @cronometrar_vista.
+Las peticiones más lentas que TIEMPOS_LENTO_MS se registran con su desglose.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+MUESTRAS = getattr(settings, "TIEMPOS_MUESTRAS", 2048)
+LENTO_MS = getattr(settings, "TIEMPOS_LENTO_MS", 2000)
+PERCENTILES = (50, 95, 99)
+
+_actual = ContextVar("cronometro", default=None)
+
+
+class Histograma:
+    """
+    Últimas `MUESTRAS` duraciones (ms) por vista y etapa.
+    """
+
+    def __init__(self, muestras: int = MUESTRAS):
+        self.muestras = max(1, muestras)
+        self._series = {}
+        self._totales = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, vista: str, etapas: dict):
+        with self._lock:
+            for etapa, ms in etapas.items():
+                clave = (vista, etapa)
+                serie = self._series.get(clave)
+                if serie is None:
+                    serie = self._series[clave] = deque(maxlen=self.muestras)
+                serie.append(ms)
+                self._totales[clave] = self._totales.get(clave, 0) + 1
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            copia = {clave: sorted(serie) for clave, serie in self._series.items()}
+            totales = dict(self._totales)
+        resumen = {}
+        for (vista, etapa), valores in copia.items():
+            n = len(valores)
+            datos = {"n": totales[(vista, etapa)], "muestras": n, "max_ms": round(valores[-1], 1)}
+            for p in PERCENTILES:
+                # Rango más cercano: el valor en la posición ceil(n·p/100)
+                datos[f"p{p}_ms"] = round(valores[max(0, -(-n * p // 100) - 1)], 1)
+            resumen.setdefault(vista, {})[etapa] = datos
+        return resumen
+
+    def reiniciar(self):
+        with self._lock:
+            self._series.clear()
+            self._totales.clear()
+
+
+histograma = Histograma()
+
+
+class Cronometro:
+    """
+    Etapas de una petición, en orden. Una etapa repetida acumula su tiempo.
+    """
+
+    def __init__(self, vista: str):
+        self.vista = vista
+        self.etapas = {}
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nombre] = self.etapas.get(nombre, 0.0) + (time.perf_counter() - inicio) * 1000
+
+    def total(self) -> float:
+        return (time.perf_counter() - self._inicio) * 1000
+
+    def cabecera(self, total: float) -> str:
+        partes = [f"{nombre};dur={ms:.1f}" for nombre, ms in self.etapas.items()]
+        partes.append(f"total;dur={total:.1f}")
+        return ", ".join(partes)
+
+    def cerrar(self, response):
+        total = self.total()
+        response["Server-Timing"] = self.cabecera(total)
+        histograma.registrar(self.vista, {**self.etapas, "total": total})
+        if LENTO_MS and total >= LENTO_MS:
+            print(f"[Tiempos] {self.vista} lenta: {self.cabecera(total)}")
+        return response
+
+
+def etapa(nombre: str):
+    """
+    Mide `nombre` en la petición cronometrada en curso (si hay una).
+    """
+    cronometro = _actual.get()
+    return cronometro.etapa(nombre) if cronometro is not None else nullcontext()
+
+
+def cronometrar(vista: str):
+    """
+    Decorador del handler (post, @action...): abre el cronómetro de la petición.
+    La vista debe incluir CronometroMixin para cerrar y publicar los tiempos.
+    """
+    def decorador(handler):
+        @wraps(handler)
+        def envoltura(self, request, *args, **kwargs):
+            cronometro = Cronometro(vista)
+            request.cronometro = cronometro
+            token = _actual.set(cronometro)
+            try:
+                return handler(self, request, *args, **kwargs)
+            finally:
+                _actual.reset(token)
+        return envoltura
+    return decorador
+
+
+def cronometrar_vista(vista: str):
+    """
+    Decorador de vistas async de Django: abre el cronómetro y, con la respuesta
+    ya armada, añade Server-Timing y registra los tiempos.
+    """
+    def decorador(funcion):
+        @wraps(funcion)
+        async def envoltura(request, *args, **kwargs):
+            cronometro = Cronometro(vista)
+            token = _actual.set(cronometro)
+            try:
+                response = await funcion(request, *args, **kwargs)
+            finally:
+                _actual.reset(token)
+            return cronometro.cerrar(response)
+        return envoltura
+    return decorador
+
+
+class CronometroMixin:
+    """
+    Mide el renderizado de la respuesta ("serializacion") y añade Server-Timing
+    en las peticiones abiertas con @cronometrar.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        cronometro = getattr(request, "cronometro", None)
+        if cronometro is None:
+            return response
+        if hasattr(response, "render") and not response.is_rendered:
+            with cronometro.etapa("serializacion"):
+                response.render()
+        return cronometro.cerrar(response)
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import TrabajoImagenViewSet
+
+router = DefaultRouter()
+router.register(r'imagenes/trabajos', TrabajoImagenViewSet, basename='imagenes-trabajos')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,24 @@
+from rest_framework import viewsets
+from .models import TrabajoImagen
+from .serializers.serializersImagen import TrabajoImagenSerializer
+
+
+class TrabajoImagenViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta del estado de los trabajos de ingesta de imágenes
+    """
+    queryset = TrabajoImagen.objects.all()
+    serializer_class = TrabajoImagenSerializer
+
+    def get_queryset(self):
+        """
+        Filtrar por modelo/objeto si se especifica
+        """
+        queryset = super().get_queryset()
+        modelo = self.request.query_params.get('modelo', None)
+        if modelo:
+            queryset = queryset.filter(modelo=modelo)
+        objeto_id = self.request.query_params.get('objeto_id', None)
+        if objeto_id:
+            queryset = queryset.filter(objeto_id=objeto_id)
+        return queryset
@@ -6,9 +6,13 @@ from django.conf import settings
 from django.shortcuts import get_object_or_404
 from decimal import Decimal
 import stripe
+from core.http import sesion
 from .models import expensa as Expensa
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
+# Sesión HTTP compartida (keep-alive + timeouts) para las llamadas a Stripe
+_stripe_sesion = sesion("stripe")
+stripe.default_http_client = stripe.RequestsClient(session=_stripe_sesion, timeout=_stripe_sesion.timeout)
 
 class CreatePaymentIntentExpensa(APIView):
     """
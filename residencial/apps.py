@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ResidencialConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'residencial'
+
+    def ready(self):
+        # Señales que mantienen el padrón de placas en memoria
+        from . import indice_placas
+        indice_placas.conectar()
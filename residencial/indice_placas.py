@@ -0,0 +1,182 @@
+# residencial/indice_placas.py
+"""
+Padrón de placas registradas en memoria para la decisión de la barrera.
+
+Cada proceso mantiene placa_clave -> [Entrada] con los datos del vehículo ya
+serializados, así la búsqueda de una lectura no toca la base de datos. Se
+carga al arrancar (wsgi/asgi) o en la primera consulta, y las señales
+post_save/post_delete de Vehiculo y post_save de Persona (y sus subclases,
+conectar()) lo parchean. Un sello de versión en la caché avisa a los demás
+workers que recarguen.
+
+    from residencial import indice_placas
+    entrada, coincidencia = indice_placas.buscar("ABC123", alternativas)
+"""
+import threading
+import uuid as uuidlib
+from collections import namedtuple
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from administracion.models import Persona
+
+from .modelsVehiculo import Vehiculo
+from .placas import clave_confusion, normalizar_placa
+
+# datos: VehiculoSerializer(vehiculo).data
+Entrada = namedtuple("Entrada", "vehiculo_id placa_normalizada placa_clave persona_id propietario datos")
+
+_K_VERSION = "indice_placas:version"
+
+
+def _propietario(persona) -> str:
+    # Igual que LecturaPlacaSerializer.propietario
+    return str(persona) if persona else ""
+
+
+def _entrada(vehiculo) -> Entrada:
+    from .serializers.serializersVehiculo import VehiculoSerializer
+
+    return Entrada(
+        vehiculo.id, vehiculo.placa_normalizada, vehiculo.placa_clave, vehiculo.persona_id,
+        _propietario(vehiculo.persona), dict(VehiculoSerializer(vehiculo).data),
+    )
+
+
+class IndicePlacas:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_clave = {}
+        self._por_vehiculo = {}
+        self._version = None
+        self._cargado = False
+
+    def _cargar(self, version):
+        por_clave, por_vehiculo = {}, {}
+        for v in Vehiculo.objects.select_related("persona").exclude(placa_clave=""):
+            e = _entrada(v)
+            por_clave.setdefault(e.placa_clave, []).append(e)
+            por_vehiculo[e.vehiculo_id] = e
+        self._por_clave, self._por_vehiculo = por_clave, por_vehiculo
+        self._version = version
+        self._cargado = True
+
+    def _vigente(self):
+        version = cache.get(_K_VERSION)
+        if not self._cargado or version != self._version:
+            with self._lock:
+                if not self._cargado or version != self._version:
+                    self._cargar(version)
+
+    def calentar(self):
+        with self._lock:
+            self._cargar(cache.get(_K_VERSION))
+
+    def _publicar(self):
+        self._version = uuidlib.uuid4().hex
+        cache.set(_K_VERSION, self._version, timeout=None)
+
+    def _quitar(self, vehiculo_id):
+        anterior = self._por_vehiculo.pop(vehiculo_id, None)
+        if anterior is not None:
+            lista = [e for e in self._por_clave.get(anterior.placa_clave, []) if e.vehiculo_id != vehiculo_id]
+            if lista:
+                self._por_clave[anterior.placa_clave] = lista
+            else:
+                self._por_clave.pop(anterior.placa_clave, None)
+        return anterior
+
+    def actualizar_vehiculo(self, vehiculo):
+        e = _entrada(vehiculo)
+        with self._lock:
+            if self._por_vehiculo.get(vehiculo.id) == e:
+                return
+            self._quitar(vehiculo.id)
+            if e.placa_clave:
+                self._por_clave.setdefault(e.placa_clave, []).append(e)
+                self._por_vehiculo[e.vehiculo_id] = e
+            self._publicar()
+
+    def quitar_vehiculo(self, vehiculo_id):
+        with self._lock:
+            if self._quitar(vehiculo_id) is not None:
+                self._publicar()
+
+    def actualizar_propietario(self, persona):
+        nombre = _propietario(persona)
+        with self._lock:
+            cambios = [e for e in self._por_vehiculo.values() if e.persona_id == persona.id and e.propietario != nombre]
+            for e in cambios:
+                self._quitar(e.vehiculo_id)
+                nueva = e._replace(propietario=nombre)
+                self._por_clave.setdefault(nueva.placa_clave, []).append(nueva)
+                self._por_vehiculo[nueva.vehiculo_id] = nueva
+            if cambios:
+                self._publicar()
+
+    def buscar(self, placa, alternativas=()):
+        """
+        Coincidencia exacta normalizada (de la lectura o sus alternativas) o,
+        si no hay, una única coincidencia por clave de confusión.
+        Devuelve (Entrada | None, "exacta" | "aproximada" | None).
+        """
+        normalizadas = [n for n in dict.fromkeys(normalizar_placa(p) for p in (placa, *alternativas)) if n]
+        if not normalizadas:
+            return None, None
+        self._vigente()
+        por_clave = self._por_clave
+        claves = list(dict.fromkeys(clave_confusion(n) for n in normalizadas))
+        candidatos = [e for c in claves for e in por_clave.get(c, ())]
+        for n in normalizadas:
+            for e in candidatos:
+                if e.placa_normalizada == n:
+                    return e, "exacta"
+        aproximados = por_clave.get(claves[0], [])
+        if len(aproximados) == 1:
+            return aproximados[0], "aproximada"
+        return None, None
+
+    def __len__(self):
+        return len(self._por_vehiculo)
+
+
+indice = IndicePlacas()
+
+
+def buscar(placa, alternativas=()):
+    return indice.buscar(placa, alternativas)
+
+
+def calentar():
+    indice.calentar()
+
+
+@receiver(post_save, sender=Vehiculo, dispatch_uid="indice_placas_vehiculo_save")
+def _vehiculo_guardado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indice.actualizar_vehiculo(instance)
+
+
+@receiver(post_delete, sender=Vehiculo, dispatch_uid="indice_placas_vehiculo_delete")
+def _vehiculo_borrado(sender, instance, **kwargs):
+    indice.quitar_vehiculo(instance.id)
+
+
+def _persona_guardada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indice.actualizar_propietario(instance)
+
+
+def conectar():
+    """
+    Conecta el cambio de propietario a Persona y a sus subclases multi-tabla
+    (que envían sus propias señales). Se llama desde AppConfig.ready.
+    """
+    for modelo in apps.get_models():
+        if issubclass(modelo, Persona):
+            post_save.connect(_persona_guardada, sender=modelo,
+                              dispatch_uid=f"indice_placas_persona_save_{modelo._meta.label_lower}")
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+from residencial.placas import clave_confusion, normalizar_placa
+
+
+def rellenar_placas(apps, schema_editor):
+    Vehiculo = apps.get_model('residencial', 'Vehiculo')
+    lote = []
+    for v in Vehiculo.objects.only('id', 'placa').iterator(chunk_size=500):
+        v.placa_normalizada = normalizar_placa(v.placa)
+        v.placa_clave = clave_confusion(v.placa)
+        lote.append(v)
+        if len(lote) >= 500:
+            Vehiculo.objects.bulk_update(lote, ['placa_normalizada', 'placa_clave'])
+            lote = []
+    if lote:
+        Vehiculo.objects.bulk_update(lote, ['placa_normalizada', 'placa_clave'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('residencial', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehiculo',
+            name='placa_clave',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20, verbose_name='Clave de Placa (OCR)'),
+        ),
+        migrations.AddField(
+            model_name='vehiculo',
+            name='placa_normalizada',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20, verbose_name='Placa Normalizada'),
+        ),
+        migrations.RunPython(rellenar_placas, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.utils import timezone
 
+from .placas import clave_confusion, normalizar_placa
+
 class Vehiculo(models.Model):
     TIPO_CHOICES = [
         ('Automóvil', 'Automóvil'),
@@ -16,6 +18,9 @@ class Vehiculo(models.Model):
     marca = models.CharField(max_length=20, verbose_name='Marca')
     modelo = models.CharField(max_length=20, verbose_name='Modelo')
     placa = models.CharField(max_length=20, verbose_name='Placa')
+    # Derivados de `placa` (ver residencial.placas), mantenidos en save()
+    placa_normalizada = models.CharField(max_length=20, db_index=True, editable=False, default='', verbose_name='Placa Normalizada')
+    placa_clave = models.CharField(max_length=20, db_index=True, editable=False, default='', verbose_name='Clave de Placa (OCR)')
     tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name='Tipo')
     imagen = models.URLField(blank=True, null=True, verbose_name='Imagen')
     fecha_registro = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Registro')
@@ -30,6 +35,14 @@ class Vehiculo(models.Model):
     def __str__(self):
         return f"{self.marca} {self.modelo} - {self.placa}"
 
+    def save(self, *args, **kwargs):
+        self.placa_normalizada = normalizar_placa(self.placa)
+        self.placa_clave = clave_confusion(self.placa)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'placa' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'placa_normalizada', 'placa_clave'}
+        super().save(*args, **kwargs)
+
 class Bloque(models.Model):
     id = models.AutoField(primary_key=True)
     nombre = models.CharField(max_length=20, verbose_name="Nombre del Bloque")
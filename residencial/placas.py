@@ -0,0 +1,31 @@
+# residencial/placas.py
+"""
+Normalización de placas para búsquedas indexadas.
+
+- normalizar_placa: mayúsculas, sin espacios, guiones ni acentos ("abc-123" -> "ABC123").
+- clave_confusion: además reduce los caracteres que el OCR suele confundir a
+  un representante común (O/Q/D -> 0, I/L -> 1, Z -> 2, S -> 5, G -> 6, B -> 8),
+  así "8OL-123" y "BOL123" comparten clave y se encuentran con un = indexado.
+"""
+import unicodedata
+
+_CONFUSIONES = str.maketrans({
+    "O": "0", "Q": "0", "D": "0",
+    "I": "1", "L": "1",
+    "Z": "2",
+    "S": "5",
+    "G": "6",
+    "B": "8",
+})
+
+
+def normalizar_placa(placa) -> str:
+    if not placa:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(placa)).encode("ascii", "ignore").decode("ascii")
+    return "".join(c for c in texto.upper() if c.isalnum())
+
+
+def clave_confusion(placa) -> str:
+    return normalizar_placa(placa).translate(_CONFUSIONES)
+
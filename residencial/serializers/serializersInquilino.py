@@ -5,6 +5,7 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import date
 from ..modelsVehiculo import Vehiculo
+from ..placas import normalizar_placa
 
 
 
@@ -107,10 +108,12 @@ class VehiculoSerializer(serializers.ModelSerializer):
         """
         Validar que la placa sea única
         """
+        # Comparación normalizada (indexada): "ABC-123" y "abc123" son la misma placa
+        existentes = Vehiculo.objects.filter(placa_normalizada=normalizar_placa(value))
         if self.instance:
-            if Vehiculo.objects.filter(placa=value).exclude(pk=self.instance.pk).exists():
+            if existentes.exclude(pk=self.instance.pk).exists():
                 raise serializers.ValidationError("Ya existe un vehículo con esta placa.")
         else:
-            if Vehiculo.objects.filter(placa=value).exists():
+            if existentes.exists():
                 raise serializers.ValidationError("Ya existe un vehículo con esta placa.")
         return value
@@ -1,3 +1,139 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from administracion.models import Cargo, Persona
+
+from . import indice_placas
+from .models import Visitante
+from .modelsVehiculo import Vehiculo
+from .placas import clave_confusion, normalizar_placa
+from .serializers.serializersInquilino import VehiculoSerializer
+
+
+class PlacasTests(SimpleTestCase):
+
+    def test_normalizar_placa(self):
+        casos = {
+            "abc-123": "ABC123",
+            " AbC 123 ": "ABC123",
+            "ñandú-12": "NANDU12",
+            "a.b_c/1": "ABC1",
+            "": "",
+            None: "",
+        }
+        for placa, esperada in casos.items():
+            with self.subTest(placa=placa):
+                self.assertEqual(normalizar_placa(placa), esperada)
+
+    def test_clave_confusion(self):
+        self.assertEqual(clave_confusion("OQD-ILZ"), "000112")
+        self.assertEqual(clave_confusion("sgb-789"), "568789")
+        self.assertEqual(clave_confusion("8OL-123"), clave_confusion("BOL123"))
+        self.assertNotEqual(clave_confusion("ABC123"), clave_confusion("ABC124"))
+
+
+class VehiculoPlacaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.persona = Persona.objects.create(
+            nombre="Ana", apellido="Pérez", sexo="F", tipo="P",
+            CI="1234567", fecha_nacimiento=date(1990, 1, 1),
+        )
+        cls.vehiculo = cls._vehiculo("ABC123")
+
+    @classmethod
+    def _vehiculo(cls, placa):
+        return Vehiculo.objects.create(
+            persona=cls.persona, color="Rojo", marca="Toyota",
+            modelo="Corolla", placa=placa, tipo="Automóvil",
+        )
+
+    def _datos(self, placa):
+        return {
+            "persona": self.persona.pk, "color": "Azul", "marca": "Nissan",
+            "modelo": "Sentra", "placa": placa, "tipo": "Automóvil",
+        }
+
+    def test_save_deriva_los_campos(self):
+        vehiculo = self._vehiculo("bol-12 3")
+        vehiculo.refresh_from_db()
+
+        self.assertEqual(vehiculo.placa_normalizada, "BOL123")
+        self.assertEqual(vehiculo.placa_clave, "801123")
+
+    def test_save_con_update_fields_actualiza_los_derivados(self):
+        self.vehiculo.placa = "xyz-987"
+        self.vehiculo.save(update_fields=["placa"])
+        self.vehiculo.refresh_from_db()
+
+        self.assertEqual(self.vehiculo.placa_normalizada, "XYZ987")
+        self.assertEqual(self.vehiculo.placa_clave, "XY2987")
+
+    def test_rechaza_la_misma_placa_con_otro_formato(self):
+        serializer = VehiculoSerializer(data=self._datos("abc-123"))
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors["placa"], ["Ya existe un vehículo con esta placa."])
+
+    def test_acepta_una_placa_distinta(self):
+        self.assertTrue(VehiculoSerializer(data=self._datos("ABC124")).is_valid())
+
+    def test_actualizar_el_mismo_vehiculo(self):
+        serializer = VehiculoSerializer(self.vehiculo, data=self._datos("abc 123"))
+
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_actualizar_a_la_placa_de_otro(self):
+        otro = self._vehiculo("DEF456")
+        serializer = VehiculoSerializer(otro, data=self._datos("abc-123"))
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("placa", serializer.errors)
+
+
+class IndicePlacasPropietarioTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        indice_placas.indice.calentar()
+
+    def _vehiculo(self, persona, placa):
+        return Vehiculo.objects.create(
+            persona=persona, color="Rojo", marca="Toyota",
+            modelo="Corolla", placa=placa, tipo="Automóvil",
+        )
+
+    def test_renombrar_al_propietario_actualiza_el_padron(self):
+        ana = Persona.objects.create(
+            nombre="Ana", apellido="Pérez", sexo="F", tipo="P",
+            CI="1", fecha_nacimiento=date(1990, 1, 1),
+        )
+        self._vehiculo(ana, "ABC123")
+
+        ana.apellido = "Gómez"
+        ana.save()
+
+        entrada, _ = indice_placas.buscar("ABC123")
+        self.assertIn("Ana Gómez", entrada.propietario)
+
+    def test_subclases_de_persona(self):
+        vale = Visitante.objects.create(
+            nombre="Vale", apellido="Soto", sexo="F", CI="2", fecha_nacimiento=date(1990, 1, 1),
+        )
+        self._vehiculo(vale, "XYZ987")
+
+        vale.apellido = "Ruiz"
+        vale.save()
+
+        entrada, _ = indice_placas.buscar("XYZ987")
+        self.assertIn("Vale Ruiz", entrada.propietario)
+
+    def test_otros_modelos_no_tocan_el_padron(self):
+        with mock.patch.object(indice_placas.indice, "actualizar_propietario") as actualizar:
+            Cargo.objects.create(nombre="Guardia")
+
+        actualizar.assert_not_called()
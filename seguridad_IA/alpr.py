@@ -0,0 +1,257 @@
+# seguridad_IA/alpr.py
+"""
+Procesamiento de un cuadro de cámara: ALPR (PlateRecognizer), búsqueda del
+vehículo, LecturaPlaca (escritura diferida, seguridad_IA.buffer_lecturas) y
+recorte de la placa en segundo plano (opcional, ALPR_RECORTES).
+
+Lo usan la vista async (alpr_scan, con aprocesar_frame), la de lotes
+(AlprLoteView) y los workers de la cola (seguridad_IA.cola_alpr), así todos
+deciden igual.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core import ingesta, tiempos
+from core.http import cliente_async, sesion
+from core.normalizacion import recortar
+from core.resiliencia import ProveedorNoDisponible
+from residencial import indice_placas
+from residencial.placas import normalizar_placa
+
+from . import buffer_lecturas, debounce
+from .models import LecturaPlaca
+from .serializers.serializersPlaca import LecturaPlacaSerializer
+
+PLATE_URL = "https://api.platerecognizer.com/v1/plate-reader/"
+LOTE_WORKERS = getattr(settings, "ALPR_LOTE_WORKERS", 5)
+# Cada recorte es una subida más al almacén: sólo si se pide
+RECORTES = getattr(settings, "ALPR_RECORTES", "ninguno")
+
+_pool = ThreadPoolExecutor(max_workers=LOTE_WORKERS, thread_name_prefix="alpr-lote")
+
+
+class ErrorAlpr(Exception):
+    """
+    El ALPR no respondió OK; `respuesta` y `status` son los de la vista.
+    """
+
+    def __init__(self, respuesta: dict, status: int):
+        self.respuesta = respuesta
+        self.status = status
+        super().__init__(respuesta.get("error", "Error ALPR"))
+
+
+def _leer_placas(frame, camera_id: str, regions: str) -> list:
+    """
+    Llama a PlateRecognizer con el cuadro y devuelve sus `results`.
+    """
+    headers = {"Authorization": f"Token {settings.PLATE_TOKEN}"}
+    payload = {"regions": regions or settings.PLATE_REGIONS}
+    if camera_id:
+        payload["camera_id"] = camera_id
+
+    files = {"upload": ("frame.jpg", frame, "image/jpeg")}
+    try:
+        frame.seek(0)
+        # Sin reintentos con sleep: un 429/5xx cuenta para el cortacircuitos y se responde de inmediato
+        r = sesion("platerecognizer").post(PLATE_URL, headers=headers, data=payload, files=files, timeout=20)
+    except ProveedorNoDisponible:
+        raise
+    except requests.RequestException as e:
+        raise ErrorAlpr({"error": "No se pudo contactar al ALPR", "detail": str(e)}, 502)
+
+    # 🔧 ACEPTAR 200/201 COMO ÉXITO
+    if r.status_code not in (200, 201):
+        raise ErrorAlpr({"error": "ALPR no respondió OK", "status_code": r.status_code, "detail": r.text}, r.status_code)
+
+    return r.json().get("results", [])
+
+
+async def _aleer_placas(frame, camera_id: str, regions: str) -> list:
+    """
+    _leer_placas() con httpx: la espera (y el backoff de los reintentos) no ocupa un hilo.
+    """
+    headers = {"Authorization": f"Token {settings.PLATE_TOKEN}"}
+    payload = {"regions": regions or settings.PLATE_REGIONS}
+    if camera_id:
+        payload["camera_id"] = camera_id
+
+    frame.seek(0)
+    nombre = os.path.basename(getattr(frame, "name", "") or "") or "frame.jpg"
+    files = {"upload": (nombre, frame.read(), "image/jpeg")}
+    frame.seek(0)
+    try:
+        r = await cliente_async("platerecognizer").post(PLATE_URL, headers=headers, data=payload, files=files)
+    except ProveedorNoDisponible:
+        raise
+    except httpx.HTTPError as e:
+        raise ErrorAlpr({"error": "No se pudo contactar al ALPR", "detail": str(e)}, 502)
+
+    if r.status_code not in (200, 201):
+        raise ErrorAlpr({"error": "ALPR no respondió OK", "status_code": r.status_code, "detail": r.text}, r.status_code)
+
+    return r.json().get("results", [])
+
+
+def procesar_frame(frame, camera_id: str = "", regions: str = "") -> dict:
+    """
+    `frame` es el cuadro ya normalizado al perfil "placa".
+    Devuelve la decisión (dict de respuesta). Lanza ErrorAlpr o
+    ProveedorNoDisponible si PlateRecognizer no está disponible.
+    """
+    if not settings.PLATE_TOKEN:
+        raise ErrorAlpr({"error": "Configura PLATE_TOKEN"}, 500)
+
+    # Debounce por cámara: un cuadro casi igual a uno reciente no llega al ALPR
+    with tiempos.etapa("debounce"):
+        h = debounce.hash_cuadro(frame)
+        repetida = debounce.por_cuadro(camera_id, h)
+    if repetida is not None:
+        return repetida
+
+    with tiempos.etapa("alpr"):
+        results = _leer_placas(frame, camera_id, regions)
+    return _decidir(frame, results, camera_id, h)
+
+
+def _repetida_por_cuadro(frame, camera_id: str):
+    h = debounce.hash_cuadro(frame)
+    return h, debounce.por_cuadro(camera_id, h)
+
+
+async def aprocesar_frame(frame, camera_id: str = "", regions: str = "") -> dict:
+    """
+    procesar_frame() para vistas async: el debounce y la decisión (índice,
+    LecturaPlaca, BD) pasan a un hilo; la llamada a PlateRecognizer se espera
+    en el event loop.
+    """
+    if not settings.PLATE_TOKEN:
+        raise ErrorAlpr({"error": "Configura PLATE_TOKEN"}, 500)
+
+    # Hash (PIL) y debounce (caché en disco) fuera del event loop
+    with tiempos.etapa("debounce"):
+        h, repetida = await sync_to_async(_repetida_por_cuadro, thread_sensitive=False)(frame, camera_id)
+    if repetida is not None:
+        return repetida
+
+    with tiempos.etapa("alpr"):
+        results = await _aleer_placas(frame, camera_id, regions)
+    return await sync_to_async(_decidir)(frame, results, camera_id, h)
+
+
+def procesar_lote(frames, camera_id: str = "", regions: str = "") -> dict:
+    """
+    Varios cuadros del mismo vehículo: se envían al ALPR en paralelo y se
+    decide con la mejor lectura de todos (una sola LecturaPlaca).
+    Sólo falla si fallan todos los cuadros.
+    """
+    if not settings.PLATE_TOKEN:
+        raise ErrorAlpr({"error": "Configura PLATE_TOKEN"}, 500)
+
+    hashes = [debounce.hash_cuadro(f) for f in frames]
+    for h in hashes:
+        repetida = debounce.por_cuadro(camera_id, h)
+        if repetida is not None:
+            return {**repetida, "cuadros": len(frames)}
+
+    futuros = [_pool.submit(_leer_placas, f, camera_id, regions) for f in frames]
+    lecturas, errores = [], []
+    for indice, futuro in enumerate(futuros):
+        try:
+            lecturas.extend((indice, r) for r in futuro.result())
+        except (ErrorAlpr, ProveedorNoDisponible) as e:
+            errores.append(e)
+    if errores and len(errores) == len(frames):
+        raise errores[0]
+
+    ganador = max(lecturas, key=lambda x: x[1].get("score", 0) or 0.0)[0] if lecturas else 0
+    decision = _decidir(
+        frames[ganador], [r for i, r in lecturas if i == ganador], camera_id, hashes[ganador]
+    )
+    # Los demás cuadros también quedan asociados a la decisión para el debounce
+    for i, h in enumerate(hashes):
+        if i != ganador:
+            debounce.recordar_cuadro(camera_id, normalizar_placa(decision.get("plate")), h)
+    return {**decision, "cuadros": len(frames), "cuadro_ganador": ganador, "cuadros_fallidos": len(errores)}
+
+
+def _decidir(frame, results: list, camera_id: str, h) -> dict:
+    if not results:
+        l = LecturaPlaca(placa="", score=0.0, camera_id=camera_id, image_url=None, vehiculo=None, match=False)
+        with tiempos.etapa("bd"):
+            buffer_lecturas.asignar_id(l)
+            buffer_lecturas.agregar(l)
+        with tiempos.etapa("serializacion"):
+            datos_lectura = LecturaPlacaSerializer(l).data
+        decision = {
+            "status": "no-plate-found",
+            "plate": None, "score": None, "match": False,
+            "vehiculo": None,
+            "lectura": datos_lectura
+        }
+        debounce.recordar(camera_id, "", decision, h)
+        return decision
+
+    best      = max(results, key=lambda x: x.get("score", 0) or 0.0)
+    plate_raw = (best.get("plate") or "").upper()
+    score     = float(best.get("score") or 0.0)
+
+    # Misma placa ya decidida en esta cámara dentro de la ventana: sin nueva lectura
+    with tiempos.etapa("debounce"):
+        repetida = debounce.por_placa(camera_id, normalizar_placa(plate_raw), h)
+    if repetida is not None:
+        return repetida
+
+    # Exacta normalizada o tolerante a confusiones del OCR (O/0, I/1, B/8...)
+    alternativas = [c.get("plate") for c in best.get("candidates") or [] if c.get("plate")]
+    # Padrón en memoria: sin consultas para decidir
+    with tiempos.etapa("coincidencia"):
+        entrada, coincidencia = indice_placas.buscar(plate_raw, alternativas)
+
+    # Sólo la placa exacta (normalizada) abre: la aproximada va con el vehículo
+    # candidato para que el guardia la confirme
+    match = coincidencia == "exacta"
+    lectura = LecturaPlaca(
+        placa=plate_raw, score=score, camera_id=camera_id, image_url=None,
+        vehiculo_id=entrada.vehiculo_id if entrada else None, match=match
+    )
+
+    # Recorte de la placa en segundo plano -> lectura.image_url, cuando ya tenga id (ALPR_RECORTES)
+    despues = None
+    if best.get("box") and (RECORTES == "todos" or (RECORTES == "sin_coincidencia" and not match)):
+        try:
+            recorte = recortar(frame, best["box"])
+            despues = lambda l: ingesta.encolar(LecturaPlaca, l.id, "image_url", recorte, perfiles=())
+        except Exception as e:
+            print(f"[ALPR] No se pudo recortar la placa: {e}")
+
+    # El id (reservado) va en la respuesta aunque el INSERT sea diferido
+    with tiempos.etapa("bd"):
+        buffer_lecturas.asignar_id(lectura)
+    with tiempos.etapa("serializacion"):
+        datos_lectura = LecturaPlacaSerializer(
+            lectura, context={"propietario": entrada.propietario if entrada else None}
+        ).data
+    decision = {
+        "status": "ok",
+        "plate": plate_raw,
+        "score": score,
+        "match": match,
+        "coincidencia": coincidencia,
+        "requiere_confirmacion": coincidencia == "aproximada",
+        "vehiculo": entrada.datos if entrada else None,
+        "lectura": datos_lectura
+    }
+
+    # Escritura diferida: la respuesta no espera el INSERT.
+    # El evento para las pantallas de los guardias se publica con el lote.
+    with tiempos.etapa("bd"):
+        buffer_lecturas.agregar(lectura, despues, evento=decision)
+
+    debounce.recordar(camera_id, normalizar_placa(plate_raw), decision, h)
+    return decision
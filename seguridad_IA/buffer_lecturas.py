@@ -0,0 +1,359 @@
+# seguridad_IA/buffer_lecturas.py
+"""
+Escritura diferida (write-behind) de LecturaPlaca.
+
+La vista arma la lectura sin guardarla y la deja en el buffer; un hilo la
+inserta junto con las demás en un solo bulk_create cuando se juntan
+LECTURAS_BUFFER_MAX lecturas o pasan LECTURAS_BUFFER_SEGUNDOS. Tras cada
+lote se actualizan los resúmenes horarios (rollups.acumular), se publican
+los eventos de acceso (seguridad_IA.eventos) y se ejecutan las tareas que
+necesitan el id (p.ej. encolar el recorte de la placa).
+
+El id se asigna antes de responder (asignar_id), así la respuesta lo trae
+igual que con el INSERT en la petición: en PostgreSQL se reservan bloques
+de la secuencia de la tabla y el lote se inserta con esos ids; en otros
+motores (SQLite en desarrollo) la lectura se inserta en la petición. Si la
+BD no responde al reservar, la lectura igual queda en el buffer y sale sin id.
+
+Durabilidad: cada lectura se anota además (con fsync) en un segmento JSONL
+en LECTURAS_SPOOL_DIR antes de responder. El segmento se borra cuando su
+lote queda guardado; si la BD falla queda como ".pendiente". Los segmentos
+pendientes, o abiertos o a medio reinsertar por un worker que murió (sin
+cambios en HUERFANO segundos), los reinserta cualquier worker. Las lecturas
+con id reservado no se duplican al reinsertar un lote que ya se había
+guardado (un corte justo entre el commit y el borrado del segmento); sólo
+su resumen horario.
+
+LECTURAS_BUFFER_MAX = 0 desactiva el buffer (INSERT en la petición).
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid as uuidlib
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from residencial.modelsVehiculo import Vehiculo
+
+from . import eventos, rollups
+from .models import LecturaPlaca
+
+MAXIMO = getattr(settings, "LECTURAS_BUFFER_MAX", 200)
+SEGUNDOS = getattr(settings, "LECTURAS_BUFFER_SEGUNDOS", 1.0)
+SPOOL_DIR = getattr(settings, "LECTURAS_SPOOL_DIR", "") or os.path.join(settings.BASE_DIR, "spool", "lecturas")
+HUERFANO = 600
+
+CAMPOS = ("id", "placa", "score", "camera_id", "image_url", "vehiculo_id", "match")
+
+
+def _a_linea(lectura) -> str:
+    datos = {c: getattr(lectura, c) for c in CAMPOS}
+    datos["created_at"] = lectura.created_at.isoformat()
+    return json.dumps(datos) + "\n"
+
+
+def _de_linea(linea: str):
+    datos = json.loads(linea)
+    datos["created_at"] = parse_datetime(datos["created_at"])
+    return LecturaPlaca(**datos)
+
+
+def _sin_vehiculos_borrados(lecturas):
+    # El vehículo pudo borrarse entre la lectura y el INSERT
+    ids = {l.vehiculo_id for l in lecturas if l.vehiculo_id}
+    if ids:
+        existentes = set(Vehiculo.objects.filter(id__in=ids).values_list("id", flat=True))
+        for l in lecturas:
+            if l.vehiculo_id and l.vehiculo_id not in existentes:
+                l.vehiculo_id, l.match = None, False
+
+
+def _insertar(lecturas):
+    _sin_vehiculos_borrados(lecturas)
+    con_id = [l for l in lecturas if l.pk is not None]
+    sin_id = [l for l in lecturas if l.pk is None]
+    with transaction.atomic():
+        if con_id:
+            # Ids reservados: reinsertar un lote ya guardado no lo duplica
+            LecturaPlaca.objects.bulk_create(con_id, ignore_conflicts=True)
+        if sin_id:
+            LecturaPlaca.objects.bulk_create(sin_id)
+    # El resumen horario no debe perder el lote si falla
+    try:
+        rollups.acumular(lecturas)
+    except Exception as e:
+        print(f"[Lecturas] No se pudo actualizar el resumen horario: {e}")
+
+
+class ReservaIds:
+    """
+    Ids de LecturaPlaca tomados por bloques de la secuencia (sólo PostgreSQL).
+    """
+
+    def __init__(self, bloque: int = MAXIMO):
+        self.bloque = max(1, bloque)
+        self._ids = deque()
+        self._lock = threading.Lock()
+
+    def tomar(self):
+        """
+        Un id reservado, o None si el motor no tiene secuencias.
+        """
+        if connection.vendor != "postgresql":
+            return None
+        with self._lock:
+            if not self._ids:
+                self._ids.extend(self._reservar())
+            return self._ids.popleft()
+
+    def _reservar(self) -> list:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [LecturaPlaca._meta.db_table, self.bloque],
+            )
+            return [fila[0] for fila in cursor.fetchall()]
+
+
+class BufferLecturas:
+
+    def __init__(self, maximo: int = MAXIMO, segundos: float = SEGUNDOS, directorio: str = SPOOL_DIR):
+        self.maximo = maximo
+        self.segundos = max(0.05, segundos)
+        self.directorio = directorio
+        # [(lectura, despues, evento)] y el segmento donde están anotadas
+        self._pendientes = []
+        self._segmento = None
+        self._archivo = None
+        self._propios = set()
+        self._cond = threading.Condition()
+        self._hilo = None
+        self._ultima_revision = 0.0
+        self._ids = ReservaIds(maximo)
+        self.insertadas = 0
+        self.lotes = 0
+        self.reinsertadas = 0
+        self.fallos = 0
+
+    # ---------- escritura ----------
+
+    def asignar_id(self, lectura):
+        """
+        Da id a `lectura` antes de serializarla: reservado si se puede
+        diferir el INSERT; si no, la inserta ya (agregar() sólo completa
+        las tareas posteriores).
+        """
+        if lectura.pk is not None:
+            return
+        if self.maximo > 0:
+            try:
+                lectura.id = self._ids.tomar()
+            except Exception as e:
+                # Sin BD no hay id, pero la lectura no se pierde: va al buffer (y al spool)
+                print(f"[Lecturas] No se pudo reservar el id de la lectura: {e}")
+                return
+            if lectura.id is not None:
+                return
+        _insertar([lectura])
+        lectura._insertada = True
+
+    def agregar(self, lectura, despues=None, evento=None):
+        """
+        Deja `lectura` (sin guardar) para el próximo lote. `despues(lectura)`
+        se llama cuando ya está guardada; `evento` (la decisión) se publica entonces.
+        """
+        if getattr(lectura, "_insertada", False):
+            _tareas_posteriores([(lectura, despues, evento)])
+            return
+        if self.maximo <= 0:
+            _insertar([lectura])
+            _tareas_posteriores([(lectura, despues, evento)])
+            return
+        with self._cond:
+            self._arrancar()
+            try:
+                self._anotar(lectura)
+            except OSError as e:
+                # Sin spool la lectura igual se guarda en el próximo lote
+                print(f"[Lecturas] No se pudo anotar la lectura en {self.directorio}: {e}")
+            self._pendientes.append((lectura, despues, evento))
+            if len(self._pendientes) >= self.maximo:
+                self._cond.notify()
+
+    def _anotar(self, lectura):
+        if self._archivo is None:
+            os.makedirs(self.directorio, exist_ok=True)
+            self._segmento = os.path.join(self.directorio, f"lecturas-{uuidlib.uuid4().hex}.abierto")
+            self._archivo = open(self._segmento, "a", encoding="utf-8")
+            self._propios.add(self._segmento)
+        self._archivo.write(_a_linea(lectura))
+        self._archivo.flush()
+        # Sin fsync la línea podría perderse si se cae el equipo (no sólo el proceso)
+        os.fsync(self._archivo.fileno())
+
+    def _arrancar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._trabajar, name="lecturas-buffer", daemon=True)
+            self._hilo.start()
+
+    def _trabajar(self):
+        while True:
+            with self._cond:
+                if len(self._pendientes) < self.maximo:
+                    self._cond.wait(self.segundos)
+            try:
+                self.vaciar()
+                if time.time() - self._ultima_revision >= 60:
+                    self._ultima_revision = time.time()
+                    self.reinsertar_huerfanos()
+            except Exception as e:
+                print(f"[Lecturas] Error en el buffer: {e}")
+            finally:
+                close_old_connections()
+
+    def vaciar(self):
+        """
+        Inserta ya lo pendiente. Si la BD falla, el segmento queda para reinsertar.
+        """
+        with self._cond:
+            lote, segmento = self._pendientes, self._segmento
+            if self._archivo is not None:
+                self._archivo.close()
+            self._pendientes, self._segmento, self._archivo = [], None, None
+        if not lote:
+            return 0
+        try:
+            _insertar([l for l, _, _ in lote])
+        except Exception as e:
+            self.fallos += 1
+            if segmento is None:
+                print(f"[Lecturas] No se pudieron guardar {len(lote)} lecturas, se reintentan: {e}")
+                with self._cond:
+                    self._pendientes[:0] = lote
+                return 0
+            print(f"[Lecturas] No se pudieron guardar {len(lote)} lecturas, quedan en {segmento}: {e}")
+            _renombrar(segmento, segmento.replace(".abierto", ".pendiente"))
+            self._propios.discard(segmento)
+            return 0
+        if segmento is not None:
+            _borrar(segmento)
+            self._propios.discard(segmento)
+        self.insertadas += len(lote)
+        self.lotes += 1
+        _tareas_posteriores(lote)
+        return len(lote)
+
+    # ---------- recuperación ----------
+
+    def reinsertar_huerfanos(self) -> int:
+        """
+        Reinserta los segmentos pendientes y los abiertos o en reinserción
+        abandonados por otro worker.
+        """
+        total = 0
+        limite = time.time() - HUERFANO
+        for ruta in glob.glob(os.path.join(self.directorio, "lecturas-*.*")):
+            if ruta in self._propios:
+                continue
+            if ruta.endswith(".abierto") or ".reinsertando-" in ruta:
+                try:
+                    if os.path.getmtime(ruta) > limite:
+                        continue
+                except OSError:
+                    continue
+            elif not ruta.endswith(".pendiente"):
+                continue
+            total += self._reinsertar(ruta)
+        return total
+
+    def _reinsertar(self, ruta) -> int:
+        base = ruta.split(".reinsertando-")[0] if ".reinsertando-" in ruta else ruta.rsplit(".", 1)[0]
+        tomado = f"{base}.reinsertando-{uuidlib.uuid4().hex[:8]}"
+        # El rename es atómico: sólo un worker se queda con el segmento. El
+        # rename no cambia el mtime: se renueva para que nadie lo tome por abandonado
+        if not _renombrar(ruta, tomado):
+            return 0
+        try:
+            os.utime(tomado)
+        except OSError:
+            pass
+        with open(tomado, encoding="utf-8") as f:
+            lecturas = [_de_linea(linea) for linea in f if linea.strip()]
+        try:
+            if lecturas:
+                _insertar(lecturas)
+        except Exception as e:
+            print(f"[Lecturas] No se pudo reinsertar {ruta}: {e}")
+            _renombrar(tomado, f"{base}.pendiente")
+            return 0
+        _borrar(tomado)
+        self.reinsertadas += len(lecturas)
+        return len(lecturas)
+
+    def estadisticas(self) -> dict:
+        with self._cond:
+            pendientes = len(self._pendientes)
+        return {
+            "maximo": self.maximo,
+            "segundos": self.segundos,
+            "pendientes": pendientes,
+            "insertadas": self.insertadas,
+            "lotes": self.lotes,
+            "reinsertadas": self.reinsertadas,
+            "fallos": self.fallos,
+        }
+
+
+def _tareas_posteriores(lote):
+    try:
+        eventos.publicar_lecturas([(l, evento) for l, _, evento in lote if evento is not None and l.pk])
+    except Exception as e:
+        print(f"[Lecturas] No se pudieron publicar los eventos del lote: {e}")
+    for lectura, despues, _ in lote:
+        if despues is None or lectura.pk is None:
+            continue
+        try:
+            despues(lectura)
+        except Exception as e:
+            print(f"[Lecturas] Falló la tarea posterior de la lectura {lectura.pk}: {e}")
+
+
+def _renombrar(origen, destino) -> bool:
+    try:
+        os.replace(origen, destino)
+        return True
+    except OSError:
+        return False
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+buffer = BufferLecturas()
+
+
+def asignar_id(lectura):
+    buffer.asignar_id(lectura)
+
+
+def agregar(lectura, despues=None, evento=None):
+    buffer.agregar(lectura, despues, evento)
+
+
+@atexit.register
+def _al_salir():
+    # Al apagar el worker se guarda lo pendiente (o queda en el spool)
+    try:
+        buffer.vaciar()
+    except Exception as e:
+        print(f"[Lecturas] No se pudo vaciar el buffer al salir: {e}")
@@ -0,0 +1,143 @@
+# seguridad_IA/cola_alpr.py
+"""
+Cola de ingesta de cuadros ALPR.
+
+Las cámaras hacen POST del cuadro y reciben de inmediato un ticket (202);
+un pool de workers lo procesa con seguridad_IA.alpr.procesar_frame. La cola
+tiene tamaño máximo (ALPR_COLA_MAX) y política de descarte (ALPR_COLA_POLITICA):
+
+- "descartar_antiguo": con la cola llena se descarta el cuadro más viejo.
+- "ultimo_gana": cada cámara tiene como mucho un cuadro pendiente; uno nuevo
+  reemplaza al anterior (que se marca descartado). Con la cola llena se
+  descarta además el más viejo.
+
+El estado de cada ticket y la última decisión por cámara quedan en la caché
+(compartida entre workers), así cualquier proceso responde las consultas.
+"""
+import threading
+import time
+import uuid as uuidlib
+from collections import OrderedDict
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from core.resiliencia import ProveedorNoDisponible
+
+from .alpr import ErrorAlpr, procesar_frame
+
+WORKERS = getattr(settings, "ALPR_COLA_WORKERS", 2)
+COLA_MAX = getattr(settings, "ALPR_COLA_MAX", 32)
+POLITICA = getattr(settings, "ALPR_COLA_POLITICA", "ultimo_gana")
+TTL_TICKET = 300
+
+POLITICAS = ("descartar_antiguo", "ultimo_gana")
+
+_K_TICKET = "alpr:ticket:{}"
+_K_ULTIMA = "alpr:camara:{}:ultima"
+
+
+class ColaAlpr:
+
+    def __init__(self, workers: int = WORKERS, maximo: int = COLA_MAX, politica: str = POLITICA):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de cola ALPR desconocida: {politica}")
+        self.workers = max(1, workers)
+        self.maximo = max(1, maximo)
+        self.politica = politica
+        # ticket -> (camera_id, regions, bytes del cuadro, encolado_en)
+        self._pendientes = OrderedDict()
+        self._por_camara = {}
+        self._cond = threading.Condition()
+        self._hilos = []
+        self.descartados = 0
+        self.procesados = 0
+
+    def _arrancar(self):
+        if self._hilos:
+            return
+        for i in range(self.workers):
+            hilo = threading.Thread(target=self._trabajar, name=f"alpr-cola-{i}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def _descartar(self, ticket, motivo):
+        camera_id = self._pendientes.pop(ticket)[0]
+        if self._por_camara.get(camera_id) == ticket:
+            del self._por_camara[camera_id]
+        self.descartados += 1
+        _guardar(ticket, {"estado": "descartado", "camera_id": camera_id, "motivo": motivo})
+
+    def encolar(self, frame: bytes, camera_id: str = "", regions: str = "") -> dict:
+        ticket = uuidlib.uuid4().hex
+        with self._cond:
+            self._arrancar()
+            if self.politica == "ultimo_gana" and camera_id in self._por_camara:
+                self._descartar(self._por_camara[camera_id], "reemplazado por un cuadro más nuevo")
+            while len(self._pendientes) >= self.maximo:
+                self._descartar(next(iter(self._pendientes)), "cola llena")
+            self._pendientes[ticket] = (camera_id, regions, frame, time.time())
+            self._por_camara[camera_id] = ticket
+            estado = {"ticket": ticket, "estado": "en_cola", "camera_id": camera_id, "posicion": len(self._pendientes)}
+            _guardar(ticket, estado)
+            self._cond.notify()
+        return estado
+
+    def _tomar(self):
+        with self._cond:
+            while not self._pendientes:
+                self._cond.wait()
+            ticket, (camera_id, regions, frame, encolado) = self._pendientes.popitem(last=False)
+            if self._por_camara.get(camera_id) == ticket:
+                del self._por_camara[camera_id]
+            return ticket, camera_id, regions, frame, encolado
+
+    def _trabajar(self):
+        while True:
+            ticket, camera_id, regions, frame, encolado = self._tomar()
+            espera_ms = round((time.time() - encolado) * 1000, 1)
+            _guardar(ticket, {"estado": "procesando", "camera_id": camera_id, "espera_ms": espera_ms})
+            try:
+                decision = procesar_frame(BytesIO(frame), camera_id, regions)
+                estado = {"estado": "listo", "camera_id": camera_id, "espera_ms": espera_ms, "decision": decision}
+                cache.set(_K_ULTIMA.format(camera_id), {"ticket": ticket, **estado}, timeout=TTL_TICKET)
+            except ProveedorNoDisponible as e:
+                estado = {"estado": "error", "camera_id": camera_id, "status": 503, "detalle": e.como_respuesta()}
+            except ErrorAlpr as e:
+                estado = {"estado": "error", "camera_id": camera_id, "status": e.status, "detalle": e.respuesta}
+            except Exception as e:
+                print(f"[ALPR] Error procesando ticket {ticket}: {e}")
+                estado = {"estado": "error", "camera_id": camera_id, "status": 500, "detalle": {"error": str(e)}}
+            finally:
+                close_old_connections()
+            with self._cond:
+                self.procesados += 1
+            _guardar(ticket, estado)
+
+    def estadisticas(self) -> dict:
+        with self._cond:
+            return {
+                "politica": self.politica,
+                "maximo": self.maximo,
+                "workers": self.workers,
+                "pendientes": len(self._pendientes),
+                "procesados": self.procesados,
+                "descartados": self.descartados,
+            }
+
+
+def _guardar(ticket, estado):
+    cache.set(_K_TICKET.format(ticket), {"ticket": ticket, **estado}, timeout=TTL_TICKET)
+
+
+def estado_ticket(ticket: str):
+    return cache.get(_K_TICKET.format(ticket))
+
+
+def ultima_decision(camera_id: str):
+    return cache.get(_K_ULTIMA.format(camera_id))
+
+
+cola = ColaAlpr()
@@ -0,0 +1,155 @@
+# seguridad_IA/debounce.py
+"""
+Debounce del ALPR por cámara.
+
+Un auto detenido en la barrera manda un cuadro tras otro. Dentro de la
+ventana de la cámara:
+  1. Si el cuadro es casi igual (dHash) a uno con decisión negativa (sin
+     coincidencia), se devuelve esa decisión sin llamar a PlateRecognizer.
+     Una decisión positiva nunca se reutiliza por el cuadro: en una cámara
+     fija otro vehículo en una escena parecida heredaría el acceso.
+  2. Si PlateRecognizer devuelve una placa (normalizada) ya decidida, se
+     devuelve esa decisión sin crear otra LecturaPlaca.
+En ambos casos sólo se incrementa el contador de repeticiones. La ventana
+no se extiende con las repeticiones: al vencer, un auto que sigue en la
+barrera se vuelve a evaluar.
+
+Ventana por defecto: ALPR_DEBOUNCE_SEGUNDOS. Por cámara:
+ALPR_DEBOUNCE_CAMARAS = "porton-norte:5,porton-sur:20" (0 desactiva).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache_reconocimiento import dhash
+
+SEGUNDOS = getattr(settings, "ALPR_DEBOUNCE_SEGUNDOS", 10)
+DISTANCIA_MAX = getattr(settings, "ALPR_DEBOUNCE_DISTANCIA", 4)
+MAX_CUADROS = 16
+
+_K_CUADROS = "alpr:debounce:{}:cuadros"
+_K_PLACA = "alpr:debounce:{}:placa:{}"
+_K_HITS = "alpr:debounce:{}:hits"
+_K_HITS_TOTAL = "alpr:debounce:hits"
+
+
+def _parsear_camaras(texto: str) -> dict:
+    ventanas = {}
+    for parte in (texto or "").split(","):
+        camara, _, segundos = parte.strip().rpartition(":")
+        if camara and segundos.strip().isdigit():
+            ventanas[camara.strip()] = int(segundos)
+    return ventanas
+
+
+VENTANAS = _parsear_camaras(getattr(settings, "ALPR_DEBOUNCE_CAMARAS", ""))
+
+
+def ventana(camera_id: str) -> int:
+    return VENTANAS.get(camera_id or "", SEGUNDOS)
+
+
+def _contar(clave: str):
+    cache.add(clave, 0, timeout=None)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        pass
+
+
+def _repetida(decision: dict, camera_id: str, clave_placa: str) -> dict:
+    _contar(_K_HITS.format(camera_id))
+    _contar(_K_HITS_TOTAL)
+    decision["repeticiones"] = decision.get("repeticiones", 0) + 1
+    # Se conserva el vencimiento original (_expira): la ventana no se desliza
+    restante = decision.get("_expira", 0) - time.time()
+    if restante >= 1:
+        cache.set(clave_placa, decision, timeout=int(restante))
+    respuesta = {**decision, "debounce": True}
+    respuesta.pop("_expira", None)
+    return respuesta
+
+
+def hash_cuadro(frame):
+    try:
+        return dhash(frame)
+    except OSError:
+        return None
+
+
+def por_cuadro(camera_id: str, h):
+    """
+    Decisión negativa reciente para un cuadro casi igual al hash `h`, o None.
+    """
+    if h is None or ventana(camera_id) <= 0:
+        return None
+    clave = _K_CUADROS.format(camera_id)
+    ahora = time.time()
+    for valor, expira, clave_placa in cache.get(clave) or []:
+        if expira > ahora and bin(valor ^ h).count("1") <= DISTANCIA_MAX:
+            decision = cache.get(clave_placa)
+            # Ni positivas ni aproximadas (traen un vehículo candidato)
+            if decision is not None and not decision.get("match") and not decision.get("coincidencia"):
+                return _repetida(decision, camera_id, clave_placa)
+    return None
+
+
+def por_placa(camera_id: str, placa_normalizada: str, h=None):
+    """
+    Decisión reciente para la misma placa en esta cámara, o None.
+    Registra además el cuadro `h` para que los siguientes no lleguen al ALPR.
+    """
+    segundos = ventana(camera_id)
+    if segundos <= 0:
+        return None
+    clave_placa = _K_PLACA.format(camera_id, placa_normalizada)
+    decision = cache.get(clave_placa)
+    if decision is None:
+        return None
+    _recordar_cuadro(camera_id, h, clave_placa, decision.get("_expira", 0) - time.time())
+    return _repetida(decision, camera_id, clave_placa)
+
+
+def recordar(camera_id: str, placa_normalizada: str, decision: dict, h=None):
+    """
+    Guarda la decisión tomada para la placa (y el cuadro) durante la ventana.
+    """
+    segundos = ventana(camera_id)
+    if segundos <= 0:
+        return
+    clave_placa = _K_PLACA.format(camera_id, placa_normalizada)
+    cache.set(clave_placa, {**decision, "repeticiones": 0, "_expira": time.time() + segundos}, timeout=segundos)
+    _recordar_cuadro(camera_id, h, clave_placa, segundos)
+
+
+def recordar_cuadro(camera_id: str, placa_normalizada: str, h):
+    """
+    Asocia otro cuadro (p.ej. de un lote) a la decisión ya guardada para la placa.
+    """
+    if ventana(camera_id) <= 0:
+        return
+    clave_placa = _K_PLACA.format(camera_id, placa_normalizada)
+    decision = cache.get(clave_placa)
+    if decision is not None:
+        _recordar_cuadro(camera_id, h, clave_placa, decision.get("_expira", 0) - time.time())
+
+
+def _recordar_cuadro(camera_id, h, clave_placa, segundos):
+    if h is None or segundos <= 0:
+        return
+    clave = _K_CUADROS.format(camera_id)
+    ahora = time.time()
+    cuadros = [c for c in cache.get(clave) or [] if c[1] > ahora]
+    cuadros.append((h, ahora + segundos, clave_placa))
+    cuadros = cuadros[-MAX_CUADROS:]
+    cache.set(clave, cuadros, timeout=int(max(c[1] for c in cuadros) - ahora) + 1)
+
+
+def estadisticas() -> dict:
+    return {
+        "ventana_defecto": SEGUNDOS,
+        "ventanas": VENTANAS,
+        "repeticiones": cache.get(_K_HITS_TOTAL) or 0,
+        "por_camara": {c: cache.get(_K_HITS.format(c)) or 0 for c in VENTANAS},
+    }
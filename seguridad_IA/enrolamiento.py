@@ -0,0 +1,287 @@
+# seguridad_IA/enrolamiento.py
+"""
+Enrolamiento masivo de personas y empleados en el reconocedor facial.
+
+Toma los registros con imagen y sin luxand_uuid, los enrola desde un pool de
+hilos con límite de tasa (token bucket, para no agotar la cuota del
+proveedor) y guarda los UUID por lotes con bulk_update y en el registro
+IdentidadFacial. Devuelve un informe con los fallos por registro y el
+throughput. Los que ya tienen luxand_uuid pero no registro sólo se
+registran (rellenar_registro), sin volver a enrolarlos.
+
+Se usa desde el comando `manage.py enrolar_masivo` y desde la vista
+EnrolamientoMasivoView (en segundo plano, con el progreso en la caché).
+Un solo enrolamiento corre a la vez (exclusivo(), un candado en la caché
+renovado con el progreso): dos corridas tomarían los mismos pendientes y
+duplicarían rostros en la galería.
+"""
+import threading
+import time
+import uuid as uuidlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+
+from administracion import identidades
+from administracion.models import Empleado, Persona
+from core import almacen, calidad_rostro
+from core.reconocedores import get_reconocedor
+from core.resiliencia import ProveedorNoDisponible
+
+WORKERS = getattr(settings, "ENROLAMIENTO_WORKERS", 4)
+TASA = getattr(settings, "ENROLAMIENTO_TASA", 5.0)
+LOTE = getattr(settings, "ENROLAMIENTO_LOTE", 50)
+REINTENTOS = 3
+
+MODELOS = {"persona": Persona, "empleado": Empleado}
+
+_K_EN_CURSO = "enrolamiento:en_curso"
+# Se renueva con cada registro: si el proceso muere, el candado vence solo
+TTL_CANDADO = 15 * 60
+
+
+class EnrolamientoEnCurso(Exception):
+    """
+    Ya hay un enrolamiento masivo corriendo (trabajo_id del que lo tiene).
+    """
+
+    def __init__(self, trabajo_id):
+        super().__init__(f"Ya hay un enrolamiento en curso ({trabajo_id})")
+        self.trabajo_id = trabajo_id
+
+
+def tomar_candado(trabajo_id: str):
+    """
+    Candado de la caché para que sólo un proceso enrole a la vez.
+    Lanza EnrolamientoEnCurso si otro lo tiene.
+    """
+    if not cache.add(_K_EN_CURSO, trabajo_id, timeout=TTL_CANDADO):
+        raise EnrolamientoEnCurso(cache.get(_K_EN_CURSO))
+
+
+def soltar_candado(trabajo_id: str):
+    if cache.get(_K_EN_CURSO) == trabajo_id:
+        cache.delete(_K_EN_CURSO)
+
+
+@contextmanager
+def exclusivo(trabajo_id: str):
+    tomar_candado(trabajo_id)
+    try:
+        yield
+    finally:
+        soltar_candado(trabajo_id)
+
+
+def _renovar_candado():
+    cache.touch(_K_EN_CURSO, TTL_CANDADO)
+
+
+class LimitadorTasa:
+    """
+    Token bucket compartido por los hilos: `tasa` llamadas por segundo con
+    ráfagas de hasta `rafaga`.
+    """
+
+    def __init__(self, tasa: float, rafaga: int = 1):
+        self.tasa = float(tasa)
+        self.rafaga = max(1, rafaga)
+        self._tokens = float(self.rafaga)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        if self.tasa <= 0:
+            return
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.rafaga, self._tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                falta = (1 - self._tokens) / self.tasa
+            time.sleep(falta)
+
+
+def pendientes(tipo: str, ids=None):
+    """
+    Registros de `tipo` con imagen, sin luxand_uuid y sin identidad registrada
+    (opcionalmente sólo `ids`).
+    """
+    qs = (MODELOS[tipo].objects
+          .filter(identidades_faciales__isnull=True)
+          .filter(Q(luxand_uuid__isnull=True) | Q(luxand_uuid=""))
+          .exclude(Q(imagen__isnull=True) | Q(imagen=""))
+          .only("id", "nombre", "apellido", "imagen", "luxand_uuid")
+          .order_by("id"))
+    if ids:
+        qs = qs.filter(id__in=ids)
+    return qs
+
+
+def rellenar_registro(tipo: str, ids=None) -> int:
+    """
+    Registra en IdentidadFacial los luxand_uuid que no tienen registro (p.ej.
+    un corte entre el bulk_update y el registro). Un uuid que ya es de otro
+    titular se omite. Devuelve cuántos registros se intentaron.
+    """
+    qs = (MODELOS[tipo].objects
+          .filter(identidades_faciales__isnull=True)
+          .exclude(Q(luxand_uuid__isnull=True) | Q(luxand_uuid=""))
+          .only("id", "luxand_uuid")
+          .order_by("id"))
+    if ids:
+        qs = qs.filter(id__in=ids)
+    registros = list(qs)
+    if registros:
+        identidades.registrar_varios(tipo, registros)
+        identidades.invalidar()
+    return len(registros)
+
+
+def _enrolar_uno(reconocedor, limitador, nombre, foto, coleccion):
+    for intento in range(REINTENTOS):
+        limitador.esperar()
+        if hasattr(foto, "seek"):
+            foto.seek(0)
+        try:
+            res = reconocedor.enrolar(nombre, foto, coleccion)
+        except ProveedorNoDisponible as e:
+            # Circuito abierto o sin cupo: esperar lo indicado y reintentar
+            if intento == REINTENTOS - 1:
+                raise
+            time.sleep(min(e.reintentar_en or 1, 30))
+            continue
+        uuid = res.get("uuid") if isinstance(res, dict) else None
+        if not uuid:
+            mensaje = res.get("message") if isinstance(res, dict) else res
+            raise ValueError(f"Sin UUID en la respuesta: {mensaje}")
+        return uuid
+
+
+def _guardar(tipo, lote, coleccion):
+    if lote:
+        # bulk_update no dispara señales: el registro de identidades se escribe aquí
+        with transaction.atomic():
+            MODELOS[tipo].objects.bulk_update(lote, ["luxand_uuid"])
+            identidades.registrar_varios(tipo, lote, coleccion)
+        lote.clear()
+
+
+def enrolar(registros, tipo: str, workers: int = WORKERS, tasa: float = TASA,
+            lote: int = LOTE, progreso=None) -> dict:
+    """
+    Enrola `registros` (queryset o lista de instancias de `tipo`).
+    `progreso(informe)` se llama tras cada registro procesado.
+    """
+    registros = list(registros)
+    reconocedor = get_reconocedor()
+    limitador = LimitadorTasa(tasa, rafaga=workers)
+    coleccion = identidades.coleccion_de(tipo)
+    rostros = almacen.variantes_de((r.imagen for r in registros), "rostro")
+
+    informe = {"tipo": tipo, "total": len(registros), "enrolados": 0, "fallidos": 0,
+               "errores": [], "segundos": 0.0, "por_segundo": 0.0}
+    por_guardar = []
+    inicio = time.monotonic()
+
+    def tarea(r):
+        try:
+            nombre = f"{r.nombre} {r.apellido}".strip() or f"{tipo}-{r.pk}"
+            # Una foto que no pasa el control de calidad queda como fallo sin gastar cuota
+            foto = calidad_rostro.preparar(rostros.get(r.imagen) or r.imagen)
+            return _enrolar_uno(reconocedor, limitador, nombre, foto, coleccion)
+        finally:
+            close_old_connections()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="enrolamiento") as pool:
+            futuros = {pool.submit(tarea, r): r for r in registros}
+            for futuro in as_completed(futuros):
+                r = futuros[futuro]
+                try:
+                    r.luxand_uuid = futuro.result()
+                except Exception as e:
+                    informe["fallidos"] += 1
+                    informe["errores"].append({"id": r.pk, "nombre": f"{r.nombre} {r.apellido}".strip(), "error": str(e)})
+                else:
+                    informe["enrolados"] += 1
+                    por_guardar.append(r)
+                    if len(por_guardar) >= lote:
+                        _guardar(tipo, por_guardar, coleccion)
+                _renovar_candado()
+                if progreso:
+                    progreso(informe)
+    finally:
+        _guardar(tipo, por_guardar, coleccion)
+        # bulk_update no dispara señales: el índice de identidades se recarga
+        identidades.invalidar()
+
+    informe["segundos"] = round(time.monotonic() - inicio, 2)
+    if informe["segundos"]:
+        informe["por_segundo"] = round(informe["enrolados"] / informe["segundos"], 2)
+    return informe
+
+
+# ---------- trabajos en segundo plano (vista) ----------
+
+_K_TRABAJO = "enrolamiento:trabajo:{}"
+TTL_INFORME = 24 * 3600
+
+
+def estado_trabajo(trabajo_id: str):
+    return cache.get(_K_TRABAJO.format(trabajo_id))
+
+
+def lanzar(tipos, ids=None, limite=None) -> dict:
+    """
+    Inicia el enrolamiento en un hilo aparte y devuelve el estado inicial.
+    El progreso queda en la caché bajo el id del trabajo. Si ya hay uno
+    corriendo devuelve el estado de ése (con "ya_en_curso": True).
+    """
+    trabajo_id = uuidlib.uuid4().hex
+    clave = _K_TRABAJO.format(trabajo_id)
+    try:
+        tomar_candado(trabajo_id)
+    except EnrolamientoEnCurso as e:
+        actual = estado_trabajo(e.trabajo_id) or {"id": e.trabajo_id, "estado": "en_curso"}
+        return {**actual, "ya_en_curso": True}
+    try:
+        lotes, rellenados = {}, {}
+        for tipo in tipos:
+            rellenados[tipo] = rellenar_registro(tipo, ids)
+            qs = pendientes(tipo, ids)
+            lotes[tipo] = list(qs[:limite] if limite else qs)
+    except BaseException:
+        soltar_candado(trabajo_id)
+        raise
+    estado = {"id": trabajo_id, "estado": "en_curso", "total": sum(len(v) for v in lotes.values()),
+              "rellenados": rellenados, "informes": {}}
+    cache.set(clave, estado, timeout=TTL_INFORME)
+    inicial = {**estado, "informes": {}}
+
+    def ejecutar():
+        try:
+            for tipo, registros in lotes.items():
+                def progreso(informe, tipo=tipo):
+                    estado["informes"][tipo] = informe
+                    cache.set(clave, estado, timeout=TTL_INFORME)
+                progreso(enrolar(registros, tipo, progreso=progreso))
+            estado["estado"] = "completado"
+        except Exception as e:
+            estado["estado"] = "error"
+            estado["error"] = str(e)
+            print(f"[Enrolamiento] Trabajo {trabajo_id} falló: {e}")
+        finally:
+            cache.set(clave, estado, timeout=TTL_INFORME)
+            soltar_candado(trabajo_id)
+            close_old_connections()
+
+    threading.Thread(target=ejecutar, name=f"enrolamiento-{trabajo_id[:8]}", daemon=True).start()
+    return inicial
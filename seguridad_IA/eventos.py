@@ -0,0 +1,240 @@
+# seguridad_IA/eventos.py
+"""
+Eventos de acceso para las pantallas de los guardias (Server-Sent Events).
+
+Cada decisión de la barrera queda en EventoAcceso: las placas (alpr_scan,
+la cola y los lotes, vía alpr._decidir) se publican junto con su lote de
+buffer_lecturas y los rostros desde reconocimiento_global.
+
+GET /api/eventos/ deja la conexión abierta y envía los eventos nuevos
+(text/event-stream); GET /api/eventos/espera/ es la variante long-poll (JSON).
+Las vistas son async: servidas por ASGI (uvicorn) una conexión inactiva es
+sólo una corrutina esperando en su cola, sin ocupar un worker ni un hilo.
+
+Un único hilo por proceso consulta la tabla cada EVENTOS_INTERVALO segundos
+(sólo mientras haya suscriptores) y reparte a la cola de cada conexión según
+sus filtros (camera_id, tipo). Al reconectar, EventSource envía Last-Event-ID
+y se reenvía lo posterior (hasta EVENTOS_REENVIO_MAX eventos).
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import Max
+
+from .models import EventoAcceso
+
+INTERVALO = getattr(settings, "EVENTOS_INTERVALO", 0.5)
+LATIDO = getattr(settings, "EVENTOS_LATIDO", 15)
+REENVIO_MAX = getattr(settings, "EVENTOS_REENVIO_MAX", 500)
+COLA_MAX = 1000
+# Ids que se releen en cada consulta por si una transacción confirmó tarde
+RELECTURA = 20
+REINTENTO_MS = 3000
+
+
+# ---------- publicación ----------
+
+def publicar(tipo: str, camera_id: str, datos: dict):
+    return EventoAcceso.objects.create(tipo=tipo, camera_id=camera_id or "", datos=datos)
+
+
+def publicar_varios(tipo: str, camera_id: str, lista):
+    """
+    Un evento por elemento de `lista` (p.ej. cada rostro de un cuadro), en un INSERT.
+    """
+    nuevos = [EventoAcceso(tipo=tipo, camera_id=camera_id or "", datos=datos) for datos in lista]
+    if nuevos:
+        EventoAcceso.objects.bulk_create(nuevos)
+
+
+def publicar_lecturas(pares):
+    """
+    Eventos de placa de un lote ya guardado: `pares` = [(lectura, decision)].
+    """
+    nuevos = []
+    for lectura, decision in pares:
+        datos = {**decision, "lectura": {**(decision.get("lectura") or {}), "id": lectura.pk}}
+        nuevos.append(EventoAcceso(tipo="placa", camera_id=lectura.camera_id or "", datos=datos))
+    if nuevos:
+        EventoAcceso.objects.bulk_create(nuevos)
+
+
+def formatear(evento) -> str:
+    datos = json.dumps(
+        {"id": evento.id, "tipo": evento.tipo, "camera_id": evento.camera_id,
+         "created_at": evento.created_at, **evento.datos},
+        cls=DjangoJSONEncoder,
+    )
+    return f"id: {evento.id}\nevent: {evento.tipo}\ndata: {datos}\n\n"
+
+
+def como_dict(evento) -> dict:
+    return {"id": evento.id, "tipo": evento.tipo, "camera_id": evento.camera_id,
+            "created_at": evento.created_at, **evento.datos}
+
+
+# ---------- suscripciones ----------
+
+class Suscripcion:
+    """
+    Una conexión abierta: su cola (en el event loop de la conexión) y sus filtros.
+    """
+
+    def __init__(self, camaras=None, tipos=None):
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=COLA_MAX)
+        self.camaras = set(camaras) if camaras else None
+        self.tipos = set(tipos) if tipos else None
+        self.visto = 0
+        self.perdidos = 0
+
+    def acepta(self, evento) -> bool:
+        return ((self.camaras is None or evento.camera_id in self.camaras)
+                and (self.tipos is None or evento.tipo in self.tipos))
+
+    def entregar(self, evento):
+        # Llamado desde el hilo del difusor
+        self.loop.call_soon_threadsafe(self._poner, evento)
+
+    def _poner(self, evento):
+        if self.cola.full():
+            # Cliente lento: se descarta lo más viejo; al reconectar lo recupera por id
+            self.cola.get_nowait()
+            self.perdidos += 1
+        self.cola.put_nowait(evento)
+
+    def _nuevo(self, evento) -> bool:
+        if evento.id <= self.visto:
+            return False
+        self.visto = evento.id
+        return True
+
+    async def flujo(self, pendientes):
+        """
+        Cuerpo text/event-stream: reenvío, eventos en vivo y latidos.
+        """
+        try:
+            yield f"retry: {REINTENTO_MS}\n\n"
+            for evento in pendientes:
+                if self._nuevo(evento):
+                    yield formatear(evento)
+            while True:
+                try:
+                    evento = await asyncio.wait_for(self.cola.get(), LATIDO)
+                except asyncio.TimeoutError:
+                    # Mantiene viva la conexión a través de proxies
+                    yield ": latido\n\n"
+                    continue
+                if self._nuevo(evento):
+                    yield formatear(evento)
+        finally:
+            difusor.desuscribir(self)
+
+    async def esperar(self, pendientes, segundos: float) -> list:
+        """
+        Long-poll: lo pendiente, o lo que llegue dentro de `segundos`.
+        """
+        try:
+            eventos = [e for e in pendientes if self._nuevo(e)]
+            en_vivo = []
+            if not eventos:
+                try:
+                    en_vivo.append(await asyncio.wait_for(self.cola.get(), segundos))
+                except asyncio.TimeoutError:
+                    return []
+            while not self.cola.empty():
+                en_vivo.append(self.cola.get_nowait())
+            return eventos + [e for e in en_vivo if self._nuevo(e)]
+        finally:
+            difusor.desuscribir(self)
+
+
+class Difusor:
+
+    def __init__(self, intervalo: float = INTERVALO):
+        self.intervalo = intervalo
+        self._subs = set()
+        self._lock = threading.Lock()
+        self._hay_subs = threading.Event()
+        self._ultimo = None
+        self._recientes = deque(maxlen=RELECTURA * 4)
+        self._hilo = None
+
+    def suscribir(self, sub, desde=None) -> list:
+        """
+        Registra `sub` y devuelve los eventos posteriores a `desde` (Last-Event-ID).
+        Sin `desde`, sólo recibe lo nuevo. Hace consultas: llamar vía sync_to_async.
+        """
+        with self._lock:
+            if self._ultimo is None:
+                self._ultimo = EventoAcceso.objects.aggregate(m=Max("id"))["m"] or 0
+            sub.visto = self._ultimo if desde is None else desde
+            self._subs.add(sub)
+            self._hay_subs.set()
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._trabajar, name="eventos-difusor", daemon=True)
+                self._hilo.start()
+        if desde is None:
+            return []
+        qs = EventoAcceso.objects.filter(id__gt=desde)
+        if sub.camaras is not None:
+            qs = qs.filter(camera_id__in=sub.camaras)
+        if sub.tipos is not None:
+            qs = qs.filter(tipo__in=sub.tipos)
+        return list(qs.order_by("id")[:REENVIO_MAX])
+
+    def desuscribir(self, sub):
+        with self._lock:
+            self._subs.discard(sub)
+            if not self._subs:
+                self._hay_subs.clear()
+                # Al volver a haber suscriptores se parte del último id vigente
+                self._ultimo = None
+                self._recientes.clear()
+
+    def _trabajar(self):
+        while True:
+            self._hay_subs.wait()
+            try:
+                self._sondear()
+            except Exception as e:
+                print(f"[Eventos] Error consultando eventos: {e}")
+            finally:
+                close_old_connections()
+            time.sleep(self.intervalo)
+
+    def _sondear(self):
+        with self._lock:
+            if self._ultimo is None:
+                return
+            desde = max(0, self._ultimo - RELECTURA)
+        filas = list(EventoAcceso.objects.filter(id__gt=desde).order_by("id")[:REENVIO_MAX])
+        with self._lock:
+            if self._ultimo is None:
+                return
+            nuevos = [e for e in filas if e.id not in self._recientes]
+            for e in nuevos:
+                self._recientes.append(e.id)
+                self._ultimo = max(self._ultimo, e.id)
+            subs = list(self._subs)
+        for e in nuevos:
+            for sub in subs:
+                if sub.acepta(e):
+                    sub.entregar(e)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "suscriptores": len(self._subs),
+                "ultimo_id": self._ultimo,
+                "perdidos": sum(s.perdidos for s in self._subs),
+            }
+
+
+difusor = Difusor()
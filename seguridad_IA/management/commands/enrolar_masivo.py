@@ -0,0 +1,58 @@
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from seguridad_IA import enrolamiento
+
+
+class Command(BaseCommand):
+    help = "Enrola en el reconocedor facial a las personas/empleados con imagen y sin luxand_uuid."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tipo", choices=["persona", "empleado", "todos"], default="todos")
+        parser.add_argument("--ids", type=int, nargs="*", help="Sólo estos IDs")
+        parser.add_argument("--limite", type=int, help="Máximo de registros por tipo")
+        parser.add_argument("--workers", type=int, default=enrolamiento.WORKERS)
+        parser.add_argument("--tasa", type=float, default=enrolamiento.TASA, help="Llamadas por segundo al proveedor")
+        parser.add_argument("--lote", type=int, default=enrolamiento.LOTE, help="UUIDs guardados por bulk_update")
+        parser.add_argument("--dry-run", action="store_true", help="Sólo contar pendientes")
+
+    def handle(self, *args, **opts):
+        tipos = ["persona", "empleado"] if opts["tipo"] == "todos" else [opts["tipo"]]
+        if opts["dry_run"]:
+            for tipo in tipos:
+                self.stdout.write(f"{tipo}: {enrolamiento.pendientes(tipo, opts['ids']).count()} pendientes")
+            return
+        try:
+            with enrolamiento.exclusivo(f"comando-{uuid.uuid4().hex}"):
+                self._enrolar(tipos, opts)
+        except enrolamiento.EnrolamientoEnCurso as e:
+            raise CommandError(str(e))
+
+    def _enrolar(self, tipos, opts):
+        for tipo in tipos:
+            rellenados = enrolamiento.rellenar_registro(tipo, opts["ids"])
+            if rellenados:
+                self.stdout.write(f"{tipo}: {rellenados} con luxand_uuid registrados sin re-enrolar")
+            qs = enrolamiento.pendientes(tipo, opts["ids"])
+            if opts["limite"]:
+                qs = qs[:opts["limite"]]
+            registros = list(qs)
+            self.stdout.write(f"{tipo}: {len(registros)} pendientes")
+            if not registros:
+                continue
+
+            def progreso(informe):
+                hechos = informe["enrolados"] + informe["fallidos"]
+                if hechos % 25 == 0 or hechos == informe["total"]:
+                    self.stdout.write(f"  {hechos}/{informe['total']} (fallidos: {informe['fallidos']})")
+
+            informe = enrolamiento.enrolar(
+                registros, tipo, workers=opts["workers"], tasa=opts["tasa"], lote=opts["lote"], progreso=progreso
+            )
+            for error in informe["errores"]:
+                self.stderr.write(f"  {tipo} {error['id']} ({error['nombre']}): {error['error']}")
+            self.stdout.write(self.style.SUCCESS(
+                f"{tipo}: {informe['enrolados']} enrolados, {informe['fallidos']} fallidos "
+                f"en {informe['segundos']}s ({informe['por_segundo']}/s)"
+            ))
@@ -0,0 +1,72 @@
+import gzip
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from seguridad_IA.models import EventoAcceso, LecturaPlaca, PlacaHora
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina por lotes las lecturas de placas más antiguas que --dias "
+        "(opcionalmente archivándolas en JSONL) y los eventos de acceso más antiguos "
+        "que --dias-eventos. Los resúmenes horarios se conservan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=getattr(settings, "LECTURAS_RETENCION_DIAS", 90))
+        parser.add_argument("--lote", type=int, default=5000, help="Filas por DELETE")
+        parser.add_argument("--archivo", help="Ruta JSONL (o .jsonl.gz) donde archivar antes de borrar")
+        parser.add_argument("--dry-run", action="store_true", help="Sólo contar")
+        parser.add_argument("--dias-eventos", type=int, default=getattr(settings, "EVENTOS_RETENCION_DIAS", 7),
+                            help="Días que se conservan los eventos de acceso (flujo de los guardias)")
+
+    def handle(self, *args, **opts):
+        limite = timezone.now() - timedelta(days=opts["dias"])
+        antiguas = LecturaPlaca.objects.filter(created_at__lt=limite)
+        limite_eventos = timezone.now() - timedelta(days=opts["dias_eventos"])
+        eventos = EventoAcceso.objects.filter(created_at__lt=limite_eventos)
+        self.stdout.write(f"Lecturas anteriores a {limite:%Y-%m-%d %H:%M}: {antiguas.count()}")
+        self.stdout.write(f"Eventos anteriores a {limite_eventos:%Y-%m-%d %H:%M}: {eventos.count()}")
+        if opts["dry_run"]:
+            return
+
+        archivo = None
+        if opts["archivo"]:
+            abrir = gzip.open if opts["archivo"].endswith(".gz") else open
+            archivo = abrir(opts["archivo"], "at", encoding="utf-8")
+
+        campos = ["id", "placa", "score", "camera_id", "image_url", "created_at", "vehiculo_id", "match"]
+        total = 0
+        try:
+            while True:
+                # Por id (PK) y en lotes: transacciones cortas, sin bloquear la tabla
+                filas = list(antiguas.order_by("id").values(*campos)[:opts["lote"]])
+                if not filas:
+                    break
+                if archivo:
+                    for fila in filas:
+                        archivo.write(json.dumps(fila, default=str) + "\n")
+                    archivo.flush()
+                borradas, _ = LecturaPlaca.objects.filter(id__in=[f["id"] for f in filas]).delete()
+                total += borradas
+                self.stdout.write(f"  {total} eliminadas")
+        finally:
+            if archivo:
+                archivo.close()
+
+        # El detalle de placas por hora sólo sirve para contar placas_unicas de horas en curso
+        detalle, _ = PlacaHora.objects.filter(hora__lt=limite).delete()
+        total_eventos = 0
+        while True:
+            ids = list(eventos.order_by("id").values_list("id", flat=True)[:opts["lote"]])
+            if not ids:
+                break
+            borrados, _ = EventoAcceso.objects.filter(id__in=ids).delete()
+            total_eventos += borrados
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} lecturas eliminadas; {detalle} filas de placa_hora; {total_eventos} eventos"
+        ))
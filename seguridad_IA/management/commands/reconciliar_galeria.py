@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from seguridad_IA import reconciliacion
+
+
+class Command(BaseCommand):
+    help = ("Cruza los luxand_uuid de personas/empleados con la galería del reconocedor facial: "
+            "huérfanos, duplicados, uuid inexistentes, desincronizados y pendientes de enrolar.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reparar", action="store_true",
+                            help="Borrar duplicados de la galería y limpiar los luxand_uuid inexistentes")
+        parser.add_argument("--borrar-huerfanos", action="store_true",
+                            help="Con --reparar, borrar también los huérfanos de la galería")
+        parser.add_argument("--enrolar", action="store_true", help="Enrolar al final los registros pendientes")
+        parser.add_argument("--workers", type=int, default=reconciliacion.WORKERS, help="Páginas en vuelo a la vez")
+        parser.add_argument("--por-pagina", type=int, default=reconciliacion.POR_PAGINA)
+
+    def handle(self, *args, **opts):
+        def progreso(informe):
+            if informe["paginas"] % 10 == 0:
+                self.stdout.write(f"  {informe['paginas']} páginas, {informe['galeria']} personas en la galería")
+
+        informe = reconciliacion.reconciliar(
+            reparar=opts["reparar"], borrar_huerfanos=opts["borrar_huerfanos"], enrolar=opts["enrolar"],
+            workers=opts["workers"], por_pagina=opts["por_pagina"], progreso=progreso,
+        )
+        self.stdout.write(
+            f"Galería: {informe['galeria']} personas en {informe['paginas']} páginas "
+            f"({informe['vigentes']} vigentes, {informe['ajenos']} de otras colecciones); "
+            f"locales enrolados: {informe['locales']}"
+        )
+        for clave in ("huerfanos", "duplicados", "inexistentes", "desincronizados", "sin_enrolar"):
+            hallazgo = informe[clave]
+            self.stdout.write(f"{clave}: {hallazgo['total']}")
+            for item in hallazgo["muestra"][:10]:
+                self.stdout.write(f"  {item}")
+        for error in informe["errores"]:
+            self.stderr.write(f"  {error['accion']} {error['uuid']}: {error['error']}")
+        if opts["reparar"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"Reparado: {informe['borrados_galeria']} borrados de la galería, "
+                f"{informe['uuid_limpiados']} luxand_uuid limpiados"
+            ))
+        self.stdout.write(self.style.SUCCESS(f"Listo en {informe['segundos']}s"))
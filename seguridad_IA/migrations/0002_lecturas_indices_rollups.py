@@ -0,0 +1,93 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:49
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncHour
+
+
+def rellenar_resumenes(apps, schema_editor):
+    """
+    Resúmenes horarios de las lecturas existentes (luego se acumulan en línea).
+    """
+    LecturaPlaca = apps.get_model('seguridad_IA', 'LecturaPlaca')
+    LecturaPlacaHora = apps.get_model('seguridad_IA', 'LecturaPlacaHora')
+    PlacaHora = apps.get_model('seguridad_IA', 'PlacaHora')
+
+    por_hora = LecturaPlaca.objects.annotate(h=TruncHour('created_at')).values('camera_id', 'h')
+    LecturaPlacaHora.objects.bulk_create([
+        LecturaPlacaHora(
+            camera_id=f['camera_id'], hora=f['h'], lecturas=f['n'], coincidencias=f['m'],
+            placas_unicas=f['u'],
+        )
+        for f in por_hora.annotate(
+            n=Count('id'), m=Count('id', filter=Q(match=True)),
+            u=Count('placa', filter=~Q(placa=''), distinct=True),
+        ).order_by()
+    ], batch_size=1000)
+    PlacaHora.objects.bulk_create([
+        PlacaHora(camera_id=f['camera_id'], hora=f['h'], placa=f['placa'])
+        for f in por_hora.exclude(placa='').values('camera_id', 'h', 'placa').distinct().order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('residencial', '0002_vehiculo_placa_normalizada'),
+        ('seguridad_IA', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturaPlacaHora',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('camera_id', models.CharField(blank=True, max_length=50)),
+                ('hora', models.DateTimeField()),
+                ('lecturas', models.PositiveIntegerField(default=0)),
+                ('coincidencias', models.PositiveIntegerField(default=0)),
+                ('placas_unicas', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'lectura_placa_hora',
+                'ordering': ['-hora'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlacaHora',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('camera_id', models.CharField(blank=True, max_length=50)),
+                ('hora', models.DateTimeField()),
+                ('placa', models.CharField(max_length=20)),
+            ],
+            options={
+                'db_table': 'placa_hora',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lecturaplaca',
+            index=models.Index(fields=['camera_id', '-created_at'], name='lectura_camara_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecturaplaca',
+            index=models.Index(fields=['placa', '-created_at'], name='lectura_placa_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecturaplaca',
+            index=models.Index(fields=['created_at'], name='lectura_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecturaplacahora',
+            index=models.Index(fields=['hora'], name='lectura_hora_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='lecturaplacahora',
+            unique_together={('camera_id', 'hora')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='placahora',
+            unique_together={('camera_id', 'hora', 'placa')},
+        ),
+        migrations.RunPython(rellenar_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('residencial', '0002_vehiculo_placa_normalizada'),
+        ('seguridad_IA', '0002_lecturas_indices_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='lecturaplaca',
+            name='lectura_fecha_idx',
+        ),
+        migrations.AddIndex(
+            model_name='lecturaplaca',
+            index=models.Index(fields=['-created_at', '-id'], name='lectura_fecha_id_idx'),
+        ),
+    ]
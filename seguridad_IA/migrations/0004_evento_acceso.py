@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:58
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_IA', '0003_lectura_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoAcceso',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('placa', 'Placa'), ('rostro', 'Rostro')], max_length=10)),
+                ('camera_id', models.CharField(blank=True, max_length=50)),
+                ('datos', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'evento_acceso',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['camera_id', 'id'], name='evento_camara_id_idx'), models.Index(fields=['created_at'], name='evento_fecha_idx')],
+            },
+        ),
+    ]
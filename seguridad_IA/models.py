@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 from residencial.modelsVehiculo import Vehiculo
@@ -15,8 +16,79 @@ class LecturaPlaca(models.Model):
     class Meta:
         db_table = "lectura_placa"
         ordering = ["-created_at"]
+        indexes = [
+            # "por cámara en el tiempo", "por placa en el tiempo" y el orden del historial
+            # paginado por cursor (created_at, id), que también sirve a la retención
+            models.Index(fields=["camera_id", "-created_at"], name="lectura_camara_fecha_idx"),
+            models.Index(fields=["placa", "-created_at"], name="lectura_placa_fecha_idx"),
+            models.Index(fields=["-created_at", "-id"], name="lectura_fecha_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.placa} ({self.score:.2f}) @ {self.created_at:%Y-%m-%d %H:%M}"
 
-# Create your models here.
\ No newline at end of file
+
+class LecturaPlacaHora(models.Model):
+    """
+    Resumen por cámara y hora de las lecturas de placas (seguridad_IA.rollups).
+    Los tableros leen esta tabla en lugar de lectura_placa.
+    """
+    id = models.AutoField(primary_key=True)
+    camera_id = models.CharField(max_length=50, blank=True)
+    hora = models.DateTimeField()
+    lecturas = models.PositiveIntegerField(default=0)
+    coincidencias = models.PositiveIntegerField(default=0)
+    placas_unicas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "lectura_placa_hora"
+        ordering = ["-hora"]
+        unique_together = ["camera_id", "hora"]
+        indexes = [
+            models.Index(fields=["hora"], name="lectura_hora_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.camera_id or '-'} {self.hora:%Y-%m-%d %H:00} ({self.lecturas})"
+
+
+class PlacaHora(models.Model):
+    """
+    Placas distintas vistas por cámara y hora; alimenta placas_unicas.
+    """
+    id = models.AutoField(primary_key=True)
+    camera_id = models.CharField(max_length=50, blank=True)
+    hora = models.DateTimeField()
+    placa = models.CharField(max_length=20)
+
+    class Meta:
+        db_table = "placa_hora"
+        unique_together = ["camera_id", "hora", "placa"]
+
+
+class EventoAcceso(models.Model):
+    """
+    Evento de la barrera (placa decidida o rostro reconocido) para el flujo
+    SSE de los guardias (seguridad_IA.eventos). El id es el Last-Event-ID.
+    """
+    TIPOS = [
+        ("placa", "Placa"),
+        ("rostro", "Rostro"),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    camera_id = models.CharField(max_length=50, blank=True)
+    datos = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "evento_acceso"
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["camera_id", "id"], name="evento_camara_id_idx"),
+            models.Index(fields=["created_at"], name="evento_fecha_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.tipo} {self.camera_id or '-'}"
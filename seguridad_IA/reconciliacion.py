@@ -0,0 +1,322 @@
+# seguridad_IA/reconciliacion.py
+"""
+Reconciliación entre los luxand_uuid de Persona/Empleado y la galería del
+reconocedor facial.
+
+Recorre la galería por páginas (varias en vuelo desde un pool de hilos, con
+el límite de tasa del enrolamiento) y cruza cada persona contra un índice
+local uuid -> titular armado en una sola pasada sobre IdentidadFacial. Cada
+página se procesa al llegar y se descarta, y de cada hallazgo el informe
+guarda el total y una muestra: la memoria depende de los registros locales,
+no del tamaño de la galería.
+
+Hallazgos:
+  - huerfanos:       personas de la galería sin registro local;
+  - duplicados:      huérfanos con el nombre de un registro ya enrolado
+                     (la misma persona enrolada dos veces);
+  - inexistentes:    uuid registrados que la galería ya no tiene
+                     (confirmados uno a uno, por si la paginación se movió);
+  - desincronizados: luxand_uuid de Persona/Empleado que el registro no
+                     asigna a esa fila (p.ej. el mismo uuid en dos filas);
+  - sin_enrolar:     registros con imagen, sin luxand_uuid ni identidad registrada.
+
+Con `reparar` se borran de la galería los duplicados (y los huérfanos, con
+`borrar_huerfanos`) y se dan de baja los inexistentes (registro y
+luxand_uuid); con `enrolar` los pendientes se enrolan con
+seguridad_IA.enrolamiento. Los borrados se hacen al terminar el recorrido
+(sólo se juntan los uuid): la paginación es por desplazamiento y borrar
+mientras se leen páginas correría las siguientes, saltando huérfanos. Antes
+de borrar se vuelve a consultar la BD por si alguien se enroló durante el
+recorrido.
+
+Se usa desde `manage.py reconciliar_galeria` y desde ReconciliacionView.
+"""
+import threading
+import time
+import uuid as uuidlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from administracion import identidades
+from administracion.models import IdentidadFacial
+from core.reconocedores import get_reconocedor
+
+from . import enrolamiento
+
+WORKERS = getattr(settings, "RECONCILIACION_WORKERS", 4)
+POR_PAGINA = getattr(settings, "RECONCILIACION_POR_PAGINA", 500)
+MUESTRA = 50
+LOTE = 100
+
+
+class Hallazgos:
+    """
+    Total de un tipo de hallazgo y una muestra acotada de ellos.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.muestra = []
+
+    def agregar(self, item):
+        self.total += 1
+        if len(self.muestra) < MUESTRA:
+            self.muestra.append(item)
+
+    def como_dict(self) -> dict:
+        return {"total": self.total, "muestra": self.muestra}
+
+
+def _colecciones() -> set:
+    return {c for c in (getattr(settings, "LUXAND_COLLECTION", ""),
+                        getattr(settings, "LUXAND_COLLECTION_EMPLEADOS", "")) if c}
+
+
+def _es_nuestra(persona: dict, colecciones: set) -> bool:
+    # Sin colecciones configuradas (o sin datos de colección) toda la galería es nuestra
+    nombres = {c.get("name") if isinstance(c, dict) else c for c in persona.get("collections") or []}
+    return not colecciones or not nombres or bool(nombres & colecciones)
+
+
+def indice_local():
+    """
+    En una pasada sobre el registro IdentidadFacial: uuid -> (tipo, id, nombre)
+    y nombre -> uuid. Aparte, los luxand_uuid que el registro no respalda.
+    """
+    por_uuid, por_nombre, desincronizados = {}, {}, Hallazgos()
+    filas = (IdentidadFacial.objects.order_by()
+             .values_list("uuid", "tipo", "persona_id", "empleado_id", "persona__nombre",
+                          "persona__apellido", "empleado__nombre", "empleado__apellido")
+             .iterator(chunk_size=2000))
+    for uuid, tipo, persona_id, empleado_id, pn, pa, en, ea in filas:
+        if tipo == "persona":
+            id_, nombre = persona_id, f"{pn} {pa}".strip()
+        else:
+            id_, nombre = empleado_id, f"{en} {ea}".strip()
+        por_uuid[uuid] = (tipo, id_, nombre)
+        por_nombre.setdefault(nombre.lower(), uuid)
+    for tipo, modelo in enrolamiento.MODELOS.items():
+        filas = (modelo.objects.exclude(luxand_uuid__isnull=True).exclude(luxand_uuid="")
+                 .exclude(identidades_faciales__uuid=F("luxand_uuid"))
+                 .order_by().values_list("id", "luxand_uuid"))
+        for id_, uuid in filas.iterator(chunk_size=2000):
+            titular = por_uuid.get(uuid)
+            desincronizados.agregar({"tipo": tipo, "id": id_, "uuid": uuid,
+                                     "registrado_para": f"{titular[0]}:{titular[1]}" if titular else None})
+    return por_uuid, por_nombre, desincronizados
+
+
+def paginas(reconocedor, limitador, por_pagina: int = POR_PAGINA, workers: int = WORKERS):
+    """
+    Genera las páginas de la galería. La primera se pide sola; desde la
+    segunda hay `workers` en vuelo y se deja de pedir tras la primera
+    página incompleta. Las páginas llegan en orden de finalización.
+    """
+    def traer(numero):
+        limitador.esperar()
+        try:
+            return reconocedor.listar(numero, por_pagina)
+        finally:
+            close_old_connections()
+
+    primera = traer(1)
+    yield primera
+    # Incompleta, o la API no pagina y devolvió la galería entera
+    if len(primera) != por_pagina:
+        return
+    marca = primera[0].get("uuid")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="reconciliacion") as pool:
+        en_vuelo, siguiente, ultima = {}, 2, None
+        for _ in range(max(1, workers)):
+            en_vuelo[pool.submit(traer, siguiente)] = siguiente
+            siguiente += 1
+        while en_vuelo:
+            hechos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                numero = en_vuelo.pop(futuro)
+                pagina = futuro.result()
+                if pagina and pagina[0].get("uuid") == marca:
+                    raise ValueError("El proveedor ignora la paginación: se repite la primera página")
+                if len(pagina) < por_pagina:
+                    ultima = numero if ultima is None else min(ultima, numero)
+                if ultima is None or numero <= ultima:
+                    yield pagina
+            while ultima is None and len(en_vuelo) < workers:
+                en_vuelo[pool.submit(traer, siguiente)] = siguiente
+                siguiente += 1
+
+
+def _todavia_sin_registro(uuids) -> list:
+    # Alguien pudo enrolarse durante el recorrido: no se borra lo que ya tiene registro
+    ocupados = set(IdentidadFacial.objects.filter(uuid__in=uuids).values_list("uuid", flat=True))
+    for modelo in enrolamiento.MODELOS.values():
+        ocupados.update(modelo.objects.filter(luxand_uuid__in=uuids).values_list("luxand_uuid", flat=True))
+    return [u for u in uuids if u not in ocupados]
+
+
+def reconciliar(reparar: bool = False, borrar_huerfanos: bool = False, enrolar: bool = False,
+                workers: int = WORKERS, por_pagina: int = POR_PAGINA, progreso=None) -> dict:
+    """
+    Cruza la galería con los registros locales y devuelve el informe.
+    `progreso(informe)` se llama tras cada página.
+    """
+    reconocedor = get_reconocedor()
+    limitador = enrolamiento.LimitadorTasa(enrolamiento.TASA, rafaga=max(1, workers))
+    colecciones = _colecciones()
+    inicio = time.monotonic()
+
+    por_uuid, por_nombre, desincronizados = indice_local()
+    huerfanos, duplicados, inexistentes, sin_enrolar = Hallazgos(), Hallazgos(), Hallazgos(), Hallazgos()
+    informe = {"backend": reconocedor.nombre, "reparar": reparar, "locales": len(por_uuid),
+               "galeria": 0, "paginas": 0, "vigentes": 0, "ajenos": 0,
+               "borrados_galeria": 0, "uuid_limpiados": 0, "errores": []}
+    por_borrar = []
+
+    def llamar(funcion, uuid):
+        limitador.esperar()
+        try:
+            return uuid, funcion(uuid), None
+        except Exception as e:
+            return uuid, None, str(e)
+        finally:
+            close_old_connections()
+
+    def borrar_lote(pool, uuids):
+        lote = _todavia_sin_registro(uuids)
+        for uuid, _, error in pool.map(lambda u: llamar(reconocedor.borrar, u), lote):
+            if error:
+                informe["errores"].append({"uuid": uuid, "accion": "borrar", "error": error})
+            else:
+                informe["borrados_galeria"] += 1
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="reconciliacion-rep") as pool:
+        for pagina in paginas(reconocedor, limitador, por_pagina, workers):
+            informe["paginas"] += 1
+            for persona in pagina:
+                uuid = persona.get("uuid")
+                if not uuid:
+                    continue
+                informe["galeria"] += 1
+                if por_uuid.pop(uuid, None) is not None:
+                    informe["vigentes"] += 1
+                    continue
+                if not _es_nuestra(persona, colecciones):
+                    informe["ajenos"] += 1
+                    continue
+                nombre = (persona.get("name") or "").strip()
+                enrolado = por_nombre.get(nombre.lower())
+                if enrolado and enrolado != uuid:
+                    duplicados.agregar({"uuid": uuid, "nombre": nombre, "enrolado_como": enrolado})
+                    if reparar:
+                        por_borrar.append(uuid)
+                else:
+                    huerfanos.agregar({"uuid": uuid, "nombre": nombre})
+                    if reparar and borrar_huerfanos:
+                        por_borrar.append(uuid)
+            if progreso:
+                progreso(informe)
+        por_nombre.clear()
+
+        # Con todas las páginas ya leídas: borrar no corre el desplazamiento de ninguna
+        for i in range(0, len(por_borrar), LOTE):
+            borrar_lote(pool, por_borrar[i:i + LOTE])
+        por_borrar.clear()
+
+        # Lo que quedó en el índice local no apareció en la galería: se confirma uno a uno
+        restantes = list(por_uuid.items())
+        por_uuid.clear()
+        for i in range(0, len(restantes), LOTE):
+            lote = dict(restantes[i:i + LOTE])
+            limpiar = {}
+            for uuid, existe, error in pool.map(lambda u: llamar(reconocedor.existe, u), lote):
+                if error:
+                    informe["errores"].append({"uuid": uuid, "accion": "verificar", "error": error})
+                    continue
+                if existe:
+                    # Se movió de página durante el recorrido
+                    informe["vigentes"] += 1
+                    continue
+                tipo, id_, nombre = lote[uuid]
+                inexistentes.agregar({"uuid": uuid, "tipo": tipo, "id": id_, "nombre": nombre})
+                limpiar.setdefault(tipo, []).append((id_, uuid))
+            if reparar:
+                for tipo, pares in limpiar.items():
+                    for id_, uuid in pares:
+                        # El filtro por uuid evita pisar un re-enrolamiento concurrente
+                        with transaction.atomic():
+                            informe["uuid_limpiados"] += enrolamiento.MODELOS[tipo].objects.filter(
+                                id=id_, luxand_uuid=uuid).update(luxand_uuid=None)
+                            identidades.olvidar([uuid])
+    if informe["uuid_limpiados"]:
+        # update() no dispara señales: el índice de identidades se recarga
+        identidades.invalidar()
+
+    for tipo in enrolamiento.MODELOS:
+        qs = enrolamiento.pendientes(tipo)
+        sin_enrolar.total += qs.count()
+        for r in qs[:max(0, MUESTRA - len(sin_enrolar.muestra))]:
+            sin_enrolar.muestra.append({"tipo": tipo, "id": r.pk, "nombre": f"{r.nombre} {r.apellido}".strip()})
+    if enrolar and sin_enrolar.total:
+        try:
+            # Mismo candado que el enrolamiento masivo: los pendientes se vuelven a leer con él tomado
+            with enrolamiento.exclusivo(f"reconciliacion-{uuidlib.uuid4().hex}"):
+                for tipo in enrolamiento.MODELOS:
+                    informe.setdefault("enrolamiento", {})[tipo] = enrolamiento.enrolar(enrolamiento.pendientes(tipo), tipo)
+        except enrolamiento.EnrolamientoEnCurso as e:
+            informe["enrolamiento"] = {"error": str(e)}
+
+    informe.update({
+        "huerfanos": huerfanos.como_dict(),
+        "duplicados": duplicados.como_dict(),
+        "inexistentes": inexistentes.como_dict(),
+        "desincronizados": desincronizados.como_dict(),
+        "sin_enrolar": sin_enrolar.como_dict(),
+        "segundos": round(time.monotonic() - inicio, 2),
+    })
+    return informe
+
+
+# ---------- trabajos en segundo plano (vista) ----------
+
+_K_TRABAJO = "reconciliacion:trabajo:{}"
+TTL_INFORME = 24 * 3600
+
+
+def estado_trabajo(trabajo_id: str):
+    return cache.get(_K_TRABAJO.format(trabajo_id))
+
+
+def lanzar(**opciones) -> dict:
+    """
+    Inicia la reconciliación en un hilo aparte y devuelve el estado inicial.
+    El progreso (páginas, personas vistas) queda en la caché bajo el id del trabajo.
+    """
+    trabajo_id = uuidlib.uuid4().hex
+    clave = _K_TRABAJO.format(trabajo_id)
+    estado = {"id": trabajo_id, "estado": "en_curso", "opciones": opciones, "informe": None}
+    cache.set(clave, estado, timeout=TTL_INFORME)
+    inicial = dict(estado)
+
+    def progreso(informe):
+        estado["informe"] = {k: informe[k] for k in ("paginas", "galeria", "vigentes", "borrados_galeria")}
+        cache.set(clave, estado, timeout=TTL_INFORME)
+
+    def ejecutar():
+        try:
+            estado["informe"] = reconciliar(progreso=progreso, **opciones)
+            estado["estado"] = "completado"
+        except Exception as e:
+            estado["estado"] = "error"
+            estado["error"] = str(e)
+            print(f"[Reconciliacion] Trabajo {trabajo_id} falló: {e}")
+        finally:
+            cache.set(clave, estado, timeout=TTL_INFORME)
+            close_old_connections()
+
+    threading.Thread(target=ejecutar, name=f"reconciliacion-{trabajo_id[:8]}", daemon=True).start()
+    return inicial
@@ -0,0 +1,62 @@
+# seguridad_IA/rollups.py
+"""
+Resúmenes horarios de lecturas de placas (LecturaPlacaHora).
+
+acumular() se llama con cada lectura nueva (o con un lote) y suma en la fila
+(camera_id, hora) con UPDATE ... = campo + n; las placas distintas se llevan
+en PlacaHora para contar placas_unicas sin recorrer lectura_placa.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LecturaPlacaHora, PlacaHora
+
+
+def truncar_hora(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def acumular(lecturas):
+    """
+    Suma `lecturas` (instancias de LecturaPlaca ya guardadas) a los resúmenes.
+    """
+    grupos = defaultdict(lambda: {"lecturas": 0, "coincidencias": 0, "placas": set()})
+    for l in lecturas:
+        g = grupos[(l.camera_id or "", truncar_hora(l.created_at))]
+        g["lecturas"] += 1
+        g["coincidencias"] += 1 if l.match else 0
+        if l.placa:
+            g["placas"].add(l.placa)
+
+    with transaction.atomic():
+        for (camera_id, hora), g in grupos.items():
+            nuevas = 0
+            if g["placas"]:
+                vistas = set(PlacaHora.objects
+                             .filter(camera_id=camera_id, hora=hora, placa__in=g["placas"])
+                             .values_list("placa", flat=True))
+                for placa in g["placas"] - vistas:
+                    _, creada = PlacaHora.objects.get_or_create(camera_id=camera_id, hora=hora, placa=placa)
+                    nuevas += 1 if creada else 0
+            LecturaPlacaHora.objects.get_or_create(camera_id=camera_id, hora=hora)
+            LecturaPlacaHora.objects.filter(camera_id=camera_id, hora=hora).update(
+                lecturas=F("lecturas") + g["lecturas"],
+                coincidencias=F("coincidencias") + g["coincidencias"],
+                placas_unicas=F("placas_unicas") + nuevas,
+            )
+
+
+def resumen(desde=None, hasta=None, camera_id=None):
+    """
+    Filas horarias entre `desde` y `hasta` (por defecto, las últimas 24 h).
+    """
+    hasta = hasta or timezone.now()
+    desde = desde or hasta - timedelta(hours=24)
+    qs = LecturaPlacaHora.objects.filter(hora__gte=truncar_hora(desde), hora__lte=hasta)
+    if camera_id is not None:
+        qs = qs.filter(camera_id=camera_id)
+    return qs.order_by("hora", "camera_id")
@@ -21,9 +21,21 @@ class LecturaPlacaSerializer(serializers.ModelSerializer):
         fields = "__all__"
     
     def get_propietario(self, obj):
+        # El ALPR ya lo conoce por el padrón en memoria: sin consultar el vehículo
+        if "propietario" in self.context:
+            return self.context["propietario"] or None
         try:
             if obj.vehiculo and obj.vehiculo.persona:
                 return str(obj.vehiculo.persona)
         except AttributeError:
             pass
         return None
+
+
+class LecturaPlacaListaSerializer(serializers.ModelSerializer):
+    """
+    Versión liviana para el historial (sin consultas por fila).
+    """
+    class Meta:
+        model = LecturaPlaca
+        fields = ["id", "placa", "score", "camera_id", "image_url", "created_at", "vehiculo", "match"]
@@ -1,3 +1,274 @@
+import base64
+import glob
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from administracion.models import IdentidadFacial, Persona
+from residencial import indice_placas
+from residencial.modelsVehiculo import Vehiculo
+
+from . import alpr, enrolamiento
+from .buffer_lecturas import HUERFANO, BufferLecturas, _a_linea
+from .models import LecturaPlaca
+
+
+class HistorialLecturasTests(TestCase):
+    """
+    GET /api/alpr/lecturas/: paginación por cursor (created_at, id).
+    """
+    url = "/api/alpr/lecturas/"
+
+    @classmethod
+    def setUpTestData(cls):
+        base = timezone.now()
+        # Tres pares con la misma fecha: el id desempata
+        for i in range(7):
+            LecturaPlaca.objects.create(
+                placa=f"ABC{i}", score=0.9, camera_id="norte",
+                created_at=base - timedelta(seconds=i // 2),
+            )
+        cls.esperados = list(LecturaPlaca.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _recorrer(self, limite: int) -> list:
+        ids, cursor = [], None
+        for _ in range(len(self.esperados) + 1):
+            params = {"limite": limite, **({"cursor": cursor} if cursor else {})}
+            datos = self.client.get(self.url, params).json()
+            ids.extend(fila["id"] for fila in datos["results"])
+            cursor = datos["cursor"]
+            if cursor is None:
+                return ids
+        self.fail("El cursor no termina")
+
+    def test_recorre_todo_en_orden_sin_repetir(self):
+        for limite in (1, 2, 3, 7, 50):
+            with self.subTest(limite=limite):
+                self.assertEqual(self._recorrer(limite), self.esperados)
+
+    def test_el_cursor_codifica_fecha_e_id_de_la_ultima_fila(self):
+        datos = self.client.get(self.url, {"limite": 3}).json()
+        cursor = datos["cursor"]
+        contenido = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        ultima = LecturaPlaca.objects.get(pk=datos["results"][-1]["id"])
+
+        self.assertEqual(contenido["id"], ultima.pk)
+        self.assertEqual(contenido["v"], ultima.created_at.isoformat())
+        self.assertNotIn("=", cursor)
+        self.assertIn(f"cursor={cursor}", datos["next"])
+
+    def test_ultima_pagina_sin_cursor(self):
+        datos = self.client.get(self.url, {"limite": 50}).json()
+        self.assertIsNone(datos["cursor"])
+        self.assertIsNone(datos["next"])
+
+    def test_cursor_invalido(self):
+        for cursor in ("no-es-base64!", base64.urlsafe_b64encode(b'{"v": "x", "id": 1}').decode()):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(self.url, {"cursor": cursor}).status_code, 400)
+
+    def test_limite_acotado(self):
+        self.assertEqual(len(self.client.get(self.url, {"limite": 0}).json()["results"]), 1)
+        self.assertEqual(len(self.client.get(self.url, {"limite": "x"}).json()["results"]), 7)
+
+
+@mock.patch.object(BufferLecturas, "_arrancar")
+class SpoolLecturasTests(TestCase):
+    """
+    Recuperación de los segmentos JSONL del buffer de lecturas.
+    """
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.directorio = temporal.name
+        self.buffer = BufferLecturas(maximo=50, segundos=60, directorio=self.directorio)
+
+    def _segmento(self, nombre, lecturas, antiguedad=0):
+        ruta = os.path.join(self.directorio, nombre)
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.writelines(_a_linea(l) for l in lecturas)
+        if antiguedad:
+            momento = time.time() - antiguedad
+            os.utime(ruta, (momento, momento))
+        return ruta
+
+    def _lecturas(self, *placas, **campos):
+        return [LecturaPlaca(placa=p, score=0.9, camera_id="norte", **campos) for p in placas]
+
+    def _archivos(self):
+        return sorted(os.path.basename(r) for r in glob.glob(os.path.join(self.directorio, "*")))
+
+    def test_reinserta_los_pendientes(self, _arrancar):
+        self._segmento("lecturas-a.pendiente", self._lecturas("AAA111", "BBB222"))
+
+        self.assertEqual(self.buffer.reinsertar_huerfanos(), 2)
+
+        self.assertEqual(sorted(LecturaPlaca.objects.values_list("placa", flat=True)), ["AAA111", "BBB222"])
+        self.assertEqual(self._archivos(), [])
+
+    def test_abiertos_solo_si_estan_abandonados(self, _arrancar):
+        self._segmento("lecturas-viejo.abierto", self._lecturas("AAA111"), antiguedad=HUERFANO + 60)
+        self._segmento("lecturas-nuevo.abierto", self._lecturas("BBB222"))
+
+        self.assertEqual(self.buffer.reinsertar_huerfanos(), 1)
+
+        self.assertEqual(list(LecturaPlaca.objects.values_list("placa", flat=True)), ["AAA111"])
+        self.assertEqual(self._archivos(), ["lecturas-nuevo.abierto"])
+
+    def test_retoma_reinserciones_abandonadas(self, _arrancar):
+        self._segmento("lecturas-viejo.reinsertando-1a2b3c4d", self._lecturas("AAA111"), antiguedad=HUERFANO + 60)
+        self._segmento("lecturas-nuevo.reinsertando-5e6f7a8b", self._lecturas("BBB222"))
+
+        self.assertEqual(self.buffer.reinsertar_huerfanos(), 1)
+
+        self.assertEqual(list(LecturaPlaca.objects.values_list("placa", flat=True)), ["AAA111"])
+        self.assertEqual(self._archivos(), ["lecturas-nuevo.reinsertando-5e6f7a8b"])
+
+    def test_no_duplica_ids_reservados(self, _arrancar):
+        # Corte entre el commit del lote y el borrado de su segmento
+        lecturas = [LecturaPlaca(id=900 + i, placa=f"AAA{i}", score=0.9, camera_id="norte") for i in range(3)]
+        LecturaPlaca.objects.bulk_create(lecturas[:2])
+        self._segmento("lecturas-a.pendiente", lecturas)
+
+        self.buffer.reinsertar_huerfanos()
+
+        self.assertEqual(sorted(LecturaPlaca.objects.values_list("id", flat=True)), [900, 901, 902])
+
+    def test_si_la_bd_falla_el_segmento_queda_pendiente(self, _arrancar):
+        ruta = self._segmento("lecturas-a.pendiente", self._lecturas("AAA111"))
+
+        with mock.patch("seguridad_IA.buffer_lecturas._insertar", side_effect=Exception("sin BD")):
+            self.assertEqual(self.buffer.reinsertar_huerfanos(), 0)
+
+        self.assertEqual(self._archivos(), ["lecturas-a.pendiente"])
+        self.assertEqual(self.buffer.reinsertar_huerfanos(), 1)
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_lote_fallido_pasa_a_pendiente(self, _arrancar):
+        for lectura in self._lecturas("AAA111", "BBB222"):
+            self.buffer.agregar(lectura)
+        self.assertEqual(len(self._archivos()), 1)
+        self.assertTrue(self._archivos()[0].endswith(".abierto"))
+
+        with mock.patch("seguridad_IA.buffer_lecturas._insertar", side_effect=Exception("sin BD")):
+            self.assertEqual(self.buffer.vaciar(), 0)
+
+        self.assertTrue(self._archivos()[0].endswith(".pendiente"))
+        self.assertEqual(self.buffer.reinsertar_huerfanos(), 2)
+        self.assertEqual(LecturaPlaca.objects.count(), 2)
+
+    def test_no_toma_su_propio_segmento_abierto(self, _arrancar):
+        self.buffer.agregar(self._lecturas("AAA111")[0])
+        ruta = os.path.join(self.directorio, self._archivos()[0])
+        momento = time.time() - HUERFANO - 60
+        os.utime(ruta, (momento, momento))
+
+        self.assertEqual(self.buffer.reinsertar_huerfanos(), 0)
+        self.assertEqual(self.buffer.vaciar(), 1)
+        self.assertEqual(self._archivos(), [])
+
+
+@mock.patch("seguridad_IA.enrolamiento.threading.Thread")
+class EnrolamientoMasivoTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _persona(self, ci, luxand_uuid=None):
+        return Persona.objects.create(
+            nombre="Ana", apellido="Pérez", sexo="F", tipo="P", CI=ci,
+            fecha_nacimiento=date(1990, 1, 1), imagen=f"https://i.ibb.co/{ci}.jpg",
+            luxand_uuid=luxand_uuid,
+        )
+
+    def test_un_solo_trabajo_a_la_vez(self, hilo):
+        self._persona("1")
+
+        primero = enrolamiento.lanzar(["persona"])
+        segundo = enrolamiento.lanzar(["persona"])
+
+        self.assertEqual(segundo["id"], primero["id"])
+        self.assertTrue(segundo["ya_en_curso"])
+        self.assertEqual(hilo.call_count, 1)
+
+    def test_el_comando_respeta_el_trabajo_en_curso(self, hilo):
+        enrolamiento.lanzar(["persona"])
+
+        with self.assertRaises(enrolamiento.EnrolamientoEnCurso):
+            with enrolamiento.exclusivo("comando"):
+                pass
+
+    def test_al_terminar_se_libera(self, hilo):
+        primero = enrolamiento.lanzar(["persona"])
+        hilo.call_args.kwargs["target"]()
+
+        segundo = enrolamiento.lanzar(["persona"])
+
+        self.assertNotEqual(segundo["id"], primero["id"])
+        self.assertNotIn("ya_en_curso", segundo)
+
+    def test_con_uuid_sin_registro_se_registra_sin_re_enrolar(self, hilo):
+        ana = self._persona("1")
+        beto = self._persona("2")
+        # update() no dispara señales: queda luxand_uuid sin IdentidadFacial
+        Persona.objects.filter(pk=ana.pk).update(luxand_uuid="u-ana")
+
+        self.assertEqual(list(enrolamiento.pendientes("persona")), [beto])
+
+        estado = enrolamiento.lanzar(["persona"])
+
+        self.assertEqual(estado["total"], 1)
+        self.assertEqual(estado["rellenados"], {"persona": 1})
+        self.assertEqual(IdentidadFacial.objects.get(uuid="u-ana").persona_id, ana.pk)
+
+
+class DecisionPlacaTests(TestCase):
+    """
+    Sólo la placa exacta (normalizada) da match; la aproximada queda para el guardia.
+    """
+
+    def setUp(self):
+        cache.clear()
+        persona = Persona.objects.create(
+            nombre="Ana", apellido="Pérez", sexo="F", tipo="P", CI="1",
+            fecha_nacimiento=date(1990, 1, 1),
+        )
+        self.vehiculo = Vehiculo.objects.create(
+            persona=persona, color="Rojo", marca="Toyota", modelo="Corolla",
+            placa="ABC123", tipo="Automóvil",
+        )
+        indice_placas.indice.calentar()
+
+    def _decidir(self, placa, camera_id):
+        return alpr._decidir(b"", [{"plate": placa, "score": 0.9}], camera_id, None)
+
+    def test_exacta_normalizada(self):
+        decision = self._decidir("abc-123", "norte")
+
+        self.assertTrue(decision["match"])
+        self.assertEqual(decision["coincidencia"], "exacta")
+        self.assertFalse(decision["requiere_confirmacion"])
+        self.assertTrue(LecturaPlaca.objects.get(pk=decision["lectura"]["id"]).match)
+
+    def test_aproximada_no_abre(self):
+        decision = self._decidir("A8C-l23", "sur")
 
-# Create your tests here.
+        self.assertFalse(decision["match"])
+        self.assertEqual(decision["coincidencia"], "aproximada")
+        self.assertTrue(decision["requiere_confirmacion"])
+        self.assertEqual(decision["vehiculo"]["id"], self.vehiculo.pk)
+        lectura = LecturaPlaca.objects.get(pk=decision["lectura"]["id"])
+        self.assertFalse(lectura.match)
+        self.assertEqual(lectura.vehiculo_id, self.vehiculo.pk)
@@ -1,12 +1,32 @@
 # seguridad_IA/urls.py
 from django.urls import path
-from .views import AlprScanView, ReconocimientoGlobalView, EnrolarPersonaView, VerificarEnrolamientoView, VerificarLuxandAPIView, ProbarLuxandView
+from .views import (
+    alpr_scan, reconocimiento_global, EnrolarPersonaView, VerificarEnrolamientoView, VerificarLuxandAPIView, probar_luxand, CacheReconocimientoView,
+    EnrolamientoMasivoView, EnrolamientoMasivoEstadoView, ReconciliacionView, ReconciliacionEstadoView, AlprDebounceView,
+    AlprColaView, AlprTicketView, AlprUltimaDecisionView, AlprLoteView, AlprResumenView,
+    LecturaPlacaListView, TiemposView, eventos_acceso, eventos_espera,
+)
 
 urlpatterns = [
-    path("alpr/", AlprScanView.as_view(), name="alpr-scan"),
-    path("reconocimiento/", ReconocimientoGlobalView.as_view(), name="reconocimiento-global"),
+    path("alpr/", alpr_scan, name="alpr-scan"),
+    path("alpr/debounce/", AlprDebounceView.as_view(), name="alpr-debounce"),
+    path("alpr/lecturas/", LecturaPlacaListView.as_view(), name="alpr-lecturas"),
+    path("alpr/resumen/", AlprResumenView.as_view(), name="alpr-resumen"),
+    path("alpr/lote/", AlprLoteView.as_view(), name="alpr-lote"),
+    path("alpr/cola/", AlprColaView.as_view(), name="alpr-cola"),
+    path("alpr/cola/<str:ticket>/", AlprTicketView.as_view(), name="alpr-ticket"),
+    path("alpr/camaras/<str:camera_id>/ultima/", AlprUltimaDecisionView.as_view(), name="alpr-ultima-decision"),
+    path("reconocimiento/", reconocimiento_global, name="reconocimiento-global"),
     path("enrolar/", EnrolarPersonaView.as_view(), name="enrolar-persona"),
+    path("enrolar/masivo/", EnrolamientoMasivoView.as_view(), name="enrolar-masivo"),
+    path("enrolar/masivo/<str:trabajo_id>/", EnrolamientoMasivoEstadoView.as_view(), name="enrolar-masivo-estado"),
+    path("enrolar/reconciliar/", ReconciliacionView.as_view(), name="enrolar-reconciliar"),
+    path("enrolar/reconciliar/<str:trabajo_id>/", ReconciliacionEstadoView.as_view(), name="enrolar-reconciliar-estado"),
     path("verificar-enrolamiento/", VerificarEnrolamientoView.as_view(), name="verificar-enrolamiento"),
     path("verificar-luxand/", VerificarLuxandAPIView.as_view(), name="verificar-luxand"),
-    path("probar-luxand/", ProbarLuxandView.as_view(), name="probar-luxand"),
+    path("probar-luxand/", probar_luxand, name="probar-luxand"),
+    path("reconocimiento/cache/", CacheReconocimientoView.as_view(), name="reconocimiento-cache"),
+    path("tiempos/", TiemposView.as_view(), name="tiempos"),
+    path("eventos/", eventos_acceso, name="eventos-acceso"),
+    path("eventos/espera/", eventos_espera, name="eventos-espera"),
 ]
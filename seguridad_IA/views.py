@@ -1,24 +1,150 @@
-import time, requests
+import json
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.views import APIView
+from rest_framework import generics
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from django.db.models import F
+from django.utils.dateparse import parse_datetime
+from administracion.models import IdentidadFacial, Persona, Empleado
+from administracion import identidades
+from core.reconocedores import agrupar_rostros, get_reconocedor
+from core import cache_reconocimiento, calidad_rostro, luxand, tiempos
+from core.tiempos import CronometroMixin, cronometrar, cronometrar_vista
+from . import debounce, enrolamiento, eventos, reconciliacion, rollups
+from .cola_alpr import cola as cola_alpr, estado_ticket, ultima_decision
+from .alpr import ErrorAlpr, aprocesar_frame, procesar_lote
+from core.http import sesion
+from core.resiliencia import ProveedorNoDisponible
+from core.normalizacion import normalizar
+from core.paginacion import KeysetPagination
 from .models import LecturaPlaca
-from .serializers.serializersPlaca import LecturaPlacaSerializer
-from residencial.modelsVehiculo import Vehiculo
-from administracion.models import Persona, Empleado
-from core.luxand import recognize, add_person
+from .serializers.serializersPlaca import LecturaPlacaListaSerializer
+
+
+def proveedor_no_disponible(e: ProveedorNoDisponible):
+    """
+    Respuesta 503 inmediata cuando el proveedor tiene el circuito abierto o sin cupo.
+    """
+    return Response(e.como_respuesta(), status=503, headers={"Retry-After": str(e.reintentar_en)})
+
+
+def _json(datos, status=200, headers=None):
+    """
+    JsonResponse de las vistas async (sin DRF), con el tiempo de serialización.
+    """
+    with tiempos.etapa("serializacion"):
+        return JsonResponse(datos, status=status, headers=headers, safe=False)
+
+
+def _datos_peticion(request) -> dict:
+    """
+    Campos del body en las vistas async: JSON o formulario/multipart.
+    """
+    if request.content_type == "application/json":
+        try:
+            datos = json.loads(request.body or b"{}")
+        except ValueError:
+            raise ValueError("JSON inválido")
+        return datos if isinstance(datos, dict) else {}
+    return request.POST
+
+
+@csrf_exempt
+@require_POST
+@cronometrar_vista("alpr_scan")
+async def alpr_scan(request):
+    """
+    POST multipart: upload (imagen), camera_id, regions.
+    Async: la espera de PlateRecognizer no ocupa un hilo del worker (ASGI).
+    """
+    if not settings.PLATE_TOKEN:
+        return _json({"error": "Configura PLATE_TOKEN"}, status=500)
+
+    with tiempos.etapa("lectura"):
+        f = request.FILES.get("upload")
+    if not f:
+        return _json({"error": "Debes enviar el archivo en 'upload'."}, status=400)
+    if not getattr(f, "content_type", "").startswith("image/"):
+        return _json({"error": "El archivo debe ser una imagen."}, status=400)
 
-PLATE_URL = "https://api.platerecognizer.com/v1/plate-reader/"
+    camera_id = request.POST.get("camera_id", "") or ""
+    regions   = request.POST.get("regions") or settings.PLATE_REGIONS
 
-class AlprScanView(APIView):
+    # Frame normalizado (orientación EXIF, máx. 1280px) para aligerar la llamada al ALPR
+    try:
+        with tiempos.etapa("lectura"):
+            frame = await sync_to_async(normalizar, thread_sensitive=False)(f, "placa")
+    except ValueError as e:
+        return _json({"error": "El archivo debe ser una imagen.", "detail": str(e)}, status=400)
+
+    try:
+        return _json(await aprocesar_frame(frame, camera_id, regions), status=200)
+    except ProveedorNoDisponible as e:
+        return _json(e.como_respuesta(), status=503, headers={"Retry-After": str(e.reintentar_en)})
+    except ErrorAlpr as e:
+        return _json(e.respuesta, status=e.status)
+
+
+class AlprLoteView(APIView):
+    """
+    Varios cuadros del mismo vehículo en una petición (campo 'upload' repetido).
+    Se envían al ALPR en paralelo y se guarda una sola LecturaPlaca con la
+    mejor lectura. Respuesta: la de alpr_scan + cuadros, cuadro_ganador.
+    """
     parser_classes = [MultiPartParser, FormParser]
 
     def post(self, request, *args, **kwargs):
-        token = settings.PLATE_TOKEN
-        if not token:
+        if not settings.PLATE_TOKEN:
             return Response({"error": "Configura PLATE_TOKEN"}, status=500)
 
+        archivos = request.FILES.getlist("upload")
+        if not archivos:
+            return Response({"error": "Debes enviar uno o más archivos en 'upload'."}, status=400)
+        maximo = getattr(settings, "ALPR_LOTE_MAX", 8)
+        if len(archivos) > maximo:
+            return Response({"error": f"Máximo {maximo} cuadros por lote."}, status=400)
+
+        camera_id = request.data.get("camera_id", "") or ""
+        regions   = request.data.get("regions") or settings.PLATE_REGIONS
+
+        frames = []
+        for f in archivos:
+            if not getattr(f, "content_type", "").startswith("image/"):
+                return Response({"error": f"El archivo {f.name} debe ser una imagen."}, status=400)
+            try:
+                frames.append(normalizar(f, "placa"))
+            except ValueError as e:
+                return Response({"error": f"El archivo {f.name} debe ser una imagen.", "detail": str(e)}, status=400)
+
+        try:
+            return Response(procesar_lote(frames, camera_id, regions), status=200)
+        except ProveedorNoDisponible as e:
+            return proveedor_no_disponible(e)
+        except ErrorAlpr as e:
+            return Response(e.respuesta, status=e.status)
+
+
+class AlprColaView(APIView):
+    """
+    Ingesta asíncrona de cuadros: POST encola y responde 202 con un ticket;
+    GET devuelve el estado de la cola (pendientes, procesados, descartados).
+    Body POST (multipart): upload, camera_id, regions.
+    """
+    parser_classes = [MultiPartParser, FormParser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(cola_alpr.estadisticas())
+
+    def post(self, request, *args, **kwargs):
         f = request.FILES.get("upload")
         if not f:
             return Response({"error": "Debes enviar el archivo en 'upload'."}, status=400)
@@ -27,61 +153,36 @@ class AlprScanView(APIView):
 
         camera_id = request.data.get("camera_id", "") or ""
         regions   = request.data.get("regions") or settings.PLATE_REGIONS
+        try:
+            frame = normalizar(f, "placa")
+        except ValueError as e:
+            return Response({"error": "El archivo debe ser una imagen.", "detail": str(e)}, status=400)
 
-        headers = {"Authorization": f"Token {token}"}
-        payload = {"regions": regions}
-        if camera_id:
-            payload["camera_id"] = camera_id
+        estado = cola_alpr.encolar(frame.getvalue(), camera_id, regions)
+        return Response(estado, status=202)
 
-        files = {"upload": (getattr(f, "name", "frame.jpg"), f, getattr(f, "content_type", "image/jpeg"))}
-        try:
-            f.seek(0)
-            r = requests.post(PLATE_URL, headers=headers, data=payload, files=files, timeout=20)
-            if r.status_code == 429:
-                time.sleep(1)
-                f.seek(0)
-                r = requests.post(PLATE_URL, headers=headers, data=payload, files=files, timeout=20)
-        except requests.RequestException as e:
-            return Response({"error": "No se pudo contactar al ALPR", "detail": str(e)}, status=502)
-
-        # 🔧 ACEPTAR 200/201 COMO ÉXITO
-        if r.status_code not in (200, 201):
-            return Response({"error": "ALPR no respondió OK", "status_code": r.status_code, "detail": r.text}, status=r.status_code)
-
-        js = r.json()
-        results = js.get("results", [])
-
-        if not results:
-            l = LecturaPlaca.objects.create(placa="", score=0.0, camera_id=camera_id, image_url=None, vehiculo=None, match=False)
-            return Response({
-                "status": "no-plate-found",
-                "plate": None, "score": None, "match": False,
-                "vehiculo": None,
-                "lectura": LecturaPlacaSerializer(l).data
-            }, status=200)
-
-        best      = max(results, key=lambda x: x.get("score", 0) or 0.0)
-        plate_raw = (best.get("plate") or "").upper()
-        score     = float(best.get("score") or 0.0)
-
-        v_match = (Vehiculo.objects.filter(placa__iexact=plate_raw)   # BD ya normalizada
-                .select_related("persona")
-                .first())
-
-        lectura = LecturaPlaca.objects.create(
-            placa=plate_raw, score=score, camera_id=camera_id,
-            image_url=None, vehiculo=v_match, match=bool(v_match)
-        )
-
-        from residencial.serializers.serializersVehiculo import VehiculoSerializer
-        return Response({
-            "status": "ok",
-            "plate": plate_raw,
-            "score": score,
-            "match": bool(v_match),
-            "vehiculo": VehiculoSerializer(v_match).data if v_match else None,
-            "lectura": LecturaPlacaSerializer(lectura).data
-        }, status=200)
+
+class AlprTicketView(APIView):
+    """
+    Estado de un ticket de la cola ALPR: en_cola | procesando | listo | descartado | error.
+    Con estado "listo", `decision` tiene la misma forma que la respuesta de alpr_scan.
+    """
+    def get(self, request, ticket, *args, **kwargs):
+        estado = estado_ticket(ticket)
+        if estado is None:
+            return Response({"detail": "Ticket no encontrado o expirado"}, status=404)
+        return Response(estado)
+
+
+class AlprUltimaDecisionView(APIView):
+    """
+    Última decisión procesada por la cola para una cámara.
+    """
+    def get(self, request, camera_id, *args, **kwargs):
+        decision = ultima_decision(camera_id)
+        if decision is None:
+            return Response({"detail": "Sin decisiones recientes para la cámara"}, status=404)
+        return Response(decision)
 
 
 def _norm(sim):
@@ -92,193 +193,207 @@ def _norm(sim):
     return sim / 100.0 if sim > 1.0 else sim
 
 
-class ReconocimientoGlobalView(APIView):
+def _uuid_sim(candidato):
+    # Luxand devuelve: uuid, probability, name, etc.
+    uuid = candidato.get("uuid") or candidato.get("subject") or candidato.get("person_uuid")
+    sim = _norm(candidato.get("probability") or candidato.get("similarity")
+                or candidato.get("confidence") or candidato.get("score"))
+    return uuid, sim
+
+
+def _decision(ident, uuid, sim, umbral) -> dict:
+    return {
+        "ok": bool(ident) and sim >= umbral,
+        "tipo": ident.tipo if ident else None,
+        "id": ident.id if ident else None,
+        "nombre": ident.nombre if ident else None,
+        "similaridad": round(sim, 4),
+        "uuid": uuid,
+        "umbral": umbral,
+    }
+
+
+def _identificar(uuid, sim, umbral, camera_id) -> dict:
+    # uuid -> identidad desde el índice en memoria (sin consultas en el caso común)
+    with tiempos.etapa("identidad"):
+        ident = identidades.resolver(uuid) if uuid else None
+
+    resultado = _decision(ident, uuid, sim, umbral)
+
+    # Aviso a las pantallas de los guardias (flujo SSE de eventos)
+    try:
+        with tiempos.etapa("evento"):
+            eventos.publicar("rostro", camera_id, resultado)
+    except Exception as e:
+        print(f"[Eventos] No se pudo publicar el reconocimiento: {e}")
+    return resultado
+
+
+def _identificar_rostros(rostros, umbral, camera_id) -> dict:
+    """
+    Decisión por rostro de un cuadro con varias personas (p.ej. una familia en
+    la puerta peatonal): todos los uuid se resuelven juntos contra el índice.
+    """
+    mejores = [(rect, _uuid_sim(grupo[0])) for rect, grupo in rostros]
+    with tiempos.etapa("identidad"):
+        por_uuid = identidades.resolver_varios(uuid for _, (uuid, _) in mejores)
+
+    decisiones = [
+        {"rostro": i, "rectangulo": rect, **_decision(por_uuid.get(uuid), uuid, sim, umbral)}
+        for i, (rect, (uuid, sim)) in enumerate(mejores)
+    ]
+    # La misma identidad en dos rostros: sólo vale el de mayor similaridad
+    vistos = set()
+    for d in sorted(decisiones, key=lambda d: d["similaridad"], reverse=True):
+        if not d["ok"]:
+            continue
+        if (d["tipo"], d["id"]) in vistos:
+            d["ok"], d["duplicado"] = False, True
+        vistos.add((d["tipo"], d["id"]))
+
+    try:
+        with tiempos.etapa("evento"):
+            eventos.publicar_varios("rostro", camera_id, decisiones)
+    except Exception as e:
+        print(f"[Eventos] No se pudo publicar el reconocimiento: {e}")
+    return {
+        "ok": any(d["ok"] for d in decisiones),
+        "rostros": decisiones,
+        "total": len(decisiones),
+        "reconocidos": sum(1 for d in decisiones if d["ok"]),
+        "umbral": umbral,
+    }
+
+
+@csrf_exempt
+@require_POST
+@cronometrar_vista("reconocimiento_global")
+async def reconocimiento_global(request):
     """
     Reconoce a una persona (residente) o a un empleado en una sola llamada.
-    Body:
+    Body (JSON o multipart):
       - image_url (str)  ó  image_file (multipart)
       - umbral   (float, default=0.80)
+      - camera_id (str, opcional; para el flujo de eventos)
+      - multiple (bool, opcional): reconoce todos los rostros del cuadro
     Respuesta:
       { ok, tipo, id, nombre, similaridad, uuid }
+      con multiple: { ok, rostros: [{rostro, rectangulo, ok, tipo, id, nombre, ...}], total, reconocidos }
+    Async: la llamada a Luxand y el backoff entre reintentos no ocupan un hilo.
     """
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
-
-    def post(self, request, *args, **kwargs):
-        umbral = float(request.data.get("umbral", 0.80))
-        image_url = request.data.get("image_url")
-        image_file = request.FILES.get("image_file")
-
-        if not image_url and not image_file:
-            return Response({"detail": "Proporcione image_url o image_file"}, status=400)
-
-        # Opción A: una sola colección para todo (recomendado)
-        gallery = getattr(settings, "LUXAND_COLLECTION", "")
-
-        try:
-            # Validar formato de imagen si es archivo
-            if image_file:
-                if not image_file.content_type.startswith('image/'):
-                    return Response({"detail": "El archivo debe ser una imagen"}, status=400)
-                if image_file.size > 10 * 1024 * 1024:  # 10MB
-                    return Response({"detail": "La imagen es demasiado grande (máximo 10MB)"}, status=400)
-
-            fuente = image_url if image_url else image_file
-            
-            # Intentar reconocimiento con retry en caso de errores temporales
-            max_retries = 3
-            retry_delay = 2  # segundos
-            
-            for attempt in range(max_retries):
-                try:
-                    print(f"🔄 Reconocimiento intento {attempt + 1}/{max_retries}")
-                    res = recognize(fuente, gallery=gallery)
-                    break  # Si es exitoso, salir del loop
-                except ValueError as e:
-                    error_msg = str(e)
-                    print(f"❌ Error en intento {attempt + 1}: {error_msg}")
-                    
-                    # Si es un error 503 o 429, intentar de nuevo después de un delay
-                    if ("503" in error_msg or "429" in error_msg or "timeout" in error_msg.lower()) and attempt < max_retries - 1:
-                        print(f"⏳ Esperando {retry_delay} segundos antes del siguiente intento...")
-                        import time
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                        continue
-                    else:
-                        # Si no es un error temporal o ya se agotaron los intentos, re-lanzar el error
-                        raise e
-            
-            # Debug: Log the response structure and gallery
-            print(f"=== RECONOCIMIENTO DEBUG ===")
-            print(f"Gallery used: '{gallery}'")
-            print(f"Luxand API response type: {type(res)}")
-            print(f"Luxand API response: {res}")
-            print(f"==========================")
-            
-            # Debug adicional: verificar si la gallery coincide
-            if gallery != "condominio_all":
-                print(f"⚠️  WARNING: Gallery mismatch!")
-                print(f"   Enrolamiento usa: 'condominio_all'")
-                print(f"   Reconocimiento usa: '{gallery}'")
-
-            # Verificar si hay error en la respuesta de Luxand
-            if isinstance(res, dict) and "error" in res:
-                return Response({
-                    "ok": False, 
-                    "reason": "error_luxand", 
-                    "detail": res.get("error", "Error desconocido de Luxand")
-                }, status=400)
-
-            # Handle response structure according to Luxand documentation
-            # The response should contain a list of candidates directly
-            candidates = []
-            if isinstance(res, list):
-                # If response is directly a list of candidates
-                candidates = res
-            elif isinstance(res, dict):
-                # If response is a dict, look for candidates in common fields
-                candidates = (
-                    res.get("candidates", [])
-                    or res.get("matches", [])
-                    or res.get("result", [])
-                    or []
-                )
-                # If result is a dict, try to get candidates from it
-                if isinstance(candidates, dict):
-                    candidates = candidates.get("candidates", [])
-            
-            print(f"🔍 CANDIDATES DEBUG:")
-            print(f"   Response type: {type(res)}")
-            print(f"   Response keys: {res.keys() if isinstance(res, dict) else 'Not a dict'}")
-            print(f"   Candidates found: {len(candidates) if isinstance(candidates, list) else 'Not a list'}")
-            print(f"   Candidates: {candidates}")
-            print(f"   First candidate: {candidates[0] if candidates and len(candidates) > 0 else 'None'}")
-            if not candidates:
-                return Response({
-                    "ok": False, 
-                    "reason": "sin_coincidencias", 
-                    "detail": "No se encontraron coincidencias en la base de datos"
-                })
+    try:
+        with tiempos.etapa("lectura"):
+            datos = _datos_peticion(request)
+            umbral = float(datos.get("umbral", 0.80))
+            image_url = datos.get("image_url")
+            image_file = request.FILES.get("image_file")
+            camera_id = datos.get("camera_id", "") or ""
+            multiple = str(datos.get("multiple", "")).lower() in ("1", "true", "si", "sí")
+    except (TypeError, ValueError) as e:
+        return _json({"detail": f"Datos inválidos: {e}"}, status=400)
 
-            # Ensure candidates is a list and has at least one item
-            if not isinstance(candidates, list) or len(candidates) == 0:
-                return Response({
-                    "ok": False, 
-                    "reason": "sin_coincidencias", 
-                    "detail": "No se encontraron coincidencias válidas en la respuesta"
-                })
-            
-            best = candidates[0]
-            # Ensure best is a dictionary
-            if not isinstance(best, dict):
-                return Response({
-                    "ok": False, 
-                    "reason": "formato_invalido", 
-                    "detail": "Formato de respuesta inválido de Luxand API"
-                })
-            
-            # Extract UUID and similarity according to Luxand documentation
-            # Luxand returns: uuid, probability, name, etc.
-            uuid = best.get("uuid") or best.get("subject") or best.get("person_uuid")
-            sim = _norm(best.get("probability") or best.get("similarity") or best.get("confidence") or best.get("score"))
+    if not image_url and not image_file:
+        return _json({"detail": "Proporcione image_url o image_file"}, status=400)
 
-            print(f"🎯 UUID DEBUG:")
-            print(f"   UUID from Luxand: {uuid}")
-            print(f"   Similarity: {sim}")
+    # Opción A: una sola colección para todo (recomendado)
+    gallery = getattr(settings, "LUXAND_COLLECTION", "")
 
-            tipo = None
-            obj = None
-            if uuid:
-                print(f"🔍 DATABASE SEARCH:")
-                obj = Persona.objects.filter(luxand_uuid=uuid).first()
-                if obj:
-                    tipo = "persona"
-                    print(f"   ✅ Found in Persona table: {obj.nombre} {obj.apellido}")
-                else:
-                    obj = Empleado.objects.filter(luxand_uuid=uuid).first()
-                    if obj:
-                        tipo = "empleado"
-                        print(f"   ✅ Found in Empleado table: {obj.nombre} {obj.apellido}")
-                    else:
-                        print(f"   ❌ Not found in database with UUID: {uuid}")
-                        print(f"   📋 Available UUIDs in Persona: {list(Persona.objects.filter(luxand_uuid__isnull=False).values_list('luxand_uuid', flat=True))}")
-                        print(f"   📋 Available UUIDs in Empleado: {list(Empleado.objects.filter(luxand_uuid__isnull=False).values_list('luxand_uuid', flat=True))}")
+    try:
+        # Validar formato de imagen si es archivo
+        if image_file:
+            if not image_file.content_type.startswith('image/'):
+                return _json({"detail": "El archivo debe ser una imagen"}, status=400)
+            if image_file.size > 10 * 1024 * 1024:  # 10MB
+                return _json({"detail": "La imagen es demasiado grande (máximo 10MB)"}, status=400)
+
+        # Archivo normalizado al perfil "rostro" (640px) antes de enviarlo a Luxand
+        with tiempos.etapa("lectura"):
+            if image_url:
+                fuente = image_url
             else:
-                print(f"   ❌ No UUID found in Luxand response")
+                fuente = await sync_to_async(normalizar, thread_sensitive=False)(image_file, "rostro")
+
+        # Backend configurado (Luxand o índice local). Si Luxand está caído, el
+        # cortacircuitos responde 503 de inmediato; un 429/5xx aislado se reintenta
+        # con backoff esperado (sin bloquear el worker).
+        # Cuadros casi idénticos dentro del TTL reutilizan el resultado cacheado.
+        rec = get_reconocedor()
+        with tiempos.etapa("reconocedor"):
+            res = await cache_reconocimiento.areconocer(
+                fuente, f"{rec.nombre}:{gallery}", lambda: rec.areconocer(fuente, gallery)
+            )
 
-            ok = bool(obj) and sim >= umbral
-            nombre = f"{getattr(obj, 'nombre', '')} {getattr(obj, 'apellido', '')}".strip() if obj else None
-            
-            print(f"🎯 FINAL RESULT:")
-            print(f"   Object found: {bool(obj)}")
-            print(f"   Similarity: {sim}")
-            print(f"   Threshold: {umbral}")
-            print(f"   OK: {ok}")
-            print(f"   Name: {nombre}")
-            
-            return Response({
-                "ok": ok,
-                "tipo": tipo,
-                "id": getattr(obj, "id", None),
-                "nombre": nombre,
-                "similaridad": round(sim, 4),
-                "uuid": uuid,
-                "umbral": umbral,
-                "raw": res  # quítalo en producción si no lo necesitas
+        # Verificar si hay error en la respuesta de Luxand
+        if isinstance(res, dict) and "error" in res:
+            return _json({
+                "ok": False,
+                "reason": "error_luxand",
+                "detail": res.get("error", "Error desconocido de Luxand")
+            }, status=400)
+
+        # La respuesta puede ser la lista de candidatos o un dict que la contiene
+        candidates = []
+        if isinstance(res, list):
+            candidates = res
+        elif isinstance(res, dict):
+            candidates = (
+                res.get("candidates", [])
+                or res.get("matches", [])
+                or res.get("result", [])
+                or []
+            )
+            if isinstance(candidates, dict):
+                candidates = candidates.get("candidates", [])
+
+        if not candidates:
+            return _json({
+                "ok": False,
+                "reason": "sin_coincidencias",
+                "detail": "No se encontraron coincidencias en la base de datos"
+            })
+
+        if not isinstance(candidates, list) or len(candidates) == 0:
+            return _json({
+                "ok": False,
+                "reason": "sin_coincidencias",
+                "detail": "No se encontraron coincidencias válidas en la respuesta"
             })
-            
-        except ValueError as e:
-            # Errores específicos de Luxand API
-            return Response({"detail": f"Error de API Luxand: {e}"}, status=400)
-        except requests.RequestException as e:
-            # Errores de conexión
-            return Response({"detail": f"Error de conexión con Luxand: {e}"}, status=503)
-        except Exception as e:
-            # Otros errores
-            return Response({"detail": f"Error interno: {e}"}, status=500)
 
+        best = candidates[0]
+        if not isinstance(best, dict):
+            return _json({
+                "ok": False,
+                "reason": "formato_invalido",
+                "detail": "Formato de respuesta inválido de Luxand API"
+            })
 
-class EnrolarPersonaView(APIView):
+        if multiple:
+            # Un solo viaje para el grupo: Luxand ya devuelve todos los rostros del cuadro
+            rostros = agrupar_rostros(candidates)
+            resultado = await sync_to_async(_identificar_rostros)(rostros, umbral, camera_id)
+            return _json({**resultado, "raw": res})
+
+        uuid, sim = _uuid_sim(best)
+        resultado = await sync_to_async(_identificar)(uuid, sim, umbral, camera_id)
+        return _json({
+            **resultado,
+            "raw": res  # quítalo en producción si no lo necesitas
+        })
+
+    except ProveedorNoDisponible as e:
+        return _json(e.como_respuesta(), status=503, headers={"Retry-After": str(e.reintentar_en)})
+    except ValueError as e:
+        # Errores específicos de Luxand API
+        return _json({"detail": f"Error de API Luxand: {e}"}, status=400)
+    except (requests.RequestException, httpx.HTTPError) as e:
+        # Errores de conexión
+        return _json({"detail": f"Error de conexión con Luxand: {e}"}, status=503)
+    except Exception as e:
+        print(f"[Reconocimiento] Error interno: {e}")
+        return _json({"detail": f"Error interno: {e}"}, status=500)
+
+
+class EnrolarPersonaView(CronometroMixin, APIView):
     """
     Enrola una persona en Luxand (registra su foto para reconocimiento futuro).
     Body:
@@ -289,6 +404,7 @@ class EnrolarPersonaView(APIView):
     """
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
+    @cronometrar("enrolamiento")
     def post(self, request, *args, **kwargs):
         persona_id = request.data.get("persona_id")
         empleado_id = request.data.get("empleado_id")
@@ -330,21 +446,13 @@ class EnrolarPersonaView(APIView):
 
             # Enrolar en Luxand
             nombre_completo = f"{obj.nombre} {obj.apellido}"
-            fuente = image_url if image_url else image_file
+            # Control de calidad local: una foto no apta no gasta una llamada al proveedor
+            with tiempos.etapa("calidad"):
+                fuente = calidad_rostro.preparar(image_url or image_file)
             
             gallery = getattr(settings, "LUXAND_COLLECTION", "")
-            print(f"=== ENROLAMIENTO DEBUG ===")
-            print(f"Gallery used: '{gallery}'")
-            print(f"Nombre completo: '{nombre_completo}'")
-            print(f"Tipo de fuente: {type(fuente)}")
-            if image_file:
-                print(f"Tamaño de archivo: {image_file.size} bytes")
-                print(f"Tipo de contenido: {image_file.content_type}")
-            print(f"==========================")
-            
-            res = add_person(nombre_completo, fuente, collections=gallery)
-            
-            print(f"Luxand add_person response: {res}")
+            with tiempos.etapa("reconocedor"):
+                res = get_reconocedor().enrolar(nombre_completo, fuente, gallery)
             
             # Verificar si el enrolamiento fue exitoso
             if res.get("status") == "failure":
@@ -374,32 +482,41 @@ class EnrolarPersonaView(APIView):
                 "mensaje": f"{tipo.capitalize()} enrolado exitosamente"
             })
             
+        except calidad_rostro.FotoNoApta as e:
+            return Response(e.como_respuesta(), status=400)
+        except ProveedorNoDisponible as e:
+            return proveedor_no_disponible(e)
         except Exception as e:
-            print(f"Error en enrolamiento: {e}")
+            print(f"[Enrolamiento] Error al enrolar {tipo} {obj.pk if obj else ''}: {e}")
             return Response({"detail": f"Error al enrolar: {e}"}, status=500)
 
 
 class VerificarEnrolamientoView(APIView):
     """
     Verifica el estado de enrolamiento de personas y empleados.
-    Útil para debugging.
+    Útil para debugging. Para cruzarlo con la galería del proveedor: ReconciliacionView.
     """
     def get(self, request, *args, **kwargs):
         try:
-            # Obtener todas las personas con luxand_uuid
-            personas_enroladas = Persona.objects.filter(luxand_uuid__isnull=False).values(
-                'id', 'nombre', 'apellido', 'luxand_uuid', 'tipo'
-            )
-            
-            empleados_enrolados = Empleado.objects.filter(luxand_uuid__isnull=False).values(
-                'id', 'nombre', 'apellido', 'luxand_uuid', 'cargo__nombre'
-            )
+            # El registro IdentidadFacial es la fuente del estado de enrolamiento
+            personas_enroladas = list(IdentidadFacial.objects.filter(tipo="persona").order_by("persona_id").values(
+                'coleccion', 'fecha_enrolamiento', luxand_uuid=F('uuid'), id=F('persona_id'),
+                nombre=F('persona__nombre'), apellido=F('persona__apellido'), tipo_persona=F('persona__tipo'),
+            ))
+            # "tipo" ya es un campo de IdentidadFacial: se renombra aquí para no cambiar la respuesta
+            for fila in personas_enroladas:
+                fila["tipo"] = fila.pop("tipo_persona")
+            
+            empleados_enrolados = list(IdentidadFacial.objects.filter(tipo="empleado").order_by("empleado_id").values(
+                'coleccion', 'fecha_enrolamiento', luxand_uuid=F('uuid'), id=F('empleado_id'),
+                nombre=F('empleado__nombre'), apellido=F('empleado__apellido'), cargo__nombre=F('empleado__cargo__nombre'),
+            ))
             
             return Response({
-                "personas_enroladas": list(personas_enroladas),
-                "empleados_enrolados": list(empleados_enrolados),
-                "total_personas": personas_enroladas.count(),
-                "total_empleados": empleados_enrolados.count(),
+                "personas_enroladas": personas_enroladas,
+                "empleados_enrolados": empleados_enrolados,
+                "total_personas": len(personas_enroladas),
+                "total_empleados": len(empleados_enrolados),
                 "gallery_config": getattr(settings, "LUXAND_COLLECTION", "")
             })
             
@@ -433,7 +550,7 @@ class VerificarLuxandAPIView(APIView):
             
             try:
                 # Hacer una petición GET para verificar conectividad
-                response = requests.get(url, headers=headers, timeout=10)
+                response = sesion("luxand").get(url, headers=headers, timeout=10)
                 
                 return Response({
                     "status": "success" if response.status_code == 200 else "error",
@@ -444,6 +561,15 @@ class VerificarLuxandAPIView(APIView):
                     "api_url": url
                 })
                 
+            except ProveedorNoDisponible as e:
+                return Response({
+                    "status": "error",
+                    "message": str(e),
+                    "circuito": e.motivo,
+                    "token_configured": bool(token),
+                    "collection_configured": collection
+                }, status=503, headers={"Retry-After": str(e.reintentar_en)})
+
             except requests.exceptions.Timeout:
                 return Response({
                     "status": "error",
@@ -472,39 +598,257 @@ class VerificarLuxandAPIView(APIView):
             return Response({"detail": f"Error interno: {e}"}, status=500)
 
 
-class ProbarLuxandView(APIView):
+@csrf_exempt
+@require_POST
+async def probar_luxand(request):
     """
     Prueba la funcionalidad de Luxand con una imagen de prueba.
     Útil para debugging y verificación.
+    Body (JSON o multipart): image_file ó image_url.
+    Async: la llamada a Luxand no ocupa un hilo del worker.
     """
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
-    
+    gallery = getattr(settings, "LUXAND_COLLECTION", "")
+    try:
+        image_file = request.FILES.get("image_file")
+        image_url = _datos_peticion(request).get("image_url")
+
+        if not image_file and not image_url:
+            return _json({"detail": "Proporcione image_file o image_url"}, status=400)
+
+        if image_url:
+            fuente = image_url
+        else:
+            fuente = await sync_to_async(normalizar, thread_sensitive=False)(image_file, "rostro")
+        res = await luxand.recognize_async(fuente, gallery=gallery)
+
+        return _json({
+            "status": "success",
+            "gallery_used": gallery,
+            "luxand_response": res,
+            "response_type": str(type(res)),
+            "message": "Prueba de Luxand completada"
+        })
+
+    except ProveedorNoDisponible as e:
+        return _json(e.como_respuesta(), status=503, headers={"Retry-After": str(e.reintentar_en)})
+    except Exception as e:
+        return _json({
+            "status": "error",
+            "detail": f"Error en prueba de Luxand: {e}",
+            "gallery_used": gallery
+        }, status=500)
+
+
+class CacheReconocimientoView(APIView):
+    """
+    Contadores de la caché de reconocimiento (aciertos / fallos).
+    """
+    def get(self, request, *args, **kwargs):
+        return Response(cache_reconocimiento.estadisticas())
+
+
+class TiemposView(APIView):
+    """
+    Percentiles (p50/p95/p99, ms) por vista y etapa de las vistas de la barrera,
+    desde el arranque de este proceso. ?reiniciar=1 vacía el histograma.
+    """
+    def get(self, request, *args, **kwargs):
+        datos = tiempos.histograma.estadisticas()
+        if request.query_params.get("reiniciar") in ("1", "true"):
+            tiempos.histograma.reiniciar()
+        return Response(datos)
+
+
+class EnrolamientoMasivoView(APIView):
+    """
+    Enrolamiento masivo en segundo plano.
+    POST body:
+      - tipo   ("persona" | "empleado" | "todos", default "todos")
+      - ids    (lista opcional de IDs)
+      - limite (int opcional, máximo por tipo)
+    Respuesta 202: { id, estado, total }. El progreso se consulta con GET <id>/.
+    Si ya hay un enrolamiento corriendo responde 200 con el estado de ése.
+    """
+    parser_classes = (JSONParser, FormParser, MultiPartParser)
+
     def post(self, request, *args, **kwargs):
+        tipo = request.data.get("tipo", "todos")
+        if tipo not in ("persona", "empleado", "todos"):
+            return Response({"detail": "tipo debe ser persona, empleado o todos"}, status=400)
+        tipos = ["persona", "empleado"] if tipo == "todos" else [tipo]
         try:
-            image_file = request.FILES.get("image_file")
-            image_url = request.data.get("image_url")
-            
-            if not image_file and not image_url:
-                return Response({"detail": "Proporcione image_file o image_url"}, status=400)
-            
-            # Usar la función de reconocimiento directamente
-            from core.luxand import recognize
-            gallery = getattr(settings, "LUXAND_COLLECTION", "")
-            
-            fuente = image_url if image_url else image_file
-            res = recognize(fuente, gallery=gallery)
-            
-            return Response({
-                "status": "success",
-                "gallery_used": gallery,
-                "luxand_response": res,
-                "response_type": str(type(res)),
-                "message": "Prueba de Luxand completada"
-            })
-            
-        except Exception as e:
-            return Response({
-                "status": "error",
-                "detail": f"Error en prueba de Luxand: {e}",
-                "gallery_used": getattr(settings, "LUXAND_COLLECTION", "")
-            }, status=500)
+            ids = [int(i) for i in (request.data.get("ids") or [])]
+            limite = int(request.data["limite"]) if request.data.get("limite") else None
+        except (TypeError, ValueError):
+            return Response({"detail": "ids y limite deben ser enteros"}, status=400)
+        estado = enrolamiento.lanzar(tipos, ids or None, limite)
+        return Response(estado, status=200 if estado.get("ya_en_curso") else 202)
+
+
+class EnrolamientoMasivoEstadoView(APIView):
+    """
+    Estado / informe de un trabajo de enrolamiento masivo.
+    """
+    def get(self, request, trabajo_id, *args, **kwargs):
+        estado = enrolamiento.estado_trabajo(trabajo_id)
+        if estado is None:
+            return Response({"detail": "Trabajo no encontrado"}, status=404)
+        return Response(estado)
+
+
+class ReconciliacionView(APIView):
+    """
+    Reconciliación de la galería del reconocedor con los luxand_uuid locales,
+    en segundo plano. POST body (todos opcionales, por defecto sólo informa):
+      - reparar (bool), borrar_huerfanos (bool), enrolar (bool)
+    Respuesta 202: { id, estado }. El informe se consulta con GET <id>/.
+    """
+    parser_classes = (JSONParser, FormParser, MultiPartParser)
+
+    def post(self, request, *args, **kwargs):
+        opciones = {
+            campo: str(request.data.get(campo, "")).lower() in ("1", "true", "si", "sí")
+            for campo in ("reparar", "borrar_huerfanos", "enrolar")
+        }
+        return Response(reconciliacion.lanzar(**opciones), status=202)
+
+
+class ReconciliacionEstadoView(APIView):
+    """
+    Estado / informe de una reconciliación.
+    """
+    def get(self, request, trabajo_id, *args, **kwargs):
+        estado = reconciliacion.estado_trabajo(trabajo_id)
+        if estado is None:
+            return Response({"detail": "Trabajo no encontrado"}, status=404)
+        return Response(estado)
+
+
+class AlprDebounceView(APIView):
+    """
+    Ventanas de debounce del ALPR y cuadros repetidos descartados.
+    """
+    def get(self, request, *args, **kwargs):
+        return Response(debounce.estadisticas())
+
+
+class AlprResumenView(APIView):
+    """
+    Lecturas por cámara y hora (tabla de resúmenes, no lectura_placa).
+    Query params: desde, hasta (ISO 8601; por defecto las últimas 24 h), camera_id.
+    """
+    def get(self, request, *args, **kwargs):
+        fechas = {}
+        for campo in ("desde", "hasta"):
+            valor = request.query_params.get(campo)
+            try:
+                fechas[campo] = parse_datetime(valor) if valor else None
+            except ValueError:
+                fechas[campo] = None
+            if valor and fechas[campo] is None:
+                return Response({"detail": f"{campo} debe ser una fecha ISO 8601"}, status=400)
+        desde, hasta = fechas["desde"], fechas["hasta"]
+        filas = list(rollups.resumen(desde, hasta, request.query_params.get("camera_id")).values(
+            "camera_id", "hora", "lecturas", "coincidencias", "placas_unicas"
+        ))
+        return Response({
+            "filas": filas,
+            "total_lecturas": sum(f["lecturas"] for f in filas),
+            "total_coincidencias": sum(f["coincidencias"] for f in filas),
+        })
+
+
+class LecturaPlacaListView(generics.ListAPIView):
+    """
+    Historial de lecturas de placas, paginado por cursor (created_at, id).
+    Query params: camera_id, placa, match (true/false), desde, hasta (ISO 8601),
+    limite (máx. 200), cursor (el "cursor" de la página anterior).
+    """
+    serializer_class = LecturaPlacaListaSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = LecturaPlaca.objects.all()
+        params = self.request.query_params
+        camera_id = params.get("camera_id")
+        if camera_id is not None:
+            queryset = queryset.filter(camera_id=camera_id)
+        placa = params.get("placa")
+        if placa:
+            queryset = queryset.filter(placa=placa.strip().upper())
+        match = params.get("match")
+        if match in ("true", "1"):
+            queryset = queryset.filter(match=True)
+        elif match in ("false", "0"):
+            queryset = queryset.filter(match=False)
+        for campo, lookup in (("desde", "created_at__gte"), ("hasta", "created_at__lt")):
+            valor = params.get(campo)
+            if not valor:
+                continue
+            try:
+                fecha = parse_datetime(valor)
+            except ValueError:
+                fecha = None
+            if fecha is None:
+                raise ValidationError({campo: "Debe ser una fecha ISO 8601"})
+            queryset = queryset.filter(**{lookup: fecha})
+        return queryset
+
+
+# ---------- eventos de acceso (vistas async, ver seguridad_IA.eventos) ----------
+
+def _filtros_eventos(request):
+    """
+    (camaras, tipos, desde) desde ?camera_id=a,b&tipo=placa y Last-Event-ID / ?ultimo_id=.
+    """
+    camaras = [c.strip() for c in request.GET.get("camera_id", "").split(",") if c.strip()]
+    tipos = [t.strip() for t in request.GET.get("tipo", "").split(",") if t.strip()]
+    desde = request.headers.get("Last-Event-ID") or request.GET.get("ultimo_id")
+    if desde in (None, ""):
+        return camaras, tipos, None
+    if not str(desde).isdigit():
+        raise ValueError("ultimo_id / Last-Event-ID debe ser un entero")
+    return camaras, tipos, int(desde)
+
+
+async def eventos_acceso(request):
+    """
+    Flujo text/event-stream de eventos de acceso (placas y rostros).
+    Query: camera_id (lista separada por comas), tipo (placa|rostro), ultimo_id.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": "Método no permitido"}, status=405)
+    try:
+        camaras, tipos, desde = _filtros_eventos(request)
+    except ValueError as e:
+        return JsonResponse({"detail": str(e)}, status=400)
+
+    sub = eventos.Suscripcion(camaras, tipos)
+    pendientes = await sync_to_async(eventos.difusor.suscribir)(sub, desde)
+    response = StreamingHttpResponse(sub.flujo(pendientes), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Sin buffer en nginx / proxies para que cada evento salga al momento
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def eventos_espera(request):
+    """
+    Long-poll: devuelve los eventos posteriores a ultimo_id, esperando hasta
+    ?espera= segundos (máx. 30) si todavía no hay ninguno.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": "Método no permitido"}, status=405)
+    try:
+        camaras, tipos, desde = _filtros_eventos(request)
+        espera = min(max(float(request.GET.get("espera", 25)), 0.0), 30.0)
+    except ValueError as e:
+        return JsonResponse({"detail": str(e)}, status=400)
+
+    sub = eventos.Suscripcion(camaras, tipos)
+    pendientes = await sync_to_async(eventos.difusor.suscribir)(sub, desde)
+    nuevos = await sub.esperar(pendientes, espera)
+    return JsonResponse({
+        "ultimo_id": sub.visto,
+        "eventos": [eventos.como_dict(e) for e in nuevos],
+    })